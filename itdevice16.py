@@ -1,23 +1,2743 @@
 import sys
 import os
+import io
+import re
+import gzip
 import time
+import json
+import argparse
+import threading
+import functools
+import ipaddress
+import traceback
+import multiprocessing
+import heapq
+import urllib.error
+import urllib.request
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from io import BytesIO
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote, unquote, urljoin
 import qrcode
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import from_excel, from_ISO8601, to_excel
 import cv2
 import numpy as np
 import pandas as pd
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTableView, QAbstractItemView,
     QFileDialog, QMessageBox, QMenuBar, QMenu, QAction, QDialog,
     QFormLayout, QDateEdit, QComboBox, QDialogButtonBox, QGroupBox,
-    QCheckBox, QSizePolicy, QInputDialog
+    QCheckBox, QSizePolicy, QInputDialog, QCompleter, QListWidget, QListWidgetItem,
+    QProgressDialog, QSystemTrayIcon, QStyle, QTreeWidget, QTreeWidgetItem, QSplitter
 )
-from PyQt5.QtCore import Qt, QDate, QTimer
-from PyQt5.QtGui import QIcon, QPixmap, QImage
-from datetime import datetime, timedelta
+from PyQt5.QtCore import Qt, QDate, QTimer, QStringListModel, QFileSystemWatcher, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QIcon, QPixmap, QImage, QColor
+from datetime import datetime, date, timedelta
 from PIL import Image
 from pyzbar.pyzbar import decode
 
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时仅支持汉字/拼写容错检索
+    lazy_pinyin = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # 未安装 pyarrow 时不支持按地点分区存储和 Parquet 导出
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时 CSV/JSONL 不支持 zstd 压缩（Parquet 自带 zstd）
+    zstandard = None
+
+
+# 资产文件的全部列
+ASSET_COLUMNS = [
+    "资产编号", "资产名称", "设备型号", "设备分类", "设备序列号",
+    "IP地址", "使用地点", "机柜位置",
+    "采购合同号", "项目名称", "负责人", "资产价格",
+    "采购日期", "入库日期", "上线日期", "维护有效期",
+    "供应商编码", "供应商名称", "供应商负责人",
+    "设备当前状态", "备注"
+]
+
+# 必要列及旧文件缺少时补齐的字段
+REQUIRED_COLUMNS = ["资产编号", "资产名称", "设备型号", "设备序列号"]
+DEFAULT_COLUMN_VALUES = {
+    "使用地点": "未指定",
+    "机柜位置": "未指定",
+    "设备当前状态": "未投入使用",
+    "备注": "维修更换信息：无维修或补充"
+}
+
+# 同时打开多个文件时记录每行来源的列
+SOURCE_COLUMN = "数据来源"
+
+# 多个来源的文件总大小超过该值时使用进程池并行读取（小文件启动进程反而更慢）
+PARALLEL_LOAD_MIN_BYTES = 2 * 1024 * 1024
+
+# 分块导出时每块的行数（同时也是 Parquet 的行组大小）
+EXPORT_CHUNK_ROWS = 50000
+
+# 导出文件类型；Parquet 的压缩方式由所选类型决定，其余由扩展名决定
+EXPORT_FILTERS = [
+    "Excel文件 (*.xlsx)",
+    "CSV文件 (*.csv)",
+    "CSV文件 gzip压缩 (*.csv.gz)",
+    "CSV文件 zstd压缩 (*.csv.zst)",
+    "JSON Lines文件 (*.jsonl)",
+    "JSON Lines文件 gzip压缩 (*.jsonl.gz)",
+    "JSON Lines文件 zstd压缩 (*.jsonl.zst)",
+    "Parquet文件 (*.parquet)",
+    "Parquet文件 gzip压缩 (*.parquet)",
+    "Parquet文件 zstd压缩 (*.parquet)",
+]
+
+# 数值列与日期列（查询时按类型比较）
+NUMERIC_COLUMNS = ["资产价格"]
+DATE_COLUMNS = ["采购日期", "入库日期", "上线日期", "维护有效期"]
+
+# 查询表达式中的字段别名
+QUERY_FIELD_ALIASES = {
+    "编号": "资产编号", "id": "资产编号",
+    "名称": "资产名称", "name": "资产名称",
+    "型号": "设备型号", "分类": "设备分类",
+    "序列号": "设备序列号", "sn": "设备序列号",
+    "ip": "IP地址", "合同": "采购合同号", "合同号": "采购合同号",
+    "项目": "项目名称", "地点": "使用地点", "机柜": "机柜位置",
+    "价格": "资产价格", "状态": "设备当前状态", "供应商": "供应商名称",
+    "维保": "维护有效期",
+}
+
+# 表格显示的列
+TABLE_COLUMNS = [
+    "资产编号", "资产名称", "设备型号", "设备分类", "设备序列号",
+    "IP地址", "使用地点", "机柜位置",
+    "采购合同号", "项目名称", "负责人", "供应商名称",
+    "维护有效期", "设备当前状态", "备注"
+]
+
+# 表格中按自然顺序排序的列（"A-2" 排在 "A-10" 之前）
+NATURAL_SORT_COLUMNS = ["资产编号", "机柜位置"]
+
+# 支持模糊/拼音检索的列
+FUZZY_COLUMNS = ["资产名称", "负责人", "供应商名称"]
+
+# 已保存查询的存放位置
+SAVED_QUERIES_FILE = os.path.join(os.path.expanduser("~"), ".itasset_saved_queries.json")
+
+# 维护到期提醒的设置（是否启用、每日摘要目录）
+EXPIRY_SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".itasset_expiry.json")
+
+# 维护到期检查间隔（毫秒）
+EXPIRY_CHECK_INTERVAL = 60000
+
+
+# 与 pandas 读取表格时一致：这些文本视为空值
+NA_STRINGS = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+# 只读快照（服务进程 --publish 发布，--viewer 查看进程内存映射）：文件标识、数组对齐字节数、查看进程检查更新的间隔（毫秒）
+SNAPSHOT_MAGIC = b"ITASNAP1"
+SNAPSHOT_ALIGN = 64
+SNAPSHOT_POLL_INTERVAL = 1000
+
+# 二维码渲染：保存时每个模块的像素数、编辑对话框中预览的边长（像素）、渲染结果缓存的条目数
+QR_BOX_SIZE = 10
+QR_PREVIEW_SIZE = 150
+QR_CACHE_SIZE = 256
+
+# 二维码识别：先在长边缩小到该尺寸的图像上尝试（手机照片通常为 1200 万像素）
+QR_DECODE_MAX_SIDE = 1024
+
+# 二维码识别级联的阶段（按代价从低到高）
+QR_DECODE_STAGES = ("downscale", "roi", "threshold", "sharpen", "rotate", "upscale")
+
+# 网络扫描文件中的 IPv4 / MAC 地址（aa:bb:cc:dd:ee:ff、aa-bb-cc-dd-ee-ff 或 aabb.ccdd.eeff）
+IPV4_PATTERN = re.compile(r"(?<![\d.])(\d{1,3}(?:\.\d{1,3}){3})(?![\d.])")
+MAC_PATTERN = re.compile(r"(?i)(?<![0-9a-f])([0-9a-f]{2}(?:[:-][0-9a-f]{2}){5}|[0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4})(?![0-9a-f])")
+
+# 网络扫描核对报告的列与问题类型（按此顺序排列）
+SCAN_REPORT_COLUMNS = ["类型", "IP地址", "MAC地址", "主机名", "来源", "资产编号", "资产名称", "说明"]
+SCAN_REPORT_TYPES = ["IP冲突", "IP与登记不符", "未登记在线主机", "已登记未响应"]
+
+# 耗时直方图的区间上限（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 维护有效期在该天数内到期时标记为即将到期
+EXPIRY_WARNING_DAYS = 60
+
+# 保存为 Excel 时的条件格式，颜色与表格显示一致：(列名, 规则类型, 公式, 填充色)
+# 公式中的 {cell} 为该列第一个数据单元格；日期列保存为文本，用 DATEVALUE 转换后比较
+EXCEL_HIGHLIGHT_RULES = [
+    ("设备当前状态", "cellIs", '"维修中"', "FFFF00"),
+    ("设备当前状态", "cellIs", '"报废中"', "FF0000"),
+    ("设备当前状态", "cellIs", '"更换为新设备"', "00FF00"),
+    ("维护有效期", "expression",
+     'AND({cell}<>"",IFERROR(DATEVALUE({cell}),{cell})<TODAY())', "FF0000"),
+    ("维护有效期", "expression",
+     'AND({cell}<>"",IFERROR(DATEVALUE({cell}),{cell})>=TODAY(),'
+     'IFERROR(DATEVALUE({cell}),{cell})<=TODAY()+%d)' % EXPIRY_WARNING_DAYS, "FFFF00"),
+]
+
+
+class AssetFileError(Exception):
+    """资产文件格式错误"""
+
+
+def read_excel_fast(file_path, sheet_name=0, columns=None, progress=None):
+    """流式读取 Excel 工作表
+
+    工作簿结构、共享字符串和日期格式由 openpyxl 只读模式读取；工作表 XML 直接逐行解析，
+    只转换所需列的单元格值（不创建 openpyxl 单元格对象），按列收集后一次性推断类型。
+    取值规则与 pd.read_excel 相同（数字列为数值、日期单元格为日期时间、NA_STRINGS 为空值），
+    另外跳过空行和没有数据的空表头列。
+    columns: 只读取这些列（None 表示全部）；progress(已读行数, 总行数) 用于显示进度。
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        try:
+            # openpyxl 的内部属性（3.1 版测试通过），升级后不兼容时退回 pd.read_excel
+            shared_strings = ws._shared_strings
+            date_styles = wb._date_formats
+            archive, sheet_path = wb._archive, ws._worksheet_path
+        except AttributeError:
+            return pd.read_excel(
+                file_path, sheet_name=sheet_name, engine="openpyxl",
+                usecols=None if columns is None else (lambda name: name in columns)
+            )
+        epoch = wb.epoch
+        total_rows = ws.max_row or 0
+        
+        row_tag, cell_tag = SHEET_NS + "row", SHEET_NS + "c"
+        value_tag, inline_tag = SHEET_NS + "v", SHEET_NS + "is"
+        positions = {}   # 列字母 -> 在 rows 中的位置（不需要的列为 None）
+        letter_index = {}
+        names = None
+        rows = []
+        row_count = 0
+        
+        with archive.open(sheet_path) as source:
+            for _, element in ET.iterparse(source):
+                if element.tag != row_tag:
+                    continue
+                row_count += 1
+                
+                cells = {}
+                column = 0
+                for cell in element.iter(cell_tag):
+                    coordinate = cell.get("r")
+                    if coordinate:
+                        letters = coordinate.rstrip("0123456789")
+                        column = letter_index.get(letters)
+                        if column is None:
+                            column = letter_index[letters] = column_index_from_string(letters)
+                    else:
+                        column += 1
+                    if names is not None and positions.get(column) is None:
+                        continue
+                    
+                    data_type = cell.get("t", "n")
+                    if data_type == "inlineStr":
+                        inline = cell.find(inline_tag)
+                        value = "".join(inline.itertext()) if inline is not None else None
+                    else:
+                        value = cell.findtext(value_tag)
+                        if value is None:
+                            continue
+                        if data_type == "n":
+                            try:
+                                value = int(value)
+                            except ValueError:
+                                value = float(value)
+                            style = cell.get("s")
+                            if style and int(style) in date_styles:
+                                value = from_excel(value, epoch)
+                        elif data_type == "s":
+                            value = shared_strings[int(value)]
+                        elif data_type == "b":
+                            value = value == "1"
+                        elif data_type == "d":
+                            value = from_ISO8601(value)
+                    cells[column] = value
+                element.clear()
+                
+                if names is None:
+                    # 表头：确定要读取的列
+                    names = []
+                    seen = {}
+                    last = max(cells, default=0)
+                    for column in range(1, last + 1):
+                        name = cells.get(column)
+                        name = f"Unnamed: {column - 1}" if name is None or name == "" else str(name)
+                        if columns is not None and name not in columns:
+                            continue
+                        if name in seen:
+                            seen[name] += 1
+                            name = f"{name}.{seen[name]}"
+                        else:
+                            seen[name] = 0
+                        positions[column] = len(names)
+                        names.append(name)
+                    continue
+                
+                if cells:
+                    row = [None] * len(names)
+                    for column, value in cells.items():
+                        row[positions[column]] = value
+                    rows.append(row)
+                if progress is not None and row_count % 5000 == 0:
+                    progress(row_count, total_rows)
+    finally:
+        wb.close()
+    
+    if names is None:
+        return pd.DataFrame()
+    data = {}
+    for name, values in zip(names, zip(*rows) if rows else [()] * len(names)):
+        series = pd.Series(values, dtype=object)
+        series = series.where(~series.isin(NA_STRINGS) & series.notna(), np.nan)
+        if name.startswith("Unnamed: ") and series.isna().all():
+            continue
+        data[name] = series.infer_objects()
+    return pd.DataFrame(data)
+
+
+def load_asset_file(file_path, sheet_name=0, progress=None):
+    """读取资产文件（Excel/CSV），检查必要列并补齐新增字段"""
+    return normalize_asset_frame(read_asset_table(file_path, sheet_name, progress))
+
+
+def read_asset_table(file_path, sheet_name=0, progress=None):
+    """按扩展名读取 Excel/CSV 文件（不做检查）"""
+    if file_path.endswith('.csv'):
+        return pd.read_csv(file_path, encoding='utf-8-sig')
+    if file_path.lower().endswith('.xls'):
+        # 旧版 .xls 不是 XML 格式，仍交给 pandas 读取
+        return pd.read_excel(file_path, sheet_name=sheet_name)
+    return read_excel_fast(file_path, sheet_name, progress=progress)
+
+
+def normalize_asset_frame(df):
+    """检查必要列，日期列转为文本并补齐新增字段"""
+    # 检查必要列
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_cols:
+        raise AssetFileError(f"文件缺少必要列: {', '.join(missing_cols)}")
+    
+    # 确保日期列是字符串格式
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    
+    # 检查并添加新字段（如果旧文件没有）
+    for col, default_value in DEFAULT_COLUMN_VALUES.items():
+        if col not in df.columns:
+            df[col] = default_value
+    
+    return df
+
+
+def list_asset_sources(file_paths):
+    """列出各文件的数据来源: [(文件路径, 工作表名)]，CSV 文件的工作表名为 None"""
+    sources = []
+    for path in file_paths:
+        if path.endswith('.csv'):
+            sources.append((path, None))
+        else:
+            with pd.ExcelFile(path, engine='openpyxl') as book:
+                sources.extend((path, sheet) for sheet in book.sheet_names)
+    return sources
+
+
+def load_asset_source(source):
+    """读取单个来源（可在子进程中执行），返回 (数据, 错误信息)"""
+    path, sheet = source
+    try:
+        return load_asset_file(path, 0 if sheet is None else sheet), None
+    except AssetFileError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"无法读取: {e}"
+
+
+def load_asset_sources(file_paths, max_workers=None):
+    """读取多个文件（含全部工作表）并合并为一个数据表
+
+    较大的文件由进程池并行解析；每个来源按 load_asset_file 检查必要列并补齐默认值，
+    合并后用 SOURCE_COLUMN 列记录来源。
+    返回 (合并后的数据, 跳过的来源 {来源: 原因}, 跨来源重复的编号 {资产编号: [来源]})。
+    """
+    sources = list_asset_sources(file_paths)
+    sheet_counts = pd.Series([path for path, _ in sources]).value_counts()
+    names = [
+        os.path.basename(path) if sheet_counts[path] == 1 else f"{os.path.basename(path)}:{sheet}"
+        for path, sheet in sources
+    ]
+    
+    total_size = sum(os.path.getsize(path) for path in set(file_paths))
+    workers = min(len(sources), max_workers or os.cpu_count() or 1)
+    if workers > 1 and total_size >= PARALLEL_LOAD_MIN_BYTES:
+        # 使用 spawn 启动子进程，避免在已启动 Qt 的进程中 fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            results = list(pool.map(load_asset_source, sources))
+    else:
+        results = [load_asset_source(source) for source in sources]
+    
+    frames, skipped = [], {}
+    for name, (df, error) in zip(names, results):
+        if error:
+            skipped[name] = error
+        else:
+            df[SOURCE_COLUMN] = name
+            frames.append(df)
+    if not frames:
+        raise AssetFileError("没有可读取的数据:\n" + "\n".join(f"{name}: {error}" for name, error in skipped.items()))
+    merged = pd.concat(frames, ignore_index=True)
+    
+    # 一次遍历找出出现在多个来源中的资产编号
+    codes, uniques = factorize_text(merged["资产编号"])
+    source_codes, source_names = pd.factorize(merged[SOURCE_COLUMN])
+    pairs = pd.DataFrame({"id": codes, "source": source_codes}).drop_duplicates()
+    pairs = pairs[(uniques[pairs["id"]] != "")]
+    pairs = pairs[pairs["id"].duplicated(keep=False)]
+    duplicates = {
+        uniques[code]: source_names[group["source"]].tolist()
+        for code, group in pairs.groupby("id", sort=False)
+    }
+    return merged, skipped, duplicates
+
+
+def export_format(file_path, name_filter=""):
+    """根据扩展名（Parquet 根据所选文件类型）确定导出格式和压缩方式"""
+    path = file_path.lower()
+    compression = None
+    if path.endswith(".gz"):
+        compression, path = "gzip", path[:-3]
+    elif path.endswith(".zst"):
+        compression, path = "zstd", path[:-4]
+    
+    if path.endswith(".csv"):
+        return "csv", compression
+    if path.endswith(".jsonl"):
+        return "jsonl", compression
+    if path.endswith(".parquet"):
+        for name in ("gzip", "zstd"):
+            if name in name_filter:
+                compression = name
+        return "parquet", compression
+    return "xlsx", None
+
+
+def open_text_stream(path, compression, encoding):
+    """打开（可压缩的）文本输出流"""
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding=encoding, newline="")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd 压缩需要安装 zstandard（pip install zstandard）")
+        raw = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+        return io.TextIOWrapper(raw, encoding=encoding, newline="")
+    return open(path, "w", encoding=encoding, newline="")
+
+
+class XlsxStreamWriter:
+    """流式 xlsx 写入器：逐块生成工作表 XML 直接写入压缩包，内存占用与总行数无关
+
+    单元格不设样式，设备当前状态 / 维护有效期 的颜色用条件格式（EXCEL_HIGHLIGHT_RULES）表示。
+    文本写为内联字符串；日期时间写为 Excel 日期值（与 to_excel 相同）。
+    """
+    
+    NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    PIECE_ROWS = 5000
+    
+    def __init__(self, file_path, columns, total_rows):
+        self.columns = [str(col) for col in columns]
+        self.letters = [get_column_letter(i + 1) for i in range(len(self.columns))]
+        self.total_rows = total_rows
+        self.next_row = 2
+        
+        self.archive = zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED)
+        try:
+            for name, xml in self.package_parts().items():
+                self.archive.writestr(name, xml)
+            self.sheet = self.archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        except Exception:
+            self.archive.close()
+            raise
+        
+        last_cell = f"{self.letters[-1] if self.letters else 'A'}{total_rows + 1}"
+        header = "".join(
+            f'<c r="{letter}1"{self.cell_tail(name, 3)}' for letter, name in zip(self.letters, self.columns)
+        )
+        self.sheet.write((
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{self.NS}">'
+            f'<dimension ref="A1:{last_cell}"/><sheetData><row r="1">{header}</row>'
+        ).encode("utf-8"))
+    
+    def package_parts(self):
+        """工作表以外的固定部件（样式表中的 dxf 对应各条件格式规则）"""
+        dxfs = "".join(
+            f'<dxf><fill><patternFill patternType="solid"><bgColor rgb="FF{color}"/></patternFill></fill></dxf>'
+            for _, _, _, color in EXCEL_HIGHLIGHT_RULES
+        )
+        head = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        package_rel = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+        content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        return {
+            "[Content_Types].xml": head + (
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                f'<Override PartName="/xl/workbook.xml" ContentType="{content_type}.sheet.main+xml"/>'
+                f'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="{content_type}.worksheet+xml"/>'
+                f'<Override PartName="/xl/styles.xml" ContentType="{content_type}.styles+xml"/>'
+                '</Types>'
+            ),
+            "_rels/.rels": head + (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                f'<Relationship Id="rId1" Type="{package_rel}/officeDocument" Target="xl/workbook.xml"/>'
+                '</Relationships>'
+            ),
+            "xl/workbook.xml": head + (
+                f'<workbook xmlns="{self.NS}" xmlns:r="{self.REL_NS}">'
+                '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+            ),
+            "xl/_rels/workbook.xml.rels": head + (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                f'<Relationship Id="rId1" Type="{package_rel}/worksheet" Target="worksheets/sheet1.xml"/>'
+                f'<Relationship Id="rId2" Type="{package_rel}/styles" Target="styles.xml"/>'
+                '</Relationships>'
+            ),
+            # 样式 0 常规，1 日期时间，2 日期，3 表头（加粗）
+            "xl/styles.xml": head + (
+                f'<styleSheet xmlns="{self.NS}">'
+                '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/>'
+                '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/></numFmts>'
+                '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+                '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+                '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+                '<fill><patternFill patternType="gray125"/></fill></fills>'
+                '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+                '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+                '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+                '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+                '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+                '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                f'<dxfs count="{len(EXCEL_HIGHLIGHT_RULES)}">{dxfs}</dxfs>'
+                '</styleSheet>'
+            ),
+        }
+    
+    @staticmethod
+    def cell_tail(value, style=0):
+        """单元格 XML 中引用之后的部分；空值返回空字符串（不写该单元格）"""
+        style_attr = f' s="{style}"' if style else ""
+        if value is None or value is pd.NaT:
+            return ""
+        if isinstance(value, (bool, np.bool_)):
+            return f'{style_attr} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (float, np.floating)):
+            return f'{style_attr}><v>{float(value)!r}</v></c>' if np.isfinite(value) else ""
+        if isinstance(value, (int, np.integer)):
+            return f'{style_attr}><v>{int(value)}</v></c>'
+        if isinstance(value, (datetime, date)):
+            if not style:
+                style_attr = ' s="1"' if isinstance(value, datetime) else ' s="2"'
+            return f'{style_attr}><v>{to_excel(value)}</v></c>'
+        text = ILLEGAL_CHARACTERS_RE.sub("", value if isinstance(value, str) else str(value))
+        space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ""
+        return f'{style_attr} t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+    
+    def write(self, chunk):
+        """写出一块数据行（列顺序与创建时一致）"""
+        for piece in range(0, len(chunk), self.PIECE_ROWS):
+            frame = chunk.iloc[piece:piece + self.PIECE_ROWS]
+            rows = range(self.next_row, self.next_row + len(frame))
+            columns = []
+            for letter, col in zip(self.letters, frame.columns):
+                # 每个不同的值只转换一次，再按编码映射回各行
+                codes, uniques = pd.factorize(frame[col], sort=False)
+                tails = [self.cell_tail(value) for value in uniques] + [""]
+                columns.append([
+                    f'<c r="{letter}{row}"{tails[code]}' if tails[code] else ""
+                    for row, code in zip(rows, codes.tolist())
+                ])
+            self.sheet.write("".join(
+                f'<row r="{row}">{"".join(cells)}</row>' for row, cells in zip(rows, zip(*columns))
+            ).encode("utf-8"))
+            self.next_row += len(frame)
+    
+    def close(self):
+        """写出条件格式并关闭文件"""
+        if self.archive is None:
+            return
+        try:
+            formats = []
+            last_row = self.next_row - 1
+            if last_row >= 2:
+                for priority, (col, rule_type, formula, _) in enumerate(EXCEL_HIGHLIGHT_RULES):
+                    if col not in self.columns:
+                        continue
+                    letter = self.letters[self.columns.index(col)]
+                    operator = ' operator="equal"' if rule_type == "cellIs" else ""
+                    formula = escape(formula.replace("{cell}", f"{letter}2"))
+                    formats.append(
+                        f'<conditionalFormatting sqref="{letter}2:{letter}{last_row}">'
+                        f'<cfRule type="{rule_type}" dxfId="{priority}" priority="{priority + 1}"{operator}>'
+                        f'<formula>{formula}</formula></cfRule></conditionalFormatting>'
+                    )
+            self.sheet.write(f'</sheetData>{"".join(formats)}</worksheet>'.encode("utf-8"))
+            self.sheet.close()
+        finally:
+            self.archive.close()
+            self.archive = None
+
+
+def write_excel(df, file_path):
+    """流式写出整个表为 xlsx（带设备状态/维护有效期的条件格式）"""
+    writer = XlsxStreamWriter(file_path, df.columns, len(df))
+    try:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            writer.write(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+    finally:
+        writer.close()
+
+
+def export_chunks(df, file_path, fmt, compression=None, labels=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """分块导出为 Excel / CSV / JSON Lines / Parquet，每写完一块产出已写出的行数
+
+    labels 为要导出的行标签（None 表示全部）；每次只取出一块数据转换，内存占用与总行数无关。
+    先写临时文件，完成后再替换目标文件；调用方中途停止迭代（close）即取消导出，临时文件会被删除。
+    """
+    total = len(df) if labels is None else len(labels)
+    temp_path = file_path + ".exporting"
+    writer = None
+    try:
+        if fmt == "parquet":
+            if pyarrow is None:
+                raise ValueError("导出 Parquet 需要安装 pyarrow（pip install pyarrow）")
+            # 文本列（含只读快照的分类列和 Arrow 字符串列）统一按字符串存储，保证各行组的类型一致
+            text_columns = [
+                col for col in df.columns
+                if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+                or isinstance(df[col].dtype, pd.CategoricalDtype)
+            ]
+            schema = pyarrow.schema([
+                (str(col), pyarrow.string() if col in text_columns else pyarrow.from_numpy_dtype(df[col].dtype))
+                for col in df.columns
+            ])
+            writer = pyarrow.parquet.ParquetWriter(temp_path, schema, compression=compression or "none")
+        elif fmt == "xlsx":
+            writer = XlsxStreamWriter(temp_path, df.columns, total)
+        else:
+            # CSV 保持带 BOM 的 UTF-8，便于 Excel 直接打开
+            writer = open_text_stream(temp_path, compression, "utf-8-sig" if fmt == "csv" else "utf-8")
+        
+        # 没有数据时也写出一块（CSV 表头 / Parquet 结构）
+        for start in range(0, max(total, 1), chunk_rows):
+            stop = min(start + chunk_rows, total)
+            chunk = df.iloc[start:stop] if labels is None else df.loc[labels[start:stop]]
+            if fmt == "xlsx":
+                writer.write(chunk)
+            elif fmt == "csv":
+                chunk.to_csv(writer, header=(start == 0), index=False)
+            elif fmt == "jsonl":
+                # to_json 的临时内存约为输出的十几倍，再细分成小段转换
+                for piece in range(0, len(chunk), 5000):
+                    writer.write(chunk.iloc[piece:piece + 5000].to_json(
+                        orient="records", lines=True, force_ascii=False
+                    ))
+            else:
+                chunk = chunk.copy()
+                for col in text_columns:
+                    values = chunk[col].astype(object)
+                    chunk[col] = values.where(values.isna(), values.astype(str))
+                writer.write_table(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield stop
+        
+        writer.close()
+        writer = None
+        os.replace(temp_path, file_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def row_hashes(df, columns):
+    """按列值计算每行的哈希（值按去除首尾空白后的文本比较，空值与缺少的列视为空）"""
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in columns:
+        if col in df.columns:
+            codes, uniques = factorize_text(df[col])
+            uniques[np.isin(uniques, ["nan", "NaT", "None"])] = ""
+            # 含空值的整数列读入后为浮点（5 -> 5.0），按同一值处理
+            uniques = pd.Series(uniques).str.replace(r"^(-?\d+)\.0$", r"\1", regex=True).to_numpy(dtype=object)
+            col_hash = pd.util.hash_array(uniques)[codes]
+        else:
+            col_hash = np.repeat(pd.util.hash_array(np.array([""], dtype=object)), len(df))
+        hashes = hashes * np.uint64(1000003) ^ col_hash
+    return hashes
+
+
+def factorize_text(series, lower=False):
+    """列因子化：返回 (每行编码, 去除首尾空白后的唯一值)
+
+    空值编码为最后一个唯一值（空字符串）。字符串处理只需作用于唯一值，再按编码映射回各行。
+    """
+    codes, uniques = pd.factorize(series, sort=False)
+    text = [u.strip() if isinstance(u, str) else str(u).strip() for u in uniques]
+    if lower:
+        text = [t.lower() for t in text]
+    codes = np.where(codes < 0, len(uniques), codes)
+    return codes, np.array(text + [""], dtype=object)
+
+
+def parse_dates(values):
+    """解析日期文本（通常为因子化后的唯一值），返回 datetime64 数组，无法识别的为 NaT"""
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+    # 批量解析按第一个值推断格式，格式不一致的再逐个解析
+    retry = np.flatnonzero(parsed.isna().to_numpy() & pd.notna(values) & (np.asarray(values, dtype=object) != ""))
+    if len(retry):
+        parsed = parsed.astype(object)
+        for i in retry:
+            parsed.iloc[i] = pd.to_datetime(values[i], errors="coerce")
+        parsed = pd.to_datetime(parsed, errors="coerce")
+    return parsed.to_numpy(dtype="datetime64[ns]")
+
+
+def ipv4_to_int(values):
+    """批量将 IPv4 地址字符串转为整数（向量化，无效地址为 -1）"""
+    chars = np.array([v if isinstance(v, str) else "" for v in values], dtype="U16")
+    chars = chars.view(np.uint32).reshape(len(chars), 16)
+
+    total = np.zeros(len(chars), dtype=np.int64)
+    current = np.zeros(len(chars), dtype=np.int32)
+    digits = np.zeros(len(chars), dtype=np.int32)
+    segments = np.zeros(len(chars), dtype=np.int32)
+    # 超过15个字符的一定不是合法地址
+    valid = chars[:, 15] == 0
+    for j in range(16):
+        c = chars[:, j].astype(np.int32)
+        is_digit = (c >= 48) & (c <= 57)
+        valid &= is_digit | (c == 46) | (c == 0)
+        current = np.where(is_digit, current * 10 + c - 48, current)
+        digits += is_digit
+        # 遇到分隔点或字符串结尾时结算当前段
+        ends = (c == 46) | ((c == 0) & (digits > 0))
+        valid &= ~ends | ((digits >= 1) & (digits <= 3) & (current <= 255))
+        total = np.where(ends, (total << 8) | current, total)
+        segments += ends
+        current = np.where(ends, 0, current)
+        digits = np.where(ends, 0, digits)
+    valid &= segments == 4
+    return np.where(valid, total, -1)
+
+
+def normalize_mac(text):
+    """提取并规范化 MAC 地址为 aa:bb:cc:dd:ee:ff，没有时返回空字符串"""
+    match = MAC_PATTERN.search(text) if isinstance(text, str) else None
+    if match is None:
+        return ""
+    digits = re.sub(r"[^0-9a-f]", "", match.group(1).lower())
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def read_nmap_xml(file_path):
+    """流式读取 nmap -oX 结果中在线主机的 (IP, MAC, 主机名)，处理完的节点随即释放"""
+    hosts = []
+    context = ET.iterparse(file_path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end" or elem.tag != "host":
+            continue
+        status = elem.find("status")
+        if status is None or status.get("state") == "up":
+            ip = mac = ""
+            for address in elem.iter("address"):
+                if address.get("addrtype") == "ipv4":
+                    ip = address.get("addr", "")
+                elif address.get("addrtype") == "mac":
+                    mac = normalize_mac(address.get("addr", ""))
+            hostname = elem.find("hostnames/hostname")
+            hosts.append((ip, mac, hostname.get("name", "") if hostname is not None else ""))
+        root.clear()
+    return hosts
+
+
+def read_dhcpd_leases(lines):
+    """读取 ISC dhcpd.leases 中有效的租约（同一 IP 以文件中最后一条为准）"""
+    leases = {}
+    lease = None
+    for line in lines:
+        line = line.strip()
+        if lease is None:
+            match = re.match(r"lease\s+([\d.]+)\s*\{", line)
+            if match:
+                lease = {"ip": match.group(1), "mac": "", "name": "", "active": True}
+        elif line.startswith("}"):
+            leases[lease["ip"]] = lease
+            lease = None
+        elif line.startswith("binding state"):
+            lease["active"] = line.rstrip(";").split()[-1] == "active"
+        elif line.startswith("hardware ethernet"):
+            lease["mac"] = normalize_mac(line)
+        elif line.startswith("client-hostname"):
+            lease["name"] = line.split(None, 1)[1].rstrip(";").strip('"')
+    return [(lease["ip"], lease["mac"], lease["name"]) for lease in leases.values() if lease["active"]]
+
+
+def read_neighbor_table(lines):
+    """逐行读取 ARP 表 / 邻居表 / dnsmasq 租约（arp -a、ip neigh、Windows arp -a、dnsmasq.leases）
+
+    只保留带有单播 MAC 的行（未解析的 ARP 项不能说明主机在线）。
+    """
+    hosts = []
+    for line in lines:
+        ip_match = IPV4_PATTERN.search(line)
+        mac = normalize_mac(line)
+        if ip_match is None or not mac or int(mac[:2], 16) & 1:
+            continue
+        ip = ip_match.group(1)
+        tokens = line.split()
+        name = ""
+        if len(tokens) >= 4 and tokens[0].isdigit() and tokens[2] == ip:
+            name = tokens[3]  # dnsmasq: 到期时间 MAC IP 主机名 客户端ID
+        elif len(tokens) >= 2 and tokens[1] == f"({ip})":
+            name = tokens[0]  # arp -a: 主机名 (IP) at MAC ...
+        hosts.append((ip, mac, "" if name in ("*", "?") else name))
+    return hosts
+
+
+def read_scan_file(file_path):
+    """读取离线网络扫描文件（nmap XML、dhcpd/dnsmasq 租约、ARP 表），返回 IP地址/MAC地址/主机名/来源 表"""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.read(4096)
+        if "<nmaprun" in head:
+            hosts = None
+        else:
+            f.seek(0)
+            if re.search(r"^\s*lease\s+[\d.]+\s*\{", head, re.M):
+                hosts = read_dhcpd_leases(f)
+            else:
+                hosts = read_neighbor_table(f)
+    if hosts is None:
+        hosts = read_nmap_xml(file_path)
+    frame = pd.DataFrame(hosts, columns=["IP地址", "MAC地址", "主机名"], dtype=object)
+    frame["来源"] = os.path.basename(file_path)
+    return frame
+
+
+def reconcile_scan(df, hosts):
+    """将扫描到的在线主机与资产的 IP地址（及 MAC）核对，返回报告
+
+    按规范化后的 IP（整数）和 MAC 建立哈希索引连接；资产的 MAC 取自 设备序列号 或 备注 中出现的 MAC 地址。
+    报告列为 SCAN_REPORT_COLUMNS 加 _label（相关资产的行标签，无对应资产为 -1）。
+    “已登记未响应”只统计扫描覆盖的网段（扫描结果中出现过的 /24 网段）内的资产。
+    """
+    # 扫描结果按 IP 去重，优先保留带 MAC 的记录，主机名取任一记录中非空的
+    hosts = hosts.assign(ip=ipv4_to_int(hosts["IP地址"].to_numpy()))
+    hosts = hosts[hosts["ip"] >= 0]
+    names = hosts[hosts["主机名"] != ""].drop_duplicates("ip").set_index("ip")["主机名"]
+    live = hosts.sort_values("MAC地址", ascending=False, kind="stable").drop_duplicates("ip")
+    live = live.assign(主机名=live["ip"].map(names).fillna("").to_numpy())
+    pairs = hosts[hosts["MAC地址"] != ""].drop_duplicates(["ip", "MAC地址"])
+    multi_mac = pairs[pairs.duplicated("ip", keep=False)].groupby("ip")["MAC地址"].agg(", ".join)
+
+    # 资产：因子化后只解析唯一值
+    if "IP地址" in df.columns:
+        codes, uniques = factorize_text(df["IP地址"])
+        asset_ip = ipv4_to_int(uniques)[codes]
+    else:
+        asset_ip = np.full(len(df), -1, dtype=np.int64)
+    asset_mac = np.full(len(df), "", dtype=object)
+    for col in ["备注", "设备序列号"]:
+        if col in df.columns:
+            codes, uniques = factorize_text(df[col])
+            macs = np.array([normalize_mac(u) for u in uniques], dtype=object)[codes]
+            asset_mac = np.where(macs != "", macs, asset_mac)
+    assets = pd.DataFrame({"_label": df.index, "ip": asset_ip, "net": asset_ip >> 8, "登记MAC": asset_mac})
+    registered = assets[assets["ip"] >= 0]
+    by_mac = assets[assets["登记MAC"] != ""].drop_duplicates("登记MAC").set_index("登记MAC")
+    subnets = set((live["ip"].to_numpy() >> 8).tolist())
+
+    def ip_text(values):
+        return [str(ipaddress.IPv4Address(int(v))) for v in values]
+
+    reports = []
+
+    def add(kind, frame, label, note):
+        reports.append(pd.DataFrame({
+            "类型": kind, "IP地址": ip_text(frame["ip"]),
+            "MAC地址": frame["MAC地址"].to_numpy() if "MAC地址" in frame else "",
+            "主机名": frame["主机名"].to_numpy() if "主机名" in frame else "",
+            "来源": frame["来源"].to_numpy() if "来源" in frame else "",
+            "_label": label, "说明": note, "ip": frame["ip"].to_numpy(),
+        }))
+
+    # 扫描到的主机按 IP 连接资产
+    joined = live.merge(registered, on="ip", how="left")
+    matched = joined["_label"].notna()
+    clash = matched & (joined["MAC地址"] != "") & (joined["登记MAC"] != "") & (joined["MAC地址"] != joined["登记MAC"])
+    rows = joined[clash]
+    add("IP冲突", rows, rows["_label"].to_numpy(), [f"登记 MAC {mac}，扫描到其他设备" for mac in rows["登记MAC"]])
+
+    rows = live[live["ip"].isin(multi_mac.index)]
+    add("IP冲突", rows, -1, [f"扫描到多个 MAC: {multi_mac[ip]}" for ip in rows["ip"]])
+
+    duplicated = registered[registered.duplicated("ip", keep=False) & registered["net"].isin(subnets)]
+    add("IP冲突", duplicated.assign(MAC地址=duplicated["登记MAC"]), duplicated["_label"].to_numpy(), "多台资产登记了同一 IP")
+
+    # 按 IP 未找到资产：MAC 对应资产的为 IP 变更，否则为未登记主机
+    unmatched = joined[~matched]
+    moved = unmatched["MAC地址"].isin(by_mac.index) & (unmatched["MAC地址"] != "")
+    rows = unmatched[moved]
+    owners = by_mac.loc[rows["MAC地址"]]
+    add("IP与登记不符", rows, owners["_label"].to_numpy(),
+        ["登记 IP " + (ip_text([v])[0] if v >= 0 else "为空") for v in owners["ip"]])
+    rows = unmatched[~moved]
+    add("未登记在线主机", rows, -1, "")
+
+    # 扫描网段内登记了 IP 但 IP 和 MAC 都未出现在扫描结果中的资产
+    silent = registered[
+        registered["net"].isin(subnets) & ~registered["ip"].isin(live["ip"])
+        & ~(registered["登记MAC"].isin(pairs["MAC地址"]) & (registered["登记MAC"] != ""))
+    ]
+    add("已登记未响应", silent.assign(MAC地址=silent["登记MAC"]), silent["_label"].to_numpy(), "")
+
+    report = pd.concat(reports, ignore_index=True)
+    report["_label"] = report["_label"].fillna(-1).astype(np.int64)
+    known = report["_label"] >= 0
+    for col in ["资产编号", "资产名称"]:
+        report[col] = ""
+        if col in df.columns:
+            report.loc[known, col] = df.loc[report.loc[known, "_label"], col].fillna("").astype(str).to_numpy()
+    report["_order"] = report["类型"].map({kind: i for i, kind in enumerate(SCAN_REPORT_TYPES)})
+    report = report.sort_values(["_order", "ip"], kind="stable", ignore_index=True)
+    return report[SCAN_REPORT_COLUMNS + ["_label"]]
+
+
+class QueryError(Exception):
+    """查询表达式错误"""
+
+
+class QueryParser:
+    """查询表达式解析器
+
+    语法示例: 分类=服务器 AND (地点~机房A OR ip in 10.0.0.0/8) AND 价格>20000 AND 维护有效期<+30d
+    运算符: = != ~(包含) !~(不包含) > >= < <= in
+    """
+
+    TOKEN_RE = re.compile(r"""
+        \s*(?:
+            (?P<lp>\() | (?P<rp>\)) | (?P<comma>,) |
+            (?P<op>!=|>=|<=|!~|=|~|>|<) |
+            (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*') |
+            (?P<word>[^\s()=!~<>"',]+)
+        )""", re.X)
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.tokens = []
+        self.pos = 0
+
+    def tokenize(self, text):
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = self.TOKEN_RE.match(text, pos)
+            if not match or match.end() == pos:
+                raise QueryError(f"无法识别的字符: {text[pos:pos + 10]}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "str":
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            elif kind == "word" and value.upper() in ("AND", "OR", "NOT", "IN"):
+                kind = value.upper()
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    def parse(self, text):
+        """解析为语法树: ("and"/"or", [子节点]) / ("not", 子节点) / ("cmp", 列名, 运算符, 值)"""
+        self.tokens = self.tokenize(text)
+        self.pos = 0
+        if not self.tokens:
+            raise QueryError("查询表达式为空")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise QueryError(f"多余的内容: {self.tokens[self.pos][1]}")
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind=None):
+        if self.pos >= len(self.tokens):
+            raise QueryError("查询表达式不完整")
+        token = self.tokens[self.pos]
+        if kind and token[0] != kind:
+            raise QueryError(f"此处应为 {kind}，实际为: {token[1]}")
+        self.pos += 1
+        return token
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() == "AND":
+            self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.take()
+            return ("not", self.parse_not())
+        if self.peek() == "lp":
+            self.take()
+            node = self.parse_or()
+            self.take("rp")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        kind, field = self.take()
+        if kind not in ("word", "str"):
+            raise QueryError(f"此处应为字段名，实际为: {field}")
+        column = self.resolve_field(field)
+
+        if self.peek() == "IN":
+            self.take()
+            if self.peek() == "lp":
+                self.take()
+                values = [self.take_value()]
+                while self.peek() == "comma":
+                    self.take()
+                    values.append(self.take_value())
+                self.take("rp")
+                return ("cmp", column, "in", tuple(values))
+            return ("cmp", column, "in", (self.take_value(),))
+
+        op = self.take("op")[1]
+        return ("cmp", column, op, self.take_value())
+
+    def take_value(self):
+        kind, value = self.take()
+        if kind not in ("word", "str"):
+            raise QueryError(f"此处应为查询值，实际为: {value}")
+        return value.strip()
+
+    def resolve_field(self, field):
+        if field in self.columns:
+            return field
+        alias = QUERY_FIELD_ALIASES.get(field.lower())
+        if alias:
+            return alias
+        # 允许列名前缀/包含匹配，如 "维护" -> "维护有效期"
+        candidates = [col for col in self.columns if field in col]
+        if len(candidates) == 1:
+            return candidates[0]
+        raise QueryError(f"未知字段: {field}")
+
+
+class QueryEngine:
+    """查询执行引擎
+
+    表达式只解析一次生成执行计划；等值/列表查询用哈希表把查询值映射为列的因子化编码，
+    再对编码数组计算掩码（仍需扫描一遍编码），其余条件按列向量化计算掩码。
+    结果按 (规范化查询, 数据版本, 当天日期) 缓存，数据变更后自动失效。
+    同一数据版本上可由多个线程并发查询（缓存的读写加锁）。
+    """
+
+    def __init__(self, cache_size=64):
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.plans = OrderedDict()    # 查询文本 -> (规范化查询, 计划)
+        self.results = OrderedDict()  # (规范化查询, 数据版本, 日期) -> 行位置数组
+        self.df = None
+        self.version = None
+        self.indexes = {}             # 列名 -> {规范化值: 编码列表}
+        self.column_cache = {}        # (列名, 类型) -> 向量化后的列
+
+    def bind(self, df, version):
+        """绑定数据；版本变化时丢弃索引与结果缓存"""
+        if version != self.version or df is not self.df:
+            if self.df is None or list(df.columns) != list(self.df.columns):
+                self.plans.clear()
+            self.df = df
+            self.version = version
+            self.indexes.clear()
+            self.column_cache.clear()
+            self.results.clear()
+
+    def compile(self, text):
+        """解析并生成执行计划（按查询文本缓存）"""
+        text = text.strip()
+        if text in self.plans:
+            self.plans.move_to_end(text)
+            return self.plans[text]
+        tree = QueryParser(self.df.columns if self.df is not None else []).parse(text)
+        plan = self.plan(tree)
+        compiled = (self.normalize(plan), plan)
+        self.plans[text] = compiled
+        if len(self.plans) > self.cache_size:
+            self.plans.popitem(last=False)
+        return compiled
+
+    def plan(self, node):
+        """为语法树节点选择执行策略，并把 AND/OR 的子节点按代价排序"""
+        kind = node[0]
+        if kind in ("and", "or"):
+            children = []
+            for child in node[1]:
+                child = self.plan(child)
+                # 展平嵌套的同类节点
+                children.extend(child[1] if child[0] == kind else [child])
+            children.sort(key=self.cost)
+            return (kind, children)
+        if kind == "not":
+            return ("not", self.plan(node[1]))
+
+        _, column, op, value = node
+        if op in ("=", "!=", "in") and column not in NUMERIC_COLUMNS + DATE_COLUMNS:
+            if op == "in" and column == "IP地址" and any("/" in v for v in value):
+                return ("cmp", column, op, value, "ip")
+            return ("cmp", column, op, value, "index")
+        if column in NUMERIC_COLUMNS:
+            return ("cmp", column, op, value, "numeric")
+        if column in DATE_COLUMNS:
+            return ("cmp", column, op, value, "date")
+        if column == "IP地址" and op in (">", ">=", "<", "<="):
+            return ("cmp", column, op, value, "ip")
+        return ("cmp", column, op, value, "scan")
+
+    @staticmethod
+    def cost(node):
+        order = {"index": 0, "numeric": 1, "date": 1, "ip": 1, "scan": 2}
+        if node[0] == "cmp":
+            return order[node[4]]
+        return 3
+
+    def normalize(self, node):
+        """生成规范化查询串（用作结果缓存键）"""
+        kind = node[0]
+        if kind in ("and", "or"):
+            parts = sorted(self.normalize(child) for child in node[1])
+            return f"{kind}(" + ",".join(parts) + ")"
+        if kind == "not":
+            return f"not({self.normalize(node[1])})"
+        _, column, op, value, _ = node
+        if op == "in":
+            value = tuple(sorted(v.lower() for v in value))
+        elif op in ("=", "!=", "~", "!~"):
+            value = value.lower()
+        return f"{column}{op}{value!r}"
+
+    def search(self, df, version, text):
+        """执行查询，返回匹配行的位置数组"""
+        with self.lock:
+            self.bind(df, version)
+            key_query, plan = self.compile(text)
+            key = (key_query, version, datetime.now().date())
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+
+        positions = np.flatnonzero(self.evaluate(plan))
+        with self.lock:
+            self.results[key] = positions
+            if len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+        return positions
+
+    def evaluate(self, node):
+        kind = node[0]
+        n = len(self.df)
+        if kind == "and":
+            mask = np.ones(n, dtype=bool)
+            for child in node[1]:
+                mask &= self.evaluate(child)
+                if not mask.any():
+                    break
+            return mask
+        if kind == "or":
+            mask = np.zeros(n, dtype=bool)
+            for child in node[1]:
+                mask |= self.evaluate(child)
+                if mask.all():
+                    break
+            return mask
+        if kind == "not":
+            return ~self.evaluate(node[1])
+
+        _, column, op, value, strategy = node
+        if column not in self.df.columns:
+            return np.zeros(n, dtype=bool)
+        if strategy == "index":
+            return self.eval_index(column, op, value)
+        if strategy in ("numeric", "date"):
+            if strategy == "numeric":
+                array, parse = self.numeric_column(column), self.parse_number
+            else:
+                array, parse = self.date_column(column), self.parse_date
+            if op == "in":
+                return np.isin(array, [parse(v) for v in value])
+            return self.eval_compare(array, op, parse(value))
+        if strategy == "ip":
+            return self.eval_ip(column, op, value)
+
+        # 字符串运算只作用于唯一值，再按编码映射回各行
+        codes, uniques = self.factorized(column)
+        value = value.lower()
+        if op in ("~", "!~"):
+            hits = np.fromiter((value in u for u in uniques), dtype=bool, count=len(uniques))
+            mask = hits[codes]
+            return ~mask if op == "!~" else mask
+        return self.eval_compare(uniques, op, value)[codes]
+
+    def eval_index(self, column, op, value):
+        index = self.index(column)
+        codes, _ = self.factorized(column)
+        values = value if op == "in" else (value,)
+        wanted = [code for v in values for code in index.get(v.lower(), ())]
+        mask = np.isin(codes, wanted)
+        return ~mask if op == "!=" else mask
+
+    @staticmethod
+    def eval_compare(array, op, value):
+        if op in ("=", "in"):
+            return array == value
+        if op == "!=":
+            return array != value
+        if op == ">":
+            return array > value
+        if op == ">=":
+            return array >= value
+        if op == "<":
+            return array < value
+        if op == "<=":
+            return array <= value
+        raise QueryError(f"该字段不支持运算符 {op}")
+
+    def eval_ip(self, column, op, value):
+        ips = self.ip_column(column)
+        if op == "in":
+            mask = np.zeros(len(ips), dtype=bool)
+            for v in value:
+                try:
+                    network = ipaddress.IPv4Network(v, strict=False)
+                except ValueError:
+                    raise QueryError(f"无效的IP网段: {v}")
+                start = int(network.network_address)
+                end = int(network.broadcast_address)
+                mask |= (ips >= start) & (ips <= end)
+            return mask
+        try:
+            target = int(ipaddress.IPv4Address(value))
+        except ValueError:
+            raise QueryError(f"无效的IP地址: {value}")
+        return (ips >= 0) & self.eval_compare(ips, op, target)
+
+    def index(self, column):
+        """等值哈希索引：规范化值 -> 编码列表"""
+        if column not in self.indexes:
+            _, uniques = self.factorized(column)
+            index = {}
+            for code, value in enumerate(uniques):
+                index.setdefault(value, []).append(code)
+            self.indexes[column] = index
+        return self.indexes[column]
+
+    def factorized(self, column):
+        key = (column, "codes")
+        if key not in self.column_cache:
+            self.column_cache[key] = factorize_text(self.df[column], lower=True)
+        return self.column_cache[key]
+
+    def numeric_column(self, column):
+        key = (column, "numeric")
+        if key not in self.column_cache:
+            self.column_cache[key] = pd.to_numeric(self.df[column], errors="coerce").to_numpy(dtype=float)
+        return self.column_cache[key]
+
+    def date_column(self, column):
+        key = (column, "date")
+        if key not in self.column_cache:
+            # 与校验、到期提醒一致：按唯一值逐格式解析，混合格式的日期也能识别
+            codes, uniques = self.factorized(column)
+            self.column_cache[key] = parse_dates(uniques).astype("datetime64[D]").astype("datetime64[ns]")[codes]
+        return self.column_cache[key]
+
+    def ip_column(self, column):
+        """IPv4 地址转为整数（无效地址为 -1）"""
+        key = (column, "ip")
+        if key not in self.column_cache:
+            codes, uniques = self.factorized(column)
+            self.column_cache[key] = ipv4_to_int(uniques)[codes]
+        return self.column_cache[key]
+
+    @staticmethod
+    def parse_number(value):
+        try:
+            return float(value)
+        except ValueError:
+            raise QueryError(f"无效的数值: {value}")
+
+    @staticmethod
+    def parse_date(value):
+        """支持 today、+30d/-7d/+2w 相对日期以及 yyyy-MM-dd"""
+        today = pd.Timestamp(datetime.now().date())
+        if value.lower() in ("today", "今天"):
+            return today.to_datetime64()
+        match = re.fullmatch(r"([+-]\d+)([dw])", value.lower())
+        if match:
+            days = int(match.group(1)) * (7 if match.group(2) == "w" else 1)
+            return (today + pd.Timedelta(days=days)).to_datetime64()
+        try:
+            return pd.Timestamp(value).normalize().to_datetime64()
+        except (ValueError, TypeError):
+            raise QueryError(f"无效的日期: {value}")
+
+
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_matrix(content):
+    """二维码模块矩阵（含 4 个模块宽的静区），True 为黑色模块；编码较慢，按内容缓存"""
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+    qr.add_data(content)
+    qr.make(fit=True)
+    matrix = np.array(qr.get_matrix(), dtype=bool)
+    matrix.setflags(write=False)
+    return matrix
+
+
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(content, box_size=QR_BOX_SIZE):
+    """把模块矩阵放大为灰度图（每个模块 box_size x box_size 像素，黑 0 白 255），按 (内容, 尺寸) 缓存"""
+    modules = np.where(qr_matrix(content), 0, 255).astype(np.uint8)
+    n = len(modules)
+    pixels = np.broadcast_to(modules[:, None, :, None], (n, box_size, n, box_size)).reshape(n * box_size, n * box_size)
+    pixels.setflags(write=False)
+    return pixels
+
+
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_image(content, box_size=QR_BOX_SIZE):
+    """二维码 QImage（直接由像素数组构造，不经过临时文件），按 (内容, 尺寸) 缓存"""
+    pixels = render_qr(content, box_size)
+    height, width = pixels.shape
+    # QImage 不持有 numpy 数组，复制一份由 QImage 自己管理
+    return QImage(pixels.tobytes(), width, height, width, QImage.Format_Grayscale8).copy()
+
+
+def otsu_threshold(img):
+    return cv2.threshold(img, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+
+
+def qr_decode_variants(img, stages=None):
+    """按代价从低到高依次产出 (阶段, 待识别图像)
+
+    生成器按需计算，识别成功后不再计算后续变体；stages 限定只产出这些阶段（用于测试各阶段效果）。
+    """
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = img.shape[:2]
+    scale = min(1.0, QR_DECODE_MAX_SIDE / max(height, width))
+    if scale < 1:
+        small = cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    else:
+        small = img
+    wanted = lambda stage: stages is None or stage in stages
+
+    # 缩小后的原图（zbar 自带二值化，清晰的照片在这一步即可识别）
+    if wanted("downscale"):
+        yield "downscale", small
+
+    # 定位二维码后从原图中截取并校正透视，小尺寸或倾斜的二维码在原分辨率下更易识别
+    if wanted("roi"):
+        found, points = cv2.QRCodeDetector().detect(small)
+        if found and points is not None:
+            quad = points.reshape(-1, 2)[:4].astype(np.float32) / scale
+            edge = np.linalg.norm(quad - np.roll(quad, 1, axis=0), axis=1).max()
+            side = int(min(max(edge, 200), QR_DECODE_MAX_SIDE))
+            margin = side // 8
+            target = np.float32([[0, 0], [side, 0], [side, side], [0, side]]) + margin
+            matrix = cv2.getPerspectiveTransform(quad, target)
+            roi = cv2.warpPerspective(img, matrix, (side + 2 * margin, side + 2 * margin),
+                                      flags=cv2.INTER_LINEAR, borderValue=255)
+            yield "roi", roi
+            yield "roi", otsu_threshold(roi)
+
+    # 光照不均：自适应阈值，再试全局 Otsu 阈值
+    if wanted("threshold"):
+        block = max(3, min(small.shape[:2]) // 20 | 1)
+        yield "threshold", cv2.adaptiveThreshold(
+            small, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 5
+        )
+        yield "threshold", otsu_threshold(small)
+
+    # 模糊：反锐化掩模
+    if wanted("sharpen"):
+        sharp = cv2.addWeighted(small, 1.8, cv2.GaussianBlur(small, (0, 0), 3), -0.8, 0)
+        yield "sharpen", sharp
+        yield "sharpen", otsu_threshold(sharp)
+
+    # 倾斜：旋转若干角度（画布放大以免裁掉四角）
+    if wanted("rotate"):
+        h, w = small.shape[:2]
+        for angle in (15, -15, 30, -30, 45):
+            matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+            cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+            size = (int(h * sin + w * cos), int(h * cos + w * sin))
+            matrix[:, 2] += (size[0] - w) / 2, (size[1] - h) / 2
+            yield "rotate", cv2.warpAffine(small, matrix, size, borderMode=cv2.BORDER_REPLICATE)
+
+    # 小图：放大 2 倍（解决某些分辨率问题）
+    if wanted("upscale") and max(small.shape[:2]) < QR_DECODE_MAX_SIDE:
+        h, w = small.shape[:2]
+        yield "upscale", cv2.resize(otsu_threshold(small), (w * 2, h * 2), interpolation=cv2.INTER_CUBIC)
+
+
+def decode_qr_cascade(img, stages=None):
+    """按 qr_decode_variants 的顺序识别，第一次成功即停止；返回 (文本, 阶段)，未识别时为 (None, None)"""
+    for stage, candidate in qr_decode_variants(img, stages):
+        decoded_objects = decode(candidate)
+        if decoded_objects:
+            return decoded_objects[0].data.decode("utf-8").strip(), stage
+    return None, None
+
+
+def decode_qr_content(img):
+    """识别灰度图中的二维码，返回第一个二维码的文本；未检测到二维码时返回 None"""
+    return decode_qr_cascade(img)[0]
+
+
+def qr_benchmark_corpus(count=100, size=(4000, 3000), seed=0):
+    """生成二维码识别测试图像：随机大小、位置、透视、模糊、噪声和光照，产出 (图像, 内容, 失真说明)"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for i in range(count):
+        content = f"ZC-{rng.integers(10**7, 10**8)}"
+        code = render_qr(content)
+        side = int(min(width, height) * rng.uniform(0.08, 0.35))
+        code = cv2.resize(code, (side, side), interpolation=cv2.INTER_NEAREST)
+        x, y = rng.integers(0, width - side), rng.integers(0, height - side)
+        quad = np.float32([[0, 0], [side, 0], [side, side], [0, side]])
+        distortions = []
+        target = quad + np.float32([x, y])
+        if rng.random() < 0.5:
+            target += rng.uniform(-0.15, 0.15, (4, 2)).astype(np.float32) * side
+            distortions.append("透视")
+        if rng.random() < 0.3:
+            angle = np.deg2rad(rng.uniform(-40, 40))
+            center = target.mean(axis=0)
+            rotation = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+            target = (target - center) @ rotation.T + center
+            distortions.append("旋转")
+        page = np.full((height, width), 235, dtype=np.uint8)
+        matrix = cv2.getPerspectiveTransform(quad, target.astype(np.float32))
+        img = cv2.warpPerspective(code, matrix, (width, height), dst=page,
+                                  borderMode=cv2.BORDER_TRANSPARENT)
+        # 光照梯度
+        gradient = np.linspace(rng.uniform(0.5, 1.0), 1.0, width, dtype=np.float32)
+        img = img.astype(np.float32) * gradient
+        if rng.random() < 0.4:
+            sigma = rng.uniform(1, 2.5) * side / 300
+            img = cv2.GaussianBlur(img, (0, 0), sigma)
+            distortions.append("模糊")
+        if rng.random() < 0.4:
+            img += rng.normal(0, rng.uniform(8, 25), img.shape).astype(np.float32)
+            distortions.append("噪声")
+        yield np.clip(img, 0, 255).astype(np.uint8), content, "+".join(distortions) or "无"
+
+
+def run_qr_benchmark(count=100, size=(4000, 3000), seed=0):
+    """二维码识别基准测试：输出原方法、级联各阶段单独使用及完整级联的识别率和每秒图像数"""
+    corpus = list(qr_benchmark_corpus(count, size, seed))
+
+    def legacy(img):
+        img = otsu_threshold(img)
+        decoded_objects = decode(img)
+        if not decoded_objects:
+            height, width = img.shape[:2]
+            decoded_objects = decode(cv2.resize(img, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC))
+        return decoded_objects[0].data.decode("utf-8").strip() if decoded_objects else None
+
+    methods = [("原方法（Otsu + 放大 2 倍）", legacy)]
+    methods += [(f"仅 {stage}", functools.partial(lambda img, stage: decode_qr_cascade(img, (stage,))[0], stage=stage))
+                for stage in QR_DECODE_STAGES]
+    methods.append(("完整级联", decode_qr_content))
+
+    print(f"测试图像 {len(corpus)} 张（{size[0]}x{size[1]}）")
+    print(f"{'方法':<24}{'识别率':>8}{'图像/秒':>10}")
+    for name, method in methods:
+        start = time.perf_counter()
+        hits = sum(method(img) == content for img, content, _ in corpus)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24}{hits / len(corpus):>8.1%}{len(corpus) / elapsed:>10.2f}")
+
+    # 完整级联中各阶段首次识别成功的分布，以及各失真类型的识别率
+    by_stage, by_distortion = {}, {}
+    for img, content, distortion in corpus:
+        text, stage = decode_qr_cascade(img)
+        stage = stage if text == content else "未识别"
+        by_stage[stage] = by_stage.get(stage, 0) + 1
+        hits, total = by_distortion.get(distortion, (0, 0))
+        by_distortion[distortion] = (hits + (text == content), total + 1)
+    print("完整级联各阶段识别数: " + ", ".join(
+        f"{stage} {by_stage[stage]}" for stage in QR_DECODE_STAGES + ("未识别",) if stage in by_stage
+    ))
+    for distortion, (hits, total) in sorted(by_distortion.items()):
+        print(f"  {distortion}: {hits}/{total}")
+    return 0
+
+
+def levenshtein(a, b):
+    """编辑距离"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """模糊/拼音检索索引
+
+    每列对不重复的值建立检索键（原文、全拼、拼音首字母）及二元组倒排表；
+    查询时先用二元组重合度筛选候选，再只对候选计算编辑距离排序，避免全量两两比较。
+    数据修改时按删除/新增的值增量维护，只有行到值的映射随数据版本重新计算。
+    """
+
+    MAX_CANDIDATES = 300
+    MIN_SCORE = 0.6
+
+    def __init__(self):
+        self.df = None
+        self.version = None
+        self.columns = {}       # 列名 -> 索引数据
+        self.pinyin_cache = {}  # 原文 -> (全拼, 首字母)，跨数据版本复用
+
+    def bind(self, df, version):
+        if version != self.version or df is not self.df:
+            self.df = df
+            self.version = version
+
+    def clear(self):
+        """数据整体重新加载时清空"""
+        self.columns.clear()
+
+    @staticmethod
+    def grams(text):
+        padded = f"^{text}$"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+    @staticmethod
+    def normalize(values):
+        return pd.Index(values).astype(str).str.strip().str.lower()
+
+    def pinyin_keys(self, text):
+        if lazy_pinyin is None or not re.search(r"[\u4e00-\u9fff]", text):
+            return ()
+        if text not in self.pinyin_cache:
+            syllables = [p for p in lazy_pinyin(text) if p.strip()]
+            self.pinyin_cache[text] = ("".join(syllables), "".join(p[0] for p in syllables))
+        return self.pinyin_cache[text]
+
+    def add_values(self, entry, counts):
+        """登记新出现的值（值 -> 出现次数）：生成检索键并按二元组合并进倒排表"""
+        new_postings = {}
+        for value, count in counts.items():
+            code = entry["codes"].get(value)
+            if code is not None:
+                entry["counts"][code] += count
+                continue
+            code = len(entry["counts"])
+            entry["codes"][value] = code
+            entry["counts"].append(count)
+            for key in (value,) + tuple(self.pinyin_keys(value)):
+                key_id = len(entry["keys"])
+                entry["keys"].append(key)
+                entry["key_codes"].append(code)
+                for gram in self.grams(key):
+                    new_postings.setdefault(gram, []).append(key_id)
+        postings = entry["postings"]
+        for gram, ids in new_postings.items():
+            ids = np.array(ids, dtype=np.int64)
+            postings[gram] = np.concatenate([postings[gram], ids]) if gram in postings else ids
+
+    @classmethod
+    def value_counts(cls, series):
+        text = cls.normalize(series.dropna())
+        return text[text != ""].value_counts()
+
+    def column(self, column):
+        """构建（或取缓存的）列索引，并按当前数据版本映射各行的值编码"""
+        entry = self.columns.get(column)
+        if entry is None:
+            entry = {"codes": {}, "counts": [], "keys": [], "key_codes": [], "postings": {}, "version": None}
+            self.add_values(entry, self.value_counts(self.df[column]))
+            self.columns[column] = entry
+
+        if entry["version"] != self.version:
+            # 行的值编码（不在索引中的空值为 -1）
+            codes, uniques = pd.factorize(self.df[column], sort=False)
+            lookup = np.array([entry["codes"].get(v, -1) for v in self.normalize(uniques)] + [-1], dtype=np.int64)
+            entry["rows"] = lookup[codes]
+            entry["version"] = self.version
+        return entry
+
+    def apply(self, removed=None, added=None):
+        """按删除/新增的行增量更新已建立的列索引"""
+        for column, entry in list(self.columns.items()):
+            if added is not None and column in added.columns:
+                self.add_values(entry, self.value_counts(added[column]))
+            if removed is not None and column in removed.columns:
+                for value, count in self.value_counts(removed[column]).items():
+                    code = entry["codes"].get(value)
+                    if code is not None:
+                        entry["counts"][code] -= count
+            # 已不存在的值过多时丢弃，下次查询重建
+            dead = entry["counts"].count(0)
+            if dead > 1000 and dead * 2 > len(entry["counts"]):
+                del self.columns[column]
+
+    def score(self, query, key):
+        """相关度: 完全匹配 1.0，前缀/包含 0.8~0.95，其余按编辑距离计算"""
+        if query == key:
+            return 1.0
+        if key.startswith(query):
+            return 0.9 + 0.05 * len(query) / len(key)
+        if query in key:
+            return 0.8 + 0.05 * len(query) / len(key)
+        similarity = 1 - levenshtein(query, key) / max(len(query), len(key))
+        # 前缀容错：查询只输入了名称的开头部分
+        if len(key) > len(query):
+            prefix = key[:len(query)]
+            similarity = max(similarity, 0.9 * (1 - levenshtein(query, prefix) / len(query)))
+        return similarity
+
+    def row_scores(self, df, version, column, text):
+        """返回每行的相关度（0 表示不匹配）"""
+        self.bind(df, version)
+        query = text.strip().lower()
+        if column not in df.columns or not query:
+            return np.zeros(len(df))
+
+        entry = self.column(column)
+        # 汉字查询同时按全拼匹配，兼容同音错别字（如 张为 -> 张伟）
+        variants = [(query, 1.0)]
+        pinyin = self.pinyin_keys(query)
+        if pinyin:
+            variants.append((pinyin[0], 0.95))
+        # 已从数据中删除的值不参与候选
+        live = np.asarray(entry["counts"])[entry["key_codes"]] > 0
+        candidates = set()
+        for variant, _ in variants:
+            hits = [entry["postings"][g] for g in self.grams(variant) if g in entry["postings"]]
+            if not hits:
+                continue
+            # 二元组重合数最多的键作为候选
+            counts = np.bincount(np.concatenate(hits), minlength=len(entry["keys"])) * live
+            matched = np.flatnonzero(counts)
+            if len(matched) > self.MAX_CANDIDATES:
+                top = np.argpartition(-counts[matched], self.MAX_CANDIDATES)[:self.MAX_CANDIDATES]
+                matched = matched[top]
+            candidates.update(matched.tolist())
+
+        code_scores = np.zeros(len(entry["counts"]) + 1)  # 末位对应空值（编码 -1）
+        for key_id in candidates:
+            key = entry["keys"][key_id]
+            score = max(self.score(v, key) * weight for v, weight in variants)
+            code = entry["key_codes"][key_id]
+            if score >= self.MIN_SCORE and score > code_scores[code]:
+                code_scores[code] = score
+        return code_scores[entry["rows"]]
+
+    def search(self, df, version, column, text):
+        """返回按相关度降序排列的行位置及相关度"""
+        scores = self.row_scores(df, version, column, text)
+        positions = np.flatnonzero(scores)
+        order = np.argsort(-scores[positions], kind="stable")
+        return positions[order], scores[positions[order]]
+
+
+class PrefixIndex:
+    """列值前缀索引（自动补全用）
+
+    保存按小写排序的不重复值及出现次数，前缀匹配用二分查找定位区间；
+    区间较大时的 Top-K 结果按前缀缓存，值变化时只失效该值的各级前缀。
+    """
+
+    SCAN_LIMIT = 256
+    BULK_LIMIT = 64
+
+    def __init__(self, k=10):
+        self.k = k
+        self.keys = []    # 小写值（排序）
+        self.values = []  # 原始值
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.cache = {}   # 小写前缀 -> Top-K
+
+    @staticmethod
+    def value_counts(series):
+        text = series.dropna().astype(str).str.strip()
+        return text[(text != "") & (text != "nan")].value_counts()
+
+    def build(self, series):
+        self.set_counts(self.value_counts(series))
+
+    def set_counts(self, counts):
+        """以 值 -> 次数 的 Series 重建索引"""
+        keys = counts.index.str.lower()
+        order = np.argsort(keys.to_numpy(dtype=object), kind="stable")
+        self.keys = keys[order].tolist()
+        self.values = counts.index[order].tolist()
+        self.counts = counts.to_numpy(dtype=np.int64)[order]
+        self.cache.clear()
+
+    def apply(self, removed=None, added=None):
+        """按删除/新增的列值增量更新计数"""
+        delta = pd.Series(dtype=np.int64)
+        if added is not None:
+            delta = delta.add(self.value_counts(added), fill_value=0)
+        if removed is not None:
+            delta = delta.sub(self.value_counts(removed), fill_value=0)
+        delta = delta[delta != 0]
+        if len(delta) > self.BULK_LIMIT:
+            # 变化较多时合并后整体重建
+            current = pd.Series(self.counts, index=pd.Index(self.values, dtype=object))
+            merged = current.add(delta, fill_value=0)
+            self.set_counts(merged[merged > 0].astype(np.int64))
+            return
+        for value, change in delta.items():
+            self.update(value, int(change))
+
+    def update(self, value, change):
+        key = value.lower()
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key and self.values[i] != value:
+            i += 1
+        if i < len(self.keys) and self.values[i] == value:
+            self.counts[i] = max(self.counts[i] + change, 0)
+        elif change > 0:
+            self.keys.insert(i, key)
+            self.values.insert(i, value)
+            self.counts = np.insert(self.counts, i, change)
+        for length in range(len(key) + 1):
+            self.cache.pop(key[:length], None)
+
+    def complete(self, prefix):
+        """返回以 prefix 开头、出现次数最多的 k 个值"""
+        key = prefix.strip().lower()
+        if key in self.cache:
+            return self.cache[key]
+
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\U0010ffff", lo)
+        counts = self.counts[lo:hi]
+        if hi - lo > self.k:
+            top = np.argpartition(-counts, self.k)[:self.k]
+        else:
+            top = np.arange(hi - lo)
+        # 次数降序，次数相同按字典序
+        top = top[np.lexsort((top, -counts[top]))]
+        result = [self.values[lo + i] for i in top if counts[i] > 0]
+        if hi - lo > self.SCAN_LIMIT:
+            self.cache[key] = result
+        return result
+
+
+class LocationIndex:
+    """使用地点 → 机柜位置 两级索引：各机柜的行标签集合及资产价格合计，随修改增量维护"""
+
+    BLANK = "（未填写）"
+
+    def __init__(self):
+        self.racks = {}       # 地点 -> {机柜 -> 行标签集合}
+        self.totals = {}      # (地点, 机柜) 或 (地点, None) -> 资产价格合计
+        self.changed = set()  # 数量或合计有变化的 (地点, 机柜)，由界面取走后清空
+
+    @classmethod
+    def locations(cls, frame):
+        """各行的 (地点数组, 机柜数组, 价格数组)；空值归入“未填写”，价格无法识别时按 0 计"""
+        columns = []
+        for col in ["使用地点", "机柜位置"]:
+            if col in frame.columns:
+                codes, uniques = factorize_text(frame[col])
+                uniques[np.isin(uniques, ["", "nan", "None"])] = cls.BLANK
+                columns.append(uniques[codes])
+            else:
+                columns.append(np.full(len(frame), cls.BLANK, dtype=object))
+        if "资产价格" in frame.columns:
+            prices = pd.to_numeric(frame["资产价格"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        else:
+            prices = np.zeros(len(frame))
+        return columns[0], columns[1], prices
+
+    def build(self, df):
+        """根据全部数据重建（按地点、机柜分组一次完成）"""
+        self.racks, self.totals, self.changed = {}, {}, set()
+        if df.empty:
+            return
+        sites, racks, prices = self.locations(df)
+        groups, keys = pd.factorize(pd.MultiIndex.from_arrays([sites, racks]))
+        counts = np.bincount(groups, minlength=len(keys))
+        sums = np.bincount(groups, weights=prices, minlength=len(keys))
+        order = np.argsort(groups, kind="stable")
+        members = np.split(df.index.to_numpy()[order], np.cumsum(counts)[:-1])
+        for (site, rack), labels, total in zip(keys, members, sums.tolist()):
+            self.racks.setdefault(site, {})[rack] = set(labels.tolist())
+            self.totals[(site, rack)] = total
+            self.totals[(site, None)] = self.totals.get((site, None), 0.0) + total
+
+    def apply(self, removed, added, df):
+        """增量更新：removed/added 与 data_changed 相同；修改时未变化的列从当前数据 df 中取"""
+        fields = ["使用地点", "机柜位置", "资产价格"]
+        if removed is not None and added is not None:
+            if not set(fields) & set(added.columns):
+                return
+            current = df.loc[added.index]
+            removed = pd.DataFrame({f: removed[f] if f in removed.columns else current[f]
+                                    for f in fields if f in df.columns}, index=added.index)
+            added = pd.DataFrame({f: added[f] if f in added.columns else current[f]
+                                  for f in fields if f in df.columns}, index=added.index)
+        if removed is not None and len(removed):
+            for label, site, rack, price in zip(removed.index.tolist(), *self.locations(removed)):
+                self.move(label, site, rack, -price, remove=True)
+        if added is not None and len(added):
+            for label, site, rack, price in zip(added.index.tolist(), *self.locations(added)):
+                self.move(label, site, rack, price)
+
+    def move(self, label, site, rack, price, remove=False):
+        racks = self.racks.setdefault(site, {})
+        members = racks.setdefault(rack, set())
+        if remove:
+            members.discard(label)
+        else:
+            members.add(label)
+        for key in ((site, rack), (site, None)):
+            self.totals[key] = self.totals.get(key, 0.0) + price
+        if not members:
+            del racks[rack]
+            del self.totals[(site, rack)]
+            if not racks:
+                del self.racks[site]
+                del self.totals[(site, None)]
+        self.changed.add((site, rack))
+
+    def count(self, site, rack=None):
+        racks = self.racks.get(site, {})
+        if rack is not None:
+            return len(racks.get(rack, ()))
+        return sum(len(members) for members in racks.values())
+
+    def labels(self, site, rack=None):
+        """地点（或地点下某个机柜）的行标签（按标签排序）"""
+        racks = self.racks.get(site, {})
+        if rack is not None:
+            return sorted(racks.get(rack, ()))
+        return sorted(label for members in racks.values() for label in members)
+
+
+class ColumnSortCache:
+    """表格排序/筛选用的列缓存
+
+    每列只排序一次，缓存全部行按该列升序/降序的排列（空值排在最后，相同值保持行顺序），
+    以及小写文本的因子化结果。对查询结果排序时按结果行在排列中的先后取出即可，不需要再排序。
+    列值变化时只失效该列，行增删后行位置改变，全部失效。
+    """
+
+    NUMBER_PATTERN = re.compile(r"\d+")
+
+    def __init__(self):
+        self.orders = {}  # (列名, 是否降序) -> 行位置排列
+        self.texts = {}   # 列名 -> (各行编码, 小写唯一值)
+
+    def invalidate(self, columns=None):
+        if columns is None:
+            self.orders.clear()
+            self.texts.clear()
+            return
+        for col in columns:
+            self.orders.pop((col, False), None)
+            self.orders.pop((col, True), None)
+            self.texts.pop(col, None)
+
+    def sort_keys(self, values, column):
+        """返回 (排序键, 空值标记)：资产编号/机柜位置按自然顺序，价格按数值，日期按时间，IP 按地址"""
+        if column in NUMERIC_COLUMNS or pd.api.types.is_numeric_dtype(values):
+            keys = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+            return keys, np.isnan(keys)
+        if column in DATE_COLUMNS:
+            keys = parse_dates(values)
+            return keys, np.isnat(keys)
+        if column == "IP地址":
+            keys = ipv4_to_int(values)
+            return keys, keys < 0
+        blank = np.isin(values, ["", "nan", "None", "NaT"])
+        if column in NATURAL_SORT_COLUMNS:
+            # 数字部分补零到相同宽度后按文本比较："a-2" -> "a-000000000002"
+            pad = lambda match: match.group().zfill(12)
+            return np.array([self.NUMBER_PATTERN.sub(pad, v.lower()) for v in values], dtype=object), blank
+        return np.array([v.lower() for v in values], dtype=object), blank
+
+    def order(self, df, column, descending=False):
+        """全部行按列排序后的行位置（结果缓存）"""
+        key = (column, descending)
+        if key not in self.orders:
+            series = df[column]
+            if pd.api.types.is_numeric_dtype(series):
+                keys, blank = self.sort_keys(series.to_numpy(), column)
+                codes = None
+            else:
+                # 文本列只需对不重复的值计算排序键
+                codes, uniques = factorize_text(series)
+                keys, blank = self.sort_keys(uniques, column)
+            # 相同的值名次相同，降序时仍保持原有行顺序
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            ranks = np.empty(len(keys), dtype=np.int64)
+            ranks[order] = np.cumsum(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            if descending:
+                ranks = -ranks
+            ranks[blank] = len(keys) + 1
+            if codes is not None:
+                ranks = ranks[codes]
+            self.orders[key] = np.argsort(ranks, kind="stable")
+        return self.orders[key]
+
+    def sort(self, df, column, positions, descending=False):
+        """按列排序行位置：从缓存的排列中取出这些行"""
+        order = self.order(df, column, descending)
+        selected = np.zeros(len(df), dtype=bool)
+        selected[positions] = True
+        return order[selected[order]]
+
+    def contains(self, df, column, text):
+        """各行该列是否包含 text（不区分大小写）"""
+        if column not in self.texts:
+            self.texts[column] = factorize_text(df[column], lower=True)
+        codes, uniques = self.texts[column]
+        text = text.lower()
+        return np.array([text in u for u in uniques], dtype=bool)[codes]
+
+
+class AssetValidator:
+    """资产数据校验
+
+    所有规则按列向量化执行（字符串解析只作用于各列的唯一值），
+    返回逐行问题报告: 行号、资产编号、字段、问题、值。
+    """
+
+    EMPTY_VALUES = ("", "nan", "NaT", "None")
+    REPORT_COLUMNS = ["行号", "资产编号", "字段", "问题", "值"]
+
+    def validate(self, df):
+        self.df = df
+        self.columns = {}
+        problems = []
+
+        if "资产编号" in df.columns:
+            codes, _, empty = self.column("资产编号")
+            problems.append(("资产编号", "资产编号为空", empty[codes]))
+            problems.append(("资产编号", "资产编号重复", self.duplicated("资产编号")))
+        if "设备序列号" in df.columns:
+            problems.append(("设备序列号", "设备序列号重复", self.duplicated("设备序列号")))
+
+        if "IP地址" in df.columns:
+            codes, uniques, empty = self.column("IP地址")
+            bad = (ipv4_to_int(uniques) < 0) & ~empty
+            problems.append(("IP地址", "IP地址格式错误", bad[codes]))
+
+        if "资产价格" in df.columns:
+            codes, uniques, empty = self.column("资产价格")
+            bad = pd.to_numeric(pd.Series(uniques), errors="coerce").isna().to_numpy() & ~empty
+            problems.append(("资产价格", "资产价格不是数字", bad[codes]))
+
+        dates = {}
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                dates[col], bad = self.dates(col)
+                problems.append((col, "日期无法识别", bad))
+        if "维护有效期" in dates and "采购日期" in dates:
+            earlier = dates["维护有效期"] < dates["采购日期"]
+            problems.append(("维护有效期", "维护有效期早于采购日期", earlier))
+
+        return self.report(problems)
+
+    def column(self, col):
+        """返回 (每行编码, 唯一值, 唯一值是否为空)"""
+        if col not in self.columns:
+            codes, uniques = factorize_text(self.df[col])
+            empty = np.zeros(len(uniques), dtype=bool)
+            for value in self.EMPTY_VALUES:
+                empty |= uniques == value
+            self.columns[col] = (codes, uniques, empty)
+        return self.columns[col]
+
+    def duplicated(self, col):
+        """非空值重复出现的行（首尾空白不同视为同一值）"""
+        codes, uniques, empty = self.column(col)
+        # 去空白后可能合并多个原始值，需重新编码
+        normalized = pd.factorize(uniques)[0]
+        repeated = np.bincount(normalized[codes], minlength=len(uniques)) > 1
+        return (repeated[normalized] & ~empty)[codes]
+
+    def dates(self, col):
+        """解析日期列，返回 (日期数组, 无法识别的行)"""
+        codes, uniques, empty = self.column(col)
+        parsed = parse_dates(uniques)
+        bad = np.isnat(parsed) & ~empty
+        return parsed[codes], bad[codes]
+
+    def report(self, problems):
+        frames = []
+        for field, message, mask in problems:
+            positions = np.flatnonzero(mask)
+            if not len(positions):
+                continue
+            codes, uniques, _ = self.column(field)
+            if "资产编号" in self.df.columns:
+                id_codes, id_uniques, _ = self.column("资产编号")
+                ids = id_uniques[id_codes[positions]]
+            else:
+                ids = ""
+            frames.append(pd.DataFrame({
+                "行号": positions + 1,
+                "资产编号": ids,
+                "字段": field,
+                "问题": message,
+                "值": uniques[codes[positions]],
+                "_label": self.df.index[positions],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=self.REPORT_COLUMNS + ["_label"])
+        return pd.concat(frames, ignore_index=True).sort_values("行号", kind="stable", ignore_index=True)
+
+
+class LatencyStats:
+    """按名称统计耗时：累计次数、错误数、总耗时、最大值和直方图，分位数按最近 window 次计算
+
+    名称中的 "." 表示阶段，如 "open_file.parse" 为打开文件的解析阶段。
+    """
+
+    def __init__(self, window=1000, buckets=LATENCY_BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.stats = {}  # 名称 -> [次数, 错误数, 总耗时, 最大耗时, 最近耗时, 各区间次数]
+
+    def record(self, name, seconds, error=False):
+        with self.lock:
+            entry = self.stats.get(name)
+            if entry is None:
+                entry = self.stats[name] = [0, 0, 0.0, 0.0, deque(maxlen=self.window), [0] * (len(self.buckets) + 1)]
+            entry[0] += 1
+            entry[1] += bool(error)
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+            entry[4].append(seconds)
+            entry[5][bisect_left(self.buckets, seconds)] += 1
+
+    @contextmanager
+    def measure(self, name):
+        """统计一段代码的耗时（抛出异常时计为错误）"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(name, time.perf_counter() - start, error=True)
+            raise
+        self.record(name, time.perf_counter() - start)
+
+    def timer(self, name):
+        return OperationTimer(self, name)
+
+    def clear(self):
+        with self.lock:
+            self.stats.clear()
+
+    def snapshot(self, buckets=False):
+        """返回 名称 -> 统计结果（毫秒）；buckets=True 时附带直方图（各区间上限秒数 -> 累计次数）"""
+        with self.lock:
+            entries = {name: (e[0], e[1], e[2], e[3], np.array(e[4]), list(e[5])) for name, e in self.stats.items()}
+        result = {}
+        for name, (count, errors, total, longest, recent, counts) in entries.items():
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000
+            result[name] = {
+                "count": count, "errors": errors,
+                "mean_ms": round(total / count * 1000, 3),
+                "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            if buckets:
+                result[name]["total_s"] = total
+                result[name]["buckets"] = dict(zip([str(b) for b in self.buckets] + ["+Inf"], np.cumsum(counts).tolist()))
+        return result
+
+    def prometheus(self, prefix="itasset_operation", label="operation"):
+        """导出为 Prometheus 文本格式：耗时直方图 <prefix>_seconds 和出错次数 <prefix>_errors_total"""
+        def tag(name):
+            name = name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            return f'{label}="{name}"'
+        
+        snapshot = sorted(self.snapshot(buckets=True).items())
+        lines = [f"# HELP {prefix}_seconds 操作耗时（秒）", f"# TYPE {prefix}_seconds histogram"]
+        for name, entry in snapshot:
+            for bound, count in entry["buckets"].items():
+                lines.append(f'{prefix}_seconds_bucket{{{tag(name)},le="{bound}"}} {count}')
+            lines.append(f"{prefix}_seconds_sum{{{tag(name)}}} {entry['total_s']!r}")
+            lines.append(f"{prefix}_seconds_count{{{tag(name)}}} {entry['count']}")
+        lines += [f"# HELP {prefix}_errors_total 出错次数", f"# TYPE {prefix}_errors_total counter"]
+        lines += [f"{prefix}_errors_total{{{tag(name)}}} {entry['errors']}" for name, entry in snapshot]
+        return "\n".join(lines) + "\n"
+
+
+class OperationTimer:
+    """一次操作的分阶段计时
+
+    各阶段分别计入 "操作名.阶段名"；finish() 时把各阶段的合计计入操作名，
+    因此操作耗时不包含阶段之外等待用户（对话框、消息框）的时间。
+    """
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.total = 0.0
+        self.error = False
+        self.finished = False
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.total += seconds
+            self.stats.record(f"{self.name}.{stage}", seconds, error=self.error)
+
+    def finish(self):
+        """记录操作合计耗时（没有执行任何阶段时不记录）"""
+        if self.total and not self.finished:
+            self.finished = True
+            self.stats.record(self.name, self.total, error=self.error)
+
+
+# 界面操作的耗时统计（帮助 -> 性能统计）
+PERF_STATS = LatencyStats()
+
+
+def timed(name):
+    """装饰器：统计函数的耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PERF_STATS.measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class UndoStack:
+    """撤销/重做栈
+
+    每条记录只保存操作的增量（修改前的单元格、增加或删除的行块），而不是整表快照；
+    历史占用的内存超过预算时丢弃最早的记录。
+    变更格式: ("update", 修改前的单元格, {列名: 新值} 或修改后的单元格) / ("insert", 行块) / ("remove", 行块)
+    """
+
+    def __init__(self, memory_limit=256 * 1024 * 1024):
+        self.memory_limit = memory_limit
+        self.undo_entries = deque()  # (描述, 变更列表, 内存占用)
+        self.redo_entries = []
+        self.memory = 0
+
+    @staticmethod
+    def estimate_size(frame):
+        """按前1000行估算行块内存，避免对大块数据做完整的深度统计"""
+        if len(frame) == 0:
+            return 0
+        sample = frame.iloc[:1000]
+        return int(sample.memory_usage(deep=True).sum() * len(frame) / len(sample))
+
+    def push(self, description, changes):
+        size = sum(self.estimate_size(change[1]) for change in changes)
+        self.undo_entries.append((description, changes, size))
+        self.memory += size
+        for entry in self.redo_entries:
+            self.memory -= entry[2]
+        self.redo_entries.clear()
+        # 至少保留最近一条记录
+        while len(self.undo_entries) > 1 and self.memory > self.memory_limit:
+            self.memory -= self.undo_entries.popleft()[2]
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self.memory = 0
+
+    def undo_text(self):
+        return self.undo_entries[-1][0] if self.undo_entries else None
+
+    def redo_text(self):
+        return self.redo_entries[-1][0] if self.redo_entries else None
+
+    def pop_undo(self):
+        entry = self.undo_entries.pop()
+        self.redo_entries.append(entry)
+        return entry
+
+    def pop_redo(self):
+        entry = self.redo_entries.pop()
+        self.undo_entries.append(entry)
+        return entry
+
+
+class ExpiryMonitor:
+    """维护到期监视：按提醒日期维护最小堆，每次检查只处理提醒日期已到的资产
+
+    堆元素为 (提醒日期, 维护有效期, 行标签)，日期为 date.toordinal()。到期前 warning_days 天提醒“即将到期”，
+    过期次日提醒“已超期”。每行只有 pending 中的元素有效：修改维护有效期时压入新元素，
+    旧元素在出堆时发现已失效直接丢弃；失效元素过多时重建堆。
+    """
+    
+    def __init__(self, warning_days=EXPIRY_WARNING_DAYS):
+        self.warning_days = warning_days
+        self.heap = []
+        self.pending = {}   # 行标签 -> 堆中有效的元素
+        self.alerts = {}    # 行标签 -> (提醒类型, 维护有效期)
+        self.fresh = ([], [])  # 重建时已到提醒日期、尚未报告的行标签
+    
+    @staticmethod
+    def deadlines(frame):
+        """各行的维护有效期（行标签数组, 日期序数数组），无法识别的行不包含在内"""
+        codes, uniques = factorize_text(frame["维护有效期"])
+        parsed = parse_dates(uniques)
+        ordinals = parsed.astype("datetime64[D]").astype(np.int64) + date(1970, 1, 1).toordinal()
+        valid = ~np.isnat(parsed)[codes]
+        return frame.index[valid], ordinals[codes][valid]
+    
+    def build(self, df, today=None):
+        """根据全部数据重建（已到提醒日期的行直接分类，不经过堆）"""
+        self.alerts = {}
+        self.pending = {}
+        self.fresh = ([], [])
+        if "维护有效期" in df.columns:
+            today = (today or date.today()).toordinal()
+            labels, deadlines = self.deadlines(df)
+            expired = deadlines < today
+            expiring = ~expired & (deadlines - self.warning_days <= today)
+            future = ~expired & ~expiring
+            
+            for status, mask in (("已超期", expired), ("即将到期", expiring)):
+                self.alerts.update(zip(labels[mask].tolist(), zip([status] * int(mask.sum()), deadlines[mask].tolist())))
+            self.fresh = (labels[expiring].tolist(), labels[expired].tolist())
+            
+            # 即将到期的行在过期次日再提醒一次
+            days = np.where(expiring, deadlines + 1, deadlines - self.warning_days)
+            pending = expiring | future
+            self.pending = {
+                label: (day, deadline, label)
+                for day, deadline, label in zip(days[pending].tolist(), deadlines[pending].tolist(), labels[pending].tolist())
+            }
+        self.heap = list(self.pending.values())
+        heapq.heapify(self.heap)
+    
+    def apply(self, removed=None, added=None):
+        """增量更新：removed/added 与 data_changed 相同（修改视为先删后增）"""
+        if removed is not None and "维护有效期" in removed.columns:
+            for label in removed.index:
+                self.pending.pop(label, None)
+                self.alerts.pop(label, None)
+        if added is not None and "维护有效期" in added.columns:
+            labels, deadlines = self.deadlines(added)
+            for label, deadline in zip(labels.tolist(), deadlines.tolist()):
+                self.alerts.pop(label, None)
+                self.push(deadline - self.warning_days, deadline, label)
+        if len(self.heap) > 2 * len(self.pending) + 1024:
+            self.heap = list(self.pending.values())
+            heapq.heapify(self.heap)
+    
+    def push(self, day, deadline, label):
+        entry = (day, deadline, label)
+        self.pending[label] = entry
+        heapq.heappush(self.heap, entry)
+    
+    def check(self, today=None):
+        """处理提醒日期已到的资产，返回 (新的即将到期行标签, 新的已超期行标签)"""
+        today = (today or date.today()).toordinal()
+        # 重建后又被修改的行不再按重建时的结果报告
+        expiring, expired = (
+            [label for label in labels if self.alerts.get(label, (None,))[0] == status]
+            for status, labels in zip(("即将到期", "已超期"), self.fresh)
+        )
+        self.fresh = ([], [])
+        while self.heap and self.heap[0][0] <= today:
+            entry = heapq.heappop(self.heap)
+            _, deadline, label = entry
+            if self.pending.get(label) is not entry:
+                continue
+            del self.pending[label]
+            if deadline < today:
+                self.alerts[label] = ("已超期", deadline)
+                expired.append(label)
+            else:
+                self.alerts[label] = ("即将到期", deadline)
+                expiring.append(label)
+                self.push(deadline + 1, deadline, label)
+        return expiring, expired
+    
+    def alert_labels(self):
+        """当前提醒中的行标签（按维护有效期排序）"""
+        return sorted(self.alerts, key=lambda label: self.alerts[label][1])
+
+
+def snapshot_path(folder, sequence):
+    return os.path.join(folder, f"snapshot-{sequence}.bin")
+
+
+def snapshot_codes_dtype(count):
+    """与 pandas 分类编码相同的整数类型（按唯一值个数选择，映射后无需转换）"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if count < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def write_snapshot(df, file_path):
+    """写出只读列式快照：各列为 编码数组 + 唯一值（UTF-8 字节及偏移），另附查询用的数值/日期/IP 数组
+
+    唯一值超过行数一半的列（资产编号、序列号等）不编码，直接按行存放文本。
+    数组按 SNAPSHOT_ALIGN 对齐依次写出，文件末尾为 JSON 目录、目录长度和文件标识。
+    """
+    arrays = {}
+    with open(file_path, "wb") as f:
+        def put(name, array):
+            array = np.ascontiguousarray(array)
+            f.write(bytes(-f.tell() % SNAPSHOT_ALIGN))
+            arrays[name] = [f.tell(), array.dtype.str, len(array)]
+            f.write(array.view(np.uint8))
+
+        f.write(SNAPSHOT_MAGIC)
+        put("index", df.index.to_numpy(dtype=np.int64))
+        for i, col in enumerate(df.columns):
+            codes, uniques = factorize_text(df[col])
+            # 去除首尾空白后可能有重复的唯一值，再合并一次（空值编码为空字符串）
+            merged, uniques = pd.factorize(uniques)
+            codes = merged[codes]
+            encoded = [value.encode("utf-8") for value in uniques]
+            if len(uniques) * 2 > len(df):
+                encoded = [encoded[code] for code in codes]
+            else:
+                put(f"{i}.codes", codes.astype(snapshot_codes_dtype(len(uniques))))
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            put(f"{i}.offsets", offsets)
+            put(f"{i}.text", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+        # 与 QueryEngine 的列缓存相同的数组，查看进程查询时不必再解析
+        engine = QueryEngine()
+        engine.bind(df, 0)
+        indexes = []
+        for col, kind, build in [(col, "numeric", engine.numeric_column) for col in NUMERIC_COLUMNS] + \
+                                [(col, "date", engine.date_column) for col in DATE_COLUMNS] + \
+                                [("IP地址", "ip", engine.ip_column)]:
+            if col in df.columns:
+                put(f"{kind}:{col}", build(col))
+                indexes.append([col, kind])
+
+        header = json.dumps({"rows": len(df), "columns": [str(col) for col in df.columns],
+                             "arrays": arrays, "indexes": indexes}, ensure_ascii=False).encode("utf-8")
+        f.write(header)
+        f.write(np.int64(len(header)).tobytes())
+        f.write(SNAPSHOT_MAGIC)
+
+
+class AssetSnapshot:
+    """内存映射的只读快照
+
+    frame 的各列为分类列（编码直接引用映射的文件内容，多个进程共用同一份物理内存）或按行存放的文本列；
+    安装了 pyarrow 时文本也直接引用文件内容，否则每个进程解码一份文本。
+    column_cache 为 QueryEngine 的数值/日期/IP 列缓存。
+    """
+
+    def __init__(self, file_path):
+        self.buffer = np.memmap(file_path, dtype=np.uint8, mode="r")
+        tail = bytes(self.buffer[-16:])
+        if len(self.buffer) < 24 or bytes(self.buffer[:8]) != SNAPSHOT_MAGIC or tail[8:] != SNAPSHOT_MAGIC:
+            raise AssetFileError(f"不是有效的快照文件: {file_path}")
+        size = int(np.frombuffer(tail[:8], dtype=np.int64)[0])
+        header = json.loads(bytes(self.buffer[-16 - size:-16]).decode("utf-8"))
+        arrays = {name: self.array(*entry) for name, entry in header["arrays"].items()}
+
+        columns = {}
+        for i, col in enumerate(header["columns"]):
+            text = self.strings(arrays[f"{i}.offsets"], arrays[f"{i}.text"])
+            if f"{i}.codes" in arrays:
+                text = pd.Categorical.from_codes(
+                    arrays[f"{i}.codes"], dtype=pd.CategoricalDtype(pd.Index(text)), validate=False
+                )
+            columns[col] = text
+        self.frame = pd.DataFrame(columns, index=pd.Index(arrays["index"]), copy=False)
+        self.column_cache = {(col, kind): arrays[f"{kind}:{col}"] for col, kind in header["indexes"]}
+
+    def array(self, offset, dtype, count):
+        dtype = np.dtype(dtype)
+        return np.asarray(self.buffer[offset:offset + dtype.itemsize * count]).view(dtype)
+
+    @staticmethod
+    def strings(offsets, text):
+        if pyarrow is not None:
+            values = pyarrow.Array.from_buffers(
+                pyarrow.large_string(), len(offsets) - 1,
+                [None, pyarrow.py_buffer(offsets), pyarrow.py_buffer(text)]
+            )
+            return pd.arrays.ArrowStringArray(values)
+        raw = text.tobytes()
+        return np.array([raw[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])],
+                        dtype=object)
+
+
+class SnapshotPublisher:
+    """发布只读快照：写入 snapshot-<序号>.bin 后更新 version 文件（内存映射的 8 字节序号）
+
+    查看进程定时读取序号即可得知数据已更新；owner.json 记录服务地址，查看进程的修改经由该地址提交。
+    """
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        path = os.path.join(folder, "version")
+        if not os.path.exists(path) or os.path.getsize(path) != 8:
+            with open(path, "wb") as f:
+                f.write(bytes(8))
+        # 序号跨服务重启递增，查看进程不会误用重启前同名的快照
+        self.sequence = np.memmap(path, dtype=np.int64, mode="r+", shape=(1,))
+        self.lock = threading.Lock()
+
+    def publish(self, df):
+        with self.lock:
+            sequence = int(self.sequence[0]) + 1
+            path = snapshot_path(self.folder, sequence)
+            write_snapshot(df, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self.sequence[0] = sequence
+            self.sequence.flush()
+            # 保留上一版供正在切换的查看进程打开；仍被映射的文件（Windows）下次再删
+            for name in os.listdir(self.folder):
+                match = re.fullmatch(r"snapshot-(\d+)\.bin", name)
+                if match and int(match.group(1)) < sequence - 1:
+                    try:
+                        os.remove(os.path.join(self.folder, name))
+                    except OSError:
+                        pass
+            return sequence
+
+    def write_owner(self, url):
+        with open(os.path.join(self.folder, "owner.json"), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "pid": os.getpid()}, f)
+
+
+class SiteShardStore:
+    """按使用地点分区的资产目录
+
+    每个使用地点一个 Parquet 分片；manifest.json 记录列名及各地点的分片文件和行数，
+    ids.parquet 记录全部资产编号及所属地点（用于编号唯一性检查）。
+    打开目录时只读取这两个清单文件，分片在需要时才加载。
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    ID_FILE = "ids.parquet"
+
+    def __init__(self, folder):
+        if pyarrow is None:
+            raise AssetFileError("按地点分区存储需要安装 pyarrow（pip install pyarrow）")
+        manifest_path = os.path.join(folder, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise AssetFileError("所选目录不是分区资产目录（缺少 manifest.json）")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.folder = folder
+        self.columns = manifest["columns"]
+        self.sites = manifest["sites"]  # 地点 -> {"file": 分片文件名, "rows": 行数}
+        self.ids = pd.read_parquet(os.path.join(folder, self.ID_FILE))
+        self.loaded = set()
+
+    @classmethod
+    def create(cls, folder, df):
+        """把数据按使用地点写成新的分区目录"""
+        if pyarrow is None:
+            raise AssetFileError("按地点分区存储需要安装 pyarrow（pip install pyarrow）")
+        if os.path.exists(os.path.join(folder, cls.MANIFEST_FILE)):
+            raise AssetFileError("目录中已有分区资产数据，请选择空目录")
+        os.makedirs(folder, exist_ok=True)
+        cls.write_atomic(os.path.join(folder, cls.ID_FILE),
+                         lambda path: pd.DataFrame({"资产编号": [], "使用地点": []}, dtype=object).to_parquet(path))
+        cls.write_atomic(os.path.join(folder, cls.MANIFEST_FILE),
+                         lambda path: cls.write_manifest(path, list(df.columns), {}))
+        store = cls(folder)
+        store.loaded = set(cls.site_names(df))
+        store.save(df)
+        return store
+
+    @staticmethod
+    def site_names(df):
+        """每行所属的地点（去除首尾空白，空值归入默认地点）"""
+        if "使用地点" not in df.columns:
+            return np.full(len(df), DEFAULT_COLUMN_VALUES["使用地点"], dtype=object)
+        codes, uniques = factorize_text(df["使用地点"])
+        uniques[np.isin(uniques, ["", "nan", "None"])] = DEFAULT_COLUMN_VALUES["使用地点"]
+        return uniques[codes]
+
+    @staticmethod
+    def query_site_filter(text, columns):
+        """从查询表达式顶层 AND 条件中提取使用地点限定，返回判断地点是否可能匹配的函数；未限定时返回 None"""
+        tree = QueryParser(columns).parse(text)
+        for node in (tree[1] if tree[0] == "and" else [tree]):
+            if node[0] != "cmp" or node[1] != "使用地点" or node[2] not in ("=", "~", "in"):
+                continue
+            op, value = node[2], node[3]
+            if op == "~":
+                return lambda site: value.lower() in site.lower()
+            values = {v.lower() for v in (value if op == "in" else (value,))}
+            return lambda site: site.lower() in values
+        return None
+
+    @staticmethod
+    def write_atomic(path, writer):
+        # 先写临时文件再替换，中途出错不会损坏原文件
+        temp_path = path + ".saving"
+        writer(temp_path)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def write_manifest(path, columns, sites):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "sites": sites}, f, ensure_ascii=False, indent=1)
+
+    @staticmethod
+    def storable(df):
+        """Parquet 要求每列类型一致：混合类型的列统一转为文本（保留空值）"""
+        frame = df.reset_index(drop=True)
+        for col in frame.columns:
+            values = frame[col]
+            if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) != "string":
+                frame[col] = values.where(values.isna(), values.astype(str))
+        return frame
+
+    def all_sites(self):
+        return list(self.sites) + sorted(self.loaded - set(self.sites))
+
+    def unloaded_sites(self):
+        return [site for site in self.sites if site not in self.loaded]
+
+    def load(self, sites):
+        """读取尚未加载的地点分片，返回合并后的数据"""
+        sites = [site for site in sites if site not in self.loaded]
+        frames = [
+            pd.read_parquet(os.path.join(self.folder, self.sites[site]["file"]))
+            for site in sites if site in self.sites
+        ]
+        # 目录中还没有分片的新地点也记为已加载，保存时为其创建分片
+        self.loaded.update(sites)
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def sites_of(self, asset_ids):
+        """给定资产编号所在的未加载地点"""
+        asset_ids = pd.Series(list(asset_ids), dtype=object).astype(str).str.strip()
+        hits = self.ids[self.ids["资产编号"].isin(asset_ids) & ~self.ids["使用地点"].isin(list(self.loaded))]
+        return hits["使用地点"].unique().tolist()
+
+    def id_exists(self, asset_id):
+        """资产编号是否已存在于未加载的地点（已加载地点由调用方检查当前数据）"""
+        return bool(self.sites_of([asset_id]))
+
+    def save(self, df):
+        """写回已加载地点的分片并更新清单；未加载地点的分片保持不变
+
+        df 为全部已加载地点的数据，其中出现的地点须均已加载。
+        """
+        sites = self.site_names(df)
+        unknown = set(sites) - self.loaded
+        if unknown:
+            raise AssetFileError(f"数据中含有未加载的地点: {', '.join(sorted(unknown))}")
+        
+        frame = self.storable(df)
+        numbers = [int(re.search(r"\d+", info["file"]).group()) for info in self.sites.values()]
+        next_number = max(numbers, default=0) + 1
+        written = set()
+        for site, rows in frame.groupby(sites, sort=False):
+            info = self.sites.get(site)
+            if info is None:
+                info = {"file": f"site_{next_number:04d}.parquet"}
+                next_number += 1
+            self.write_atomic(os.path.join(self.folder, info["file"]),
+                              lambda path: rows.to_parquet(path, index=False))
+            self.sites[site] = {"file": info["file"], "rows": len(rows)}
+            written.add(site)
+        
+        # 已加载但记录已全部删除或移走的地点，分片文件在新清单写好后再删除
+        orphans = [self.sites.pop(site)["file"] for site in self.loaded - written if site in self.sites]
+        
+        codes, uniques = factorize_text(df["资产编号"])
+        ids = pd.DataFrame({"资产编号": uniques[codes], "使用地点": sites})
+        self.ids = pd.concat(
+            [self.ids[~self.ids["使用地点"].isin(list(self.loaded))], ids], ignore_index=True
+        )
+        self.loaded = written
+        self.columns = list(df.columns)
+        self.write_atomic(os.path.join(self.folder, self.ID_FILE),
+                          lambda path: self.ids.to_parquet(path, index=False))
+        self.write_atomic(os.path.join(self.folder, self.MANIFEST_FILE),
+                          lambda path: self.write_manifest(path, self.columns, self.sites))
+        for file_name in orphans:
+            os.remove(os.path.join(self.folder, file_name))
+
+
+class AssetTableModel(QAbstractTableModel):
+    """资产表格模型：第 row 行显示 frame 中位置为 positions[row] 的数据
+
+    排序和筛选只替换位置数组，表格只读取可见区域的单元格，不为每个单元格创建表格项。
+    """
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.header_tips = [None] * len(headers)
+        self.frame = pd.DataFrame(columns=TABLE_COLUMNS)
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.issues = {}  # 行标签 -> 校验问题说明
+        self.expiry = None  # 各数据行的维护有效期（datetime64，无法识别为 NaT），用于标记即将/已过期
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.positions)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(TABLE_COLUMNS)
+
+    def set_view(self, frame, positions, issues=None, expiry=None):
+        """替换显示的行；同一数据只是重新排序时发出 layoutChanged，选中行和当前行跟随原记录"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if frame is not self.frame or len(positions) != len(self.positions):
+            self.beginResetModel()
+            self.frame, self.positions, self.issues, self.expiry = frame, positions, issues or {}, expiry
+            self.endResetModel()
+            return
+        
+        self.layoutAboutToBeChanged.emit()
+        old = self.positions
+        self.positions, self.issues, self.expiry = positions, issues or {}, expiry
+        persistent = self.persistentIndexList()
+        if persistent:
+            rows = np.full(len(frame), -1, dtype=np.int64)
+            rows[positions] = np.arange(len(positions))
+            rows = rows[old[[index.row() for index in persistent]]]
+            self.changePersistentIndexList(persistent, [
+                self.index(int(row), index.column()) if row >= 0 else QModelIndex()
+                for row, index in zip(rows, persistent)
+            ])
+        self.layoutChanged.emit()
+
+    def refresh_rows(self, rows, columns):
+        """数据已就地修改：通知表格重绘指定的显示行和列"""
+        self.dataChanged.emit(self.index(int(min(rows)), min(columns)), self.index(int(max(rows)), max(columns)))
+
+    def set_header(self, section, text, tip=None):
+        self.headers[section], self.header_tips[section] = text, tip
+        self.headerDataChanged.emit(Qt.Horizontal, section, section)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            if role == Qt.DisplayRole:
+                return self.headers[section]
+            if role == Qt.ToolTipRole:
+                return self.header_tips[section]
+        elif role == Qt.DisplayRole:
+            return section + 1
+        return None
+
+    def text(self, row, col):
+        """单元格文本（col 为列名）"""
+        if col not in self.frame.columns:
+            return ""
+        value = self.frame[col].iat[self.positions[row]]
+        return str(value) if pd.notna(value) else ""
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), TABLE_COLUMNS[index.column()]
+        if role == Qt.DisplayRole:
+            return self.text(row, col)
+        if role == Qt.ToolTipRole:
+            return self.issues.get(self.frame.index[self.positions[row]]) if self.issues else None
+        if role == Qt.BackgroundRole:
+            return self.background(row, col)
+        return None
+
+    def background(self, row, col):
+        """状态/有效期/校验问题的背景色标记"""
+        # 标记校验有问题的行
+        if col == TABLE_COLUMNS[0]:
+            if self.issues and self.frame.index[self.positions[row]] in self.issues:
+                return QColor(255, 200, 120)
+        
+        # 标记特殊状态
+        elif col == "设备当前状态":
+            color = {"维修中": Qt.yellow, "报废中": Qt.red, "更换为新设备": Qt.green}.get(self.text(row, col))
+            if color is not None:
+                return QColor(color)
+        
+        # 标记即将/已过期的维护有效期
+        elif col == "维护有效期" and self.expiry is not None:
+            expiry_date = self.expiry[self.positions[row]]
+            if not np.isnat(expiry_date):
+                today = np.datetime64(date.today(), "ns")
+                if expiry_date < today:
+                    return QColor(Qt.red)
+                if expiry_date <= today + np.timedelta64(EXPIRY_WARNING_DAYS, "D"):
+                    return QColor(Qt.yellow)
+        return None
+
 
 class AssetEditDialog(QDialog):
     def __init__(self, asset_data=None, parent=None):
@@ -105,6 +2825,13 @@ class AssetEditDialog(QDialog):
         asset_id_layout.addWidget(qr_btn)
         basic_layout.addRow("资产编号", asset_id_layout)
         
+        # 二维码预览（随资产编号输入实时更新）
+        self.qr_preview = QLabel()
+        self.qr_preview.setFixedSize(QR_PREVIEW_SIZE, QR_PREVIEW_SIZE)
+        self.qr_preview.setAlignment(Qt.AlignCenter)
+        self.fields["资产编号"].textChanged.connect(self.update_qr_preview)
+        basic_layout.addRow("二维码预览", self.qr_preview)
+        
         basic_layout.addRow("资产名称", self.fields["资产名称"])
         basic_layout.addRow("设备型号", self.fields["设备型号"])
         basic_layout.addRow("设备分类", self.fields["设备分类"])
@@ -172,86 +2899,309 @@ class AssetEditDialog(QDialog):
         add_btn.clicked.connect(lambda: self.done(2))  # 自定义返回码2表示添加操作
         button_box.addButton(add_btn, QDialogButtonBox.ActionRole)
         
-        del_btn = QPushButton("Delete")
-        del_btn.clicked.connect(lambda: self.done(3))  # 自定义返回码3表示删除操作
-        button_box.addButton(del_btn, QDialogButtonBox.ActionRole)
+        del_btn = QPushButton("Delete")
+        del_btn.clicked.connect(lambda: self.done(3))  # 自定义返回码3表示删除操作
+        button_box.addButton(del_btn, QDialogButtonBox.ActionRole)
+        
+        layout.addRow(button_box)
+
+    def generate_qr_code(self):
+        """生成资产编号二维码"""
+        asset_id = self.fields["资产编号"].text().strip()
+        if not asset_id:
+            QMessageBox.warning(self, "警告", "请先填写资产编号")
+            return
+        
+        timer = PERF_STATS.timer("generate_qr_code")
+        try:
+            try:
+                with timer.stage("render"):
+                    img = render_qr_image(asset_id)
+            except (ValueError, qrcode.exceptions.DataOverflowError):  # 超出二维码最大容量
+                QMessageBox.warning(self, "警告", "资产编号过长，无法生成二维码")
+                return
+            
+            # 弹出保存对话框
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "保存二维码", f"{asset_id}_二维码.png", "PNG图像 (*.png)"
+            )
+            
+            if file_path:
+                if not file_path.endswith('.png'):
+                    file_path += '.png'
+                with timer.stage("write"):
+                    saved = img.convertToFormat(QImage.Format_Mono).save(file_path, "PNG")
+                if saved:
+                    QMessageBox.information(self, "成功", f"二维码已保存到: {file_path}")
+                else:
+                    QMessageBox.critical(self, "错误", f"无法保存二维码: {file_path}")
+        finally:
+            timer.finish()
+
+    def update_qr_preview(self, text):
+        """按当前资产编号更新二维码预览（模块放大到不超过预览框的整数倍，保持清晰）"""
+        text = text.strip()
+        if not text:
+            self.qr_preview.clear()
+            return
+        try:
+            with PERF_STATS.measure("qr_preview"):
+                box_size = max(1, QR_PREVIEW_SIZE // len(qr_matrix(text)))
+                self.qr_preview.setPixmap(QPixmap.fromImage(render_qr_image(text, box_size)))
+        except (ValueError, qrcode.exceptions.DataOverflowError):  # 超出二维码最大容量
+            self.qr_preview.setText("内容过长")
+
+    def populate_form(self):
+        """填充表单数据"""
+        for field_name, widget in self.fields.items():
+            if field_name in self.asset_data:
+                value = str(self.asset_data[field_name]) if pd.notna(self.asset_data[field_name]) else ""
+                if isinstance(widget, QLineEdit):
+                    widget.setText(value)
+                elif isinstance(widget, QDateEdit):
+                    if value:
+                        date = QDate.fromString(value, "yyyy-MM-dd")
+                        if date.isValid():
+                            widget.setDate(date)
+                elif isinstance(widget, QComboBox):
+                    index = widget.findText(value)
+                    if index >= 0:
+                        widget.setCurrentIndex(index)
+
+    def get_data(self):
+        """获取表单数据"""
+        data = {}
+        for field_name, widget in self.fields.items():
+            if isinstance(widget, QLineEdit):
+                data[field_name] = widget.text()
+            elif isinstance(widget, QDateEdit):
+                data[field_name] = widget.date().toString("yyyy-MM-dd")
+            elif isinstance(widget, QComboBox):
+                data[field_name] = widget.currentText()
+        
+        # 设置默认值
+        if "备注" not in data or not data["备注"]:
+            data["备注"] = "维修更换信息：无维修或补充"
+        if "使用地点" not in data or not data["使用地点"]:
+            data["使用地点"] = "未指定"
+        if "机柜位置" not in data or not data["机柜位置"]:
+            data["机柜位置"] = "未指定"
+        if "设备当前状态" not in data or not data["设备当前状态"]:
+            data["设备当前状态"] = "未投入使用"
+            
+        return data
+
+class BulkEditDialog(QDialog):
+    """批量修改对话框：勾选要修改的字段，统一设置为新值"""
+
+    def __init__(self, selected_count, displayed_count, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量修改资产")
+        self.setWindowModality(Qt.ApplicationModal)
+        self.resize(500, 450)
+        
+        layout = QFormLayout()
+        
+        # 修改范围
+        self.scope = QComboBox()
+        self.scope.addItem(f"选中的 {selected_count} 条资产")
+        self.scope.addItem(f"当前显示的 {displayed_count} 条资产")
+        self.scope.setCurrentIndex(0 if selected_count else 1)
+        layout.addRow("修改范围", self.scope)
+        
+        # 可批量修改的字段（资产编号、序列号、IP等唯一字段除外）
+        self.fields = {
+            "设备分类": QComboBox(),
+            "设备当前状态": QComboBox(),
+            "使用地点": QLineEdit(),
+            "机柜位置": QLineEdit(),
+            "项目名称": QLineEdit(),
+            "负责人": QLineEdit(),
+            "供应商名称": QLineEdit(),
+            "供应商负责人": QLineEdit(),
+            "维护有效期": QDateEdit(),
+            "备注": QLineEdit(),
+        }
+        self.fields["设备分类"].addItems(["服务器", "网络设备", "存储设备", "PC", "笔记本", "打印机", "其他"])
+        self.fields["设备当前状态"].addItems([
+            "未投入使用", "使用中", "维修中", "维修结束", 
+            "报废中", "报废流程结束", "更换为新设备"
+        ])
+        self.fields["维护有效期"].setDisplayFormat("yyyy-MM-dd")
+        self.fields["维护有效期"].setCalendarPopup(True)
+        self.fields["维护有效期"].setDate(QDate.currentDate())
+        
+        self.checks = {}
+        for field_name, widget in self.fields.items():
+            check = QCheckBox(field_name)
+            widget.setEnabled(False)
+            check.toggled.connect(widget.setEnabled)
+            self.checks[field_name] = check
+            layout.addRow(check, widget)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addRow(button_box)
+        
+        self.setLayout(layout)
+
+    def use_selection(self):
+        return self.scope.currentIndex() == 0
+
+    def get_values(self):
+        """获取勾选字段的新值"""
+        values = {}
+        for field_name, widget in self.fields.items():
+            if not self.checks[field_name].isChecked():
+                continue
+            if isinstance(widget, QLineEdit):
+                values[field_name] = widget.text().strip()
+            elif isinstance(widget, QDateEdit):
+                values[field_name] = widget.date().toString("yyyy-MM-dd")
+            elif isinstance(widget, QComboBox):
+                values[field_name] = widget.currentText()
+        return values
+
+
+class SiteSelectDialog(QDialog):
+    """选择要加载的使用地点"""
+
+    def __init__(self, site_rows, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("选择使用地点")
+        self.setWindowModality(Qt.ApplicationModal)
+        self.resize(360, 450)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("只加载选中地点的资产，其他地点在查询需要时再加载："))
+        
+        self.site_list = QListWidget()
+        for site, rows in site_rows.items():
+            item = QListWidgetItem(f"{site}（{rows} 条）")
+            item.setData(Qt.UserRole, site)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.site_list.addItem(item)
+        layout.addWidget(self.site_list)
         
-        layout.addRow(button_box)
+        select_layout = QHBoxLayout()
+        select_all_btn = QPushButton("全选")
+        select_all_btn.clicked.connect(lambda: self.set_all(Qt.Checked))
+        select_none_btn = QPushButton("全不选")
+        select_none_btn.clicked.connect(lambda: self.set_all(Qt.Unchecked))
+        select_layout.addWidget(select_all_btn)
+        select_layout.addWidget(select_none_btn)
+        layout.addLayout(select_layout)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
 
-    def generate_qr_code(self):
-        """生成资产编号二维码"""
-        asset_id = self.fields["资产编号"].text()
-        if not asset_id:
-            QMessageBox.warning(self, "警告", "请先填写资产编号")
+    def set_all(self, state):
+        for i in range(self.site_list.count()):
+            self.site_list.item(i).setCheckState(state)
+
+    def accept(self):
+        if not self.selected_sites():
+            QMessageBox.warning(self, "警告", "请至少选择一个地点")
             return
+        super().accept()
+
+    def selected_sites(self):
+        return [
+            self.site_list.item(i).data(Qt.UserRole)
+            for i in range(self.site_list.count())
+            if self.site_list.item(i).checkState() == Qt.Checked
+        ]
+
+
+class PerformanceDialog(QDialog):
+    """性能统计面板：各操作及其阶段的耗时分布，可导出为 JSON 或 Prometheus 文本"""
+
+    COLUMNS = ["操作", "次数", "出错", "平均(ms)", "P50(ms)", "P95(ms)", "P99(ms)", "最大(ms)"]
+    KEYS = ["count", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+    def __init__(self, stats, parent=None):
+        super().__init__(parent)
+        self.stats = stats
+        self.setWindowTitle("性能统计")
+        self.resize(760, 480)
         
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(asset_id)
-        qr.make(fit=True)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("各操作的耗时（不含等待对话框的时间），缩进行为该操作的各阶段："))
         
-        img = qr.make_image(fill_color="black", back_color="white")
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        layout.addWidget(self.table)
         
-        # 弹出保存对话框
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "保存二维码", f"{asset_id}_二维码.png", "PNG图像 (*.png)"
-        )
+        button_layout = QHBoxLayout()
+        for text, slot in [
+            ("刷新", self.refresh), ("清空", self.clear_stats),
+            ("导出 JSON...", self.export_json), ("导出 Prometheus...", self.export_prometheus),
+        ]:
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        button_layout.addStretch()
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
         
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        snapshot = self.stats.snapshot()
+        # 阶段排在所属操作之后
+        names = sorted(snapshot, key=lambda name: name.split("."))
+        self.table.setRowCount(len(names))
+        for i, name in enumerate(names):
+            operation, _, stage = name.partition(".")
+            self.table.setItem(i, 0, QTableWidgetItem(f"    {stage}" if stage else operation))
+            for j, key in enumerate(self.KEYS, start=1):
+                item = QTableWidgetItem(str(snapshot[name][key]))
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(i, j, item)
+        self.table.resizeColumnsToContents()
+
+    def clear_stats(self):
+        self.stats.clear()
+        self.refresh()
+
+    def export_json(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出性能统计", "performance.json", "JSON文件 (*.json)")
         if file_path:
-            if not file_path.endswith('.png'):
-                file_path += '.png'
-            img.save(file_path)
-            QMessageBox.information(self, "成功", f"二维码已保存到: {file_path}")
+            data = {"generated_at": datetime.now().isoformat(timespec="seconds"),
+                    "operations": self.stats.snapshot(buckets=True)}
+            self.write_export(file_path, json.dumps(data, ensure_ascii=False, indent=2))
 
-    def populate_form(self):
-        """填充表单数据"""
-        for field_name, widget in self.fields.items():
-            if field_name in self.asset_data:
-                value = str(self.asset_data[field_name]) if pd.notna(self.asset_data[field_name]) else ""
-                if isinstance(widget, QLineEdit):
-                    widget.setText(value)
-                elif isinstance(widget, QDateEdit):
-                    if value:
-                        date = QDate.fromString(value, "yyyy-MM-dd")
-                        if date.isValid():
-                            widget.setDate(date)
-                elif isinstance(widget, QComboBox):
-                    index = widget.findText(value)
-                    if index >= 0:
-                        widget.setCurrentIndex(index)
+    def export_prometheus(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出性能统计", "itasset.prom", "Prometheus文本 (*.prom *.txt)")
+        if file_path:
+            self.write_export(file_path, self.stats.prometheus())
+
+    def write_export(self, file_path, text):
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            QMessageBox.information(self, "成功", f"性能统计已导出到: {file_path}")
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"无法导出性能统计: {str(e)}")
 
-    def get_data(self):
-        """获取表单数据"""
-        data = {}
-        for field_name, widget in self.fields.items():
-            if isinstance(widget, QLineEdit):
-                data[field_name] = widget.text()
-            elif isinstance(widget, QDateEdit):
-                data[field_name] = widget.date().toString("yyyy-MM-dd")
-            elif isinstance(widget, QComboBox):
-                data[field_name] = widget.currentText()
-        
-        # 设置默认值
-        if "备注" not in data or not data["备注"]:
-            data["备注"] = "维修更换信息：无维修或补充"
-        if "使用地点" not in data or not data["使用地点"]:
-            data["使用地点"] = "未指定"
-        if "机柜位置" not in data or not data["机柜位置"]:
-            data["机柜位置"] = "未指定"
-        if "设备当前状态" not in data or not data["设备当前状态"]:
-            data["设备当前状态"] = "未投入使用"
-            
-        return data
 
 class AssetManagementSystem(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setup_ui()
         self.setup_timer()
+        self.setup_expiry_monitor()
 
     def setup_timer(self):
         """设置使用时长计时器"""
@@ -267,6 +3217,103 @@ class AssetManagementSystem(QMainWindow):
             self.timer.stop()
             self.show_appreciation_message()
 
+    def setup_expiry_monitor(self):
+        """设置维护到期提醒（系统托盘不可用时在状态栏提示）"""
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.timeout.connect(self.check_expiry)
+        self.expiry_timer.start(EXPIRY_CHECK_INTERVAL)
+        
+        self.tray_icon = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray_icon = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_MessageBoxWarning), self)
+            self.tray_icon.setToolTip("IT资产管理系统")
+            self.tray_icon.messageClicked.connect(self.show_expiry_alerts)
+            self.tray_icon.show()
+
+    def check_expiry(self):
+        """处理新到提醒日期的资产并提示；每天第一次检查时写出到期摘要"""
+        if not self.expiry_action.isChecked() or self.assets_df.empty:
+            return
+        expiring, expired = self.expiry_monitor.check()
+        
+        today = date.today()
+        digest_dir = self.expiry_settings.get("digest_dir")
+        if digest_dir and self.expiry_digest_date != today:
+            self.expiry_digest_date = today
+            try:
+                self.write_expiry_digest(digest_dir, today)
+            except OSError as e:
+                self.statusBar().showMessage(f"无法写出维护到期摘要: {str(e)}", 10000)
+        
+        if not expiring and not expired:
+            return
+        ids = self.assets_df.loc[(expired + expiring)[:5], "资产编号"].astype(str).tolist()
+        text = f"{len(expired)} 项维护已超期，{len(expiring)} 项将在 {EXPIRY_WARNING_DAYS} 天内到期: {', '.join(ids)}"
+        if len(expired) + len(expiring) > len(ids):
+            text += " 等"
+        if self.tray_icon is not None:
+            self.tray_icon.showMessage("维护到期提醒", text, QSystemTrayIcon.Warning, 10000)
+        else:
+            self.statusBar().showMessage(f"维护到期提醒: {text}", 30000)
+
+    def write_expiry_digest(self, digest_dir, today):
+        """写出当天的维护到期摘要（已超期和即将到期的资产）"""
+        labels = [label for label in self.expiry_monitor.alert_labels() if label in self.assets_df.index]
+        columns = [col for col in ["资产编号", "资产名称", "使用地点", "负责人", "维护有效期"] if col in self.assets_df.columns]
+        digest = self.assets_df.loc[labels, columns].copy()
+        alerts = [self.expiry_monitor.alerts[label] for label in labels]
+        digest["提醒"] = [status for status, _ in alerts]
+        digest["剩余天数"] = [deadline - today.toordinal() for _, deadline in alerts]
+        digest.to_csv(
+            os.path.join(digest_dir, f"维护到期摘要_{today.isoformat()}.csv"),
+            index=False, encoding="utf-8-sig"
+        )
+
+    def show_expiry_alerts(self):
+        """在表格中显示当前提醒中的资产"""
+        labels = [label for label in self.expiry_monitor.alert_labels() if label in self.assets_df.index]
+        if not labels:
+            QMessageBox.information(self, "提示", "没有已超期或即将到期的资产")
+            return
+        self.showNormal()
+        self.activateWindow()
+        self.display_assets(self.assets_df.loc[labels])
+
+    def toggle_expiry_monitor(self, enabled):
+        self.expiry_settings["enabled"] = enabled
+        self.write_expiry_settings()
+        if enabled:
+            self.check_expiry()
+
+    def set_expiry_digest_dir(self):
+        """选择每日到期摘要的存放目录（取消则停止写出摘要）"""
+        digest_dir = QFileDialog.getExistingDirectory(
+            self, "选择每日到期摘要目录", self.expiry_settings.get("digest_dir", "")
+        )
+        if digest_dir:
+            self.expiry_settings["digest_dir"] = digest_dir
+            self.expiry_digest_date = None
+            self.statusBar().showMessage(f"每日到期摘要将写入: {digest_dir}", 5000)
+        elif self.expiry_settings.pop("digest_dir", None):
+            self.statusBar().showMessage("已停止写出每日到期摘要", 5000)
+        self.write_expiry_settings()
+        self.check_expiry()
+
+    def load_expiry_settings(self):
+        try:
+            with open(EXPIRY_SETTINGS_FILE, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+            return settings if isinstance(settings, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def write_expiry_settings(self):
+        try:
+            with open(EXPIRY_SETTINGS_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.expiry_settings, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            QMessageBox.warning(self, "警告", f"无法保存提醒设置: {str(e)}")
+
     def show_appreciation_message(self):
         """显示赞赏信息"""
         msg = QMessageBox(self)
@@ -302,6 +3349,14 @@ class AssetManagementSystem(QMainWindow):
         
         # 初始化数据
         self.current_file = None
+        self.displayed_labels = pd.Index([])
+        self.result_labels = None     # 当前查询结果的行标签（None 表示全部数据）
+        self.sort_cache = ColumnSortCache()
+        self.sort_column = None
+        self.sort_descending = False
+        self.column_filters = {}      # 列名 -> 包含的文本
+        self.next_label = 0  # 新增行使用的行标签（行标签在撤销/重做间保持不变）
+        self.undo_stack = UndoStack()
         self.assets_df = pd.DataFrame(columns=[
             "资产编号", "资产名称", "设备型号", "设备分类", "设备序列号", 
             "IP地址", "使用地点", "机柜位置", 
@@ -311,6 +3366,49 @@ class AssetManagementSystem(QMainWindow):
             "设备当前状态", "备注"
         ])
         
+        # 数据版本号（每次修改数据递增，用于查询缓存失效）
+        self.data_version = 0
+        self.query_engine = QueryEngine()
+        self.fuzzy_index = FuzzyIndex()
+        self.completion_indexes = {}  # 查询字段 -> PrefixIndex
+        self.validator = AssetValidator()
+        self.validation_report = None
+        self.validation_version = None
+        self.validation_issues = {}   # 行标签 -> 问题说明
+        
+        # 监视当前文件的外部修改
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_file_changed)
+        self.file_change_timer = QTimer(self)
+        self.file_change_timer.setSingleShot(True)
+        self.file_change_timer.timeout.connect(self.check_external_changes)
+        self.file_hashes = pd.Series(dtype=np.uint64)  # 资产编号 -> 文件中该行的哈希
+        self.file_stamp = None                          # 最近一次同步时文件的 (修改时间, 大小)
+        self.dirty_ids = set()                          # 同步后本地修改过的资产编号
+        self.conflict_ids = set()
+        
+        # 按地点分区的资产目录（未打开时为 None）
+        self.shard_store = None
+        self.load_all_sites_on_search = None  # 查询未限定地点时是否加载全部地点（首次询问后记住）
+        self.saved_queries = self.load_saved_queries()
+        
+        # 维护到期提醒
+        self.expiry_monitor = ExpiryMonitor()
+        self.expiry_settings = self.load_expiry_settings()
+        self.expiry_digest_date = None  # 最近一次写出摘要的日期
+        
+        # 最近一次网络扫描核对的报告
+        self.scan_report = None
+        
+        # 只读查看模式（--viewer）：快照目录、已加载的快照序号、服务进程地址
+        self.snapshot_folder = None
+        self.snapshot_loaded = None
+        self.snapshot_owner = None
+        
+        # 地点/机柜位置树
+        self.location_index = LocationIndex()
+        self.location_items = {}  # (地点, 机柜) -> 树节点（机柜为 None 表示地点节点）
+        
         self.create_menu_bar()
         self.setup_main_window()
 
@@ -325,6 +3423,10 @@ class AssetManagementSystem(QMainWindow):
         open_action.triggered.connect(self.open_file)
         file_menu.addAction(open_action)
         
+        open_files_action = QAction("打开多个文件...", self)
+        open_files_action.triggered.connect(self.open_files)
+        file_menu.addAction(open_files_action)
+        
         import_action = QAction("导入", self)
         import_action.triggered.connect(self.import_data)
         file_menu.addAction(import_action)
@@ -341,10 +3443,32 @@ class AssetManagementSystem(QMainWindow):
         save_as_action.triggered.connect(self.save_file_as)
         file_menu.addAction(save_as_action)
         
+        file_menu.addSeparator()
+        
+        open_shard_action = QAction("打开分区目录...", self)
+        open_shard_action.triggered.connect(self.open_shard_folder)
+        file_menu.addAction(open_shard_action)
+        
+        save_shard_action = QAction("另存为分区目录...", self)
+        save_shard_action.triggered.connect(self.save_shard_folder_as)
+        file_menu.addAction(save_shard_action)
+        
+        load_sites_action = QAction("加载其他地点...", self)
+        load_sites_action.triggered.connect(self.load_other_sites)
+        file_menu.addAction(load_sites_action)
+        
+        file_menu.addSeparator()
+        
         template_action = QAction("创建模板", self)
         template_action.triggered.connect(self.create_template)
         file_menu.addAction(template_action)
         
+        self.watch_action = QAction("监视文件外部修改", self)
+        self.watch_action.setCheckable(True)
+        self.watch_action.setChecked(True)
+        self.watch_action.toggled.connect(self.toggle_file_watch)
+        file_menu.addAction(self.watch_action)
+        
         file_menu.addSeparator()
         
         exit_action = QAction("退出", self)
@@ -354,6 +3478,19 @@ class AssetManagementSystem(QMainWindow):
         # 编辑菜单
         edit_menu = menu_bar.addMenu("编辑(&E)")
         
+        self.undo_action = QAction("撤销", self)
+        self.undo_action.setShortcut("Ctrl+Z")
+        self.undo_action.triggered.connect(self.undo)
+        edit_menu.addAction(self.undo_action)
+        
+        self.redo_action = QAction("重做", self)
+        self.redo_action.setShortcut("Ctrl+Y")
+        self.redo_action.triggered.connect(self.redo)
+        edit_menu.addAction(self.redo_action)
+        self.update_undo_actions()
+        
+        edit_menu.addSeparator()
+        
         select_all_action = QAction("全选", self)
         select_all_action.triggered.connect(self.select_all)
         edit_menu.addAction(select_all_action)
@@ -366,9 +3503,84 @@ class AssetManagementSystem(QMainWindow):
         add_action.triggered.connect(self.add_asset)
         edit_menu.addAction(add_action)
         
+        bulk_edit_action = QAction("批量修改...", self)
+        bulk_edit_action.triggered.connect(self.bulk_edit)
+        edit_menu.addAction(bulk_edit_action)
+        
+        # 只读查看模式下禁用的操作
+        self.write_actions = [
+            open_action, open_files_action, import_action, save_action, save_as_action,
+            open_shard_action, save_shard_action, load_sites_action, add_action, bulk_edit_action,
+        ]
+        
+        # 查询菜单
+        query_menu = menu_bar.addMenu("查询(&Q)")
+        
+        run_query_action = QAction("执行高级查询", self)
+        run_query_action.triggered.connect(self.run_query_expression)
+        query_menu.addAction(run_query_action)
+        
+        save_query_action = QAction("保存当前查询...", self)
+        save_query_action.triggered.connect(self.save_current_query)
+        query_menu.addAction(save_query_action)
+        
+        delete_query_action = QAction("删除已保存查询...", self)
+        delete_query_action.triggered.connect(self.delete_saved_query)
+        query_menu.addAction(delete_query_action)
+        
+        query_menu.addSeparator()
+        self.saved_query_menu = query_menu.addMenu("已保存查询")
+        self.refresh_saved_query_menu()
+        
+        query_menu.addSeparator()
+        
+        expiry_alerts_action = QAction("查看维护到期提醒", self)
+        expiry_alerts_action.triggered.connect(self.show_expiry_alerts)
+        query_menu.addAction(expiry_alerts_action)
+        
+        self.expiry_action = QAction("启用维护到期提醒", self)
+        self.expiry_action.setCheckable(True)
+        self.expiry_action.setChecked(self.expiry_settings.get("enabled", True))
+        self.expiry_action.toggled.connect(self.toggle_expiry_monitor)
+        query_menu.addAction(self.expiry_action)
+        
+        digest_action = QAction("每日到期摘要目录...", self)
+        digest_action.triggered.connect(self.set_expiry_digest_dir)
+        query_menu.addAction(digest_action)
+        
+        # 校验菜单
+        validate_menu = menu_bar.addMenu("校验(&V)")
+        
+        validate_action = QAction("校验数据", self)
+        validate_action.triggered.connect(lambda: self.report_validation())
+        validate_menu.addAction(validate_action)
+        
+        problem_rows_action = QAction("仅显示问题行", self)
+        problem_rows_action.triggered.connect(self.show_problem_rows)
+        validate_menu.addAction(problem_rows_action)
+        
+        export_report_action = QAction("导出校验报告", self)
+        export_report_action.triggered.connect(self.export_validation_report)
+        validate_menu.addAction(export_report_action)
+        
+        validate_menu.addSeparator()
+        
+        scan_action = QAction("网络扫描核对...", self)
+        scan_action.setToolTip("与 nmap XML、ARP 表、DHCP 租约文件核对 IP地址")
+        scan_action.triggered.connect(self.reconcile_network_scan)
+        validate_menu.addAction(scan_action)
+        
+        export_scan_action = QAction("导出扫描核对报告", self)
+        export_scan_action.triggered.connect(self.export_scan_report)
+        validate_menu.addAction(export_scan_action)
+        
         # 帮助菜单
         help_menu = menu_bar.addMenu("帮助(&H)")
         
+        performance_action = QAction("性能统计", self)
+        performance_action.triggered.connect(lambda: PerformanceDialog(PERF_STATS, self).exec_())
+        help_menu.addAction(performance_action)
+        
         about_action = QAction("关于", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -400,8 +3612,13 @@ class AssetManagementSystem(QMainWindow):
         right_layout = QVBoxLayout()
         right_panel.setLayout(right_layout)
         
-        # 表格
-        self.setup_table(right_layout)
+        # 位置树和表格
+        splitter = QSplitter(Qt.Horizontal)
+        self.setup_location_tree(splitter)
+        self.setup_table(splitter)
+        splitter.setStretchFactor(1, 1)
+        splitter.setSizes([260, 1000])
+        right_layout.addWidget(splitter)
         
         main_layout.addWidget(right_panel, stretch=1)
 
@@ -450,12 +3667,18 @@ class AssetManagementSystem(QMainWindow):
         # 初始化查询字段
         self.init_search_fields()
         
+        # 查询字段自动补全
+        self.setup_search_completers()
+        
         # 添加查询字段到布局
         self.add_search_fields_to_layout(search_layout)
         
         # 维护有效期查询
         self.setup_maintenance_query(search_layout)
         
+        # 高级查询表达式
+        self.setup_query_expression(search_layout)
+        
         # 查询按钮
         self.setup_search_buttons(search_layout)
         
@@ -468,6 +3691,41 @@ class AssetManagementSystem(QMainWindow):
             "报废中", "报废流程结束", "更换为新设备"
         ])
 
+    def setup_search_completers(self):
+        """为文本查询字段添加自动补全"""
+        self.search_completers = {}
+        for field_name, widget in self.search_fields.items():
+            if not isinstance(widget, QLineEdit):
+                continue
+            completer = QCompleter(self)
+            completer.setModel(QStringListModel(completer))
+            completer.setCaseSensitivity(Qt.CaseInsensitive)
+            # 候选已按前缀筛选和排序，不需要 QCompleter 再次过滤
+            completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+            widget.setCompleter(completer)
+            widget.textEdited.connect(lambda text, f=field_name: self.update_completions(f, text))
+            self.search_completers[field_name] = completer
+
+    def completion_index(self, field):
+        """取字段的前缀索引（首次使用时建立，之后随数据修改增量维护）"""
+        if field not in self.completion_indexes:
+            index = PrefixIndex()
+            if field in self.assets_df.columns:
+                index.build(self.assets_df[field])
+            self.completion_indexes[field] = index
+        return self.completion_indexes[field]
+
+    def update_completions(self, field, text):
+        completer = self.search_completers[field]
+        if not text.strip() or self.assets_df.empty:
+            completer.model().setStringList([])
+            return
+        
+        matches = self.completion_index(field).complete(text)
+        completer.model().setStringList(matches)
+        if matches:
+            completer.complete()
+
     def add_search_fields_to_layout(self, layout):
         layout.setVerticalSpacing(8)
         layout.setHorizontalSpacing(8)
@@ -544,35 +3802,25 @@ class AssetManagementSystem(QMainWindow):
         
         if not file_path:
             return
-            
+        
+        timer = PERF_STATS.timer("import_qr_for_search")
         try:
-            # 改进的图片读取方式
-            img = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-            
-            if img is None:
-                # 尝试用PIL读取（解决某些JPEG格式问题）
-                pil_img = Image.open(file_path)
-                img = np.array(pil_img.convert('L'))  # 转为灰度图
+            with timer.stage("parse"):
+                # 改进的图片读取方式
+                img = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
                 
-            # 图像预处理（提高识别率）
-            img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+                if img is None:
+                    # 尝试用PIL读取（解决某些JPEG格式问题）
+                    pil_img = Image.open(file_path)
+                    img = np.array(pil_img.convert('L'))  # 转为灰度图
             
-            # 检测二维码
-            decoded_objects = decode(img)
+            with timer.stage("decode"):
+                qr_content = decode_qr_content(img)
             
-            if not decoded_objects:
-                # 尝试调整图像大小（解决某些分辨率问题）
-                height, width = img.shape[:2]
-                img = cv2.resize(img, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
-                decoded_objects = decode(img)
-                
-            if not decoded_objects:
+            if qr_content is None:
                 QMessageBox.warning(self, "警告", "未检测到二维码，请尝试更清晰的图片")
                 return
                 
-            # 获取第一个二维码内容
-            qr_content = decoded_objects[0].data.decode("utf-8").strip()
-            
             if not qr_content:
                 QMessageBox.warning(self, "警告", "二维码内容为空")
                 return
@@ -585,6 +3833,8 @@ class AssetManagementSystem(QMainWindow):
             error_msg = f"二维码导入失败:\n{str(e)}\n\n可能原因:\n1. 图片损坏\n2. 非标准二维码\n3. 文件权限问题"
             QMessageBox.critical(self, "错误", error_msg)
             print(f"DEBUG: 二维码识别错误详情: {traceback.format_exc()}")
+        finally:
+            timer.finish()
 
 
     def setup_maintenance_query(self, layout):
@@ -604,6 +3854,22 @@ class AssetManagementSystem(QMainWindow):
         
         layout.addRow(maintenance_group)
 
+    def setup_query_expression(self, layout):
+        query_group = QGroupBox("高级查询")
+        query_layout = QHBoxLayout()
+        query_group.setLayout(query_layout)
+        
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("如: 分类=服务器 AND (地点~机房A OR ip in 10.0.0.0/8) AND 价格>20000")
+        self.query_edit.returnPressed.connect(self.run_query_expression)
+        query_layout.addWidget(self.query_edit)
+        
+        run_btn = QPushButton("执行")
+        run_btn.clicked.connect(self.run_query_expression)
+        query_layout.addWidget(run_btn)
+        
+        layout.addRow(query_group)
+
     def setup_search_buttons(self, layout):
         button_layout = QHBoxLayout()
         self.search_btn = QPushButton("查询")
@@ -614,17 +3880,22 @@ class AssetManagementSystem(QMainWindow):
         self.clear_btn.clicked.connect(self.clear_search)
         button_layout.addWidget(self.clear_btn)
         
+        self.fuzzy_check = QCheckBox("模糊/拼音匹配")
+        self.fuzzy_check.setToolTip("资产名称、负责人、供应商名称支持错别字容错和拼音/首字母检索，结果按相关度排序")
+        button_layout.addWidget(self.fuzzy_check)
+        
         layout.addRow(button_layout)
 
     def setup_table(self, layout):
-        self.table = QTableWidget()
-        self.table.setColumnCount(15)
-        self.table.setHorizontalHeaderLabels([
+        self.table_headers = [
             "资产编号", "资产名称", "设备型号", "设备分类", "设备序列号", 
             "IP地址", "使用地点", "机柜位置",
             "采购合同号", "项目名称", "负责人", "供应商名称", 
             "维护有效期", "设备状态", "备注"
-        ])
+        ]
+        self.table_model = AssetTableModel(self.table_headers, self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         
         # 设置列宽
         self.table.setColumnWidth(0, 120)  # 资产编号
@@ -643,10 +3914,18 @@ class AssetManagementSystem(QMainWindow):
         self.table.setColumnWidth(13, 100) # 设备状态
         self.table.setColumnWidth(14, 200) # 备注
         
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.doubleClicked.connect(self.edit_asset)
         
+        # 单击列标题排序，右键列标题设置筛选（排序和筛选由 view_positions 计算行位置）
+        header = self.table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.sectionClicked.connect(self.sort_by_column)
+        header.setContextMenuPolicy(Qt.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.show_header_menu)
+        header.setToolTip("单击列标题排序（升序/降序/取消），右键设置列筛选")
+        
         layout.addWidget(self.table)
 
     def open_file(self):
@@ -657,44 +3936,76 @@ class AssetManagementSystem(QMainWindow):
         )
         
         if file_path:
+            progress = QProgressDialog("正在读取文件...", None, 0, 0, self)
+            progress.setWindowTitle("打开文件")
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setMinimumDuration(500)
+            
+            def report(done, total):
+                progress.setMaximum(total)
+                progress.setValue(min(done, total))
+            
+            timer = PERF_STATS.timer("open_file")
             try:
-                if file_path.endswith('.csv'):
-                    self.assets_df = pd.read_csv(file_path, encoding='utf-8-sig')
-                else:
-                    self.assets_df = pd.read_excel(file_path, engine='openpyxl')
-                
-                # 检查必要列
-                required_columns = ["资产编号", "资产名称", "设备型号", "设备序列号"]
-                missing_cols = [col for col in required_columns if col not in self.assets_df.columns]
-                
-                if missing_cols:
-                    QMessageBox.critical(self, "错误", f"文件缺少必要列: {', '.join(missing_cols)}")
-                    return
-                
-                # 确保日期列是字符串格式
-                date_columns = ["采购日期", "入库日期", "上线日期", "维护有效期"]
-                for col in date_columns:
-                    if col in self.assets_df.columns:
-                        self.assets_df[col] = self.assets_df[col].astype(str)
-                
-                # 检查并添加新字段（如果旧文件没有）
-                new_columns = {
-                    "使用地点": "未指定",
-                    "机柜位置": "未指定",
-                    "设备当前状态": "未投入使用",
-                    "备注": "维修更换信息：无维修或补充"
-                }
-                
-                for col, default_value in new_columns.items():
-                    if col not in self.assets_df.columns:
-                        self.assets_df[col] = default_value
-                
+                with timer.stage("parse"):
+                    self.assets_df = load_asset_file(file_path, progress=report)
+                self.shard_store = None
                 self.current_file = file_path
                 self.file_label.setText(f"当前文件: {os.path.basename(file_path)}")
-                self.display_assets()
-                QMessageBox.information(self, "成功", "文件加载成功")
+                with timer.stage("normalize"):
+                    self.data_changed()
+                    self.watch_file(file_path)
+                with timer.stage("render"):
+                    self.display_assets()
+                self.report_validation("文件加载成功")
+            except AssetFileError as e:
+                QMessageBox.critical(self, "错误", str(e))
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"无法加载文件: {str(e)}")
+            finally:
+                progress.close()
+                timer.finish()
+
+    def open_files(self):
+        """同时打开多个文件（含各工作表），合并为一个视图并报告跨来源重复的资产编号"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "打开多个资产文件", "",
+            "Excel文件 (*.xlsx *.xls);;CSV文件 (*.csv);;所有文件 (*)"
+        )
+        if not file_paths:
+            return
+        
+        try:
+            df, skipped, duplicates = load_asset_sources(file_paths)
+        except AssetFileError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法打开文件: {str(e)}")
+            return
+        
+        self.assets_df = df
+        self.shard_store = None
+        # 合并视图没有对应的单个文件，保存时另存为新文件
+        self.current_file = None
+        self.stop_watching()
+        self.file_hashes = self.file_hashes[:0]
+        self.file_label.setText(f"当前文件: {len(file_paths)} 个文件的合并视图")
+        self.data_changed()
+        self.display_assets()
+        
+        message = f"已从 {df[SOURCE_COLUMN].nunique()} 个来源加载 {len(df)} 条记录"
+        if skipped:
+            message += f"\n\n跳过 {len(skipped)} 个工作表:\n" + "\n".join(
+                f"- {name}: {reason}" for name, reason in list(skipped.items())[:5]
+            )
+        if duplicates:
+            message += f"\n\n{len(duplicates)} 个资产编号在多个来源中重复:\n" + "\n".join(
+                f"- {asset_id}: {', '.join(sources)}" for asset_id, sources in list(duplicates.items())[:10]
+            )
+            if len(duplicates) > 10:
+                message += "\n……"
+        self.report_validation(message)
 
     def import_data(self):
         """导入数据"""
@@ -704,31 +4015,17 @@ class AssetManagementSystem(QMainWindow):
         )
         
         if file_path:
+            timer = PERF_STATS.timer("import_data")
             try:
-                if file_path.endswith('.csv'):
-                    new_data = pd.read_csv(file_path)
-                else:
-                    new_data = pd.read_excel(file_path)
-                
-                # 检查必要列
-                required_columns = ["资产编号", "资产名称", "设备型号", "设备序列号"]
-                missing_cols = [col for col in required_columns if col not in new_data.columns]
-                
-                if missing_cols:
-                    QMessageBox.critical(self, "错误", f"导入文件缺少必要列: {', '.join(missing_cols)}")
-                    return
+                # 与打开文件相同的读取、必要列检查和新字段补齐
+                with timer.stage("parse"):
+                    new_data = read_asset_table(file_path)
+                with timer.stage("normalize"):
+                    new_data = normalize_asset_frame(new_data)
                 
-                # 检查并添加新字段（如果导入文件没有）
-                new_columns = {
-                    "使用地点": "未指定",
-                    "机柜位置": "未指定",
-                    "设备当前状态": "未投入使用",
-                    "备注": "维修更换信息：无维修或补充"
-                }
-                
-                for col, default_value in new_columns.items():
-                    if col not in new_data.columns:
-                        new_data[col] = default_value
+                # 分区目录：与未加载地点中的资产编号重复时，先加载这些地点再按重复记录处理
+                if self.shard_store is not None:
+                    self.load_sites(self.shard_store.sites_of(new_data["资产编号"]))
                 
                 # 合并数据
                 if not self.assets_df.empty:
@@ -740,47 +4037,86 @@ class AssetManagementSystem(QMainWindow):
                             f"发现 {len(duplicate_ids)} 个重复资产编号，是否覆盖现有记录?",
                             QMessageBox.Yes | QMessageBox.No
                         )
-                        if reply == QMessageBox.Yes:
-                            # 删除重复记录
-                            self.assets_df = self.assets_df[~self.assets_df["资产编号"].isin(duplicate_ids)]
-                        else:
+                        if reply != QMessageBox.Yes:
                             return
                     
-                    self.assets_df = pd.concat([self.assets_df, new_data], ignore_index=True)
+                    # 删除重复记录并追加导入的行（作为一次可撤销的修改）
+                    with timer.stage("merge"):
+                        changes = []
+                        if duplicate_ids:
+                            changes.append(self.remove_rows(self.assets_df.index[self.assets_df["资产编号"].isin(duplicate_ids)]))
+                        changes.append(self.insert_rows(new_data))
+                        self.undo_stack.push("导入数据", changes)
+                    self.update_undo_actions()
                 else:
-                    self.assets_df = new_data
+                    with timer.stage("merge"):
+                        self.assets_df = new_data
+                        self.data_changed()
                 
-                self.display_assets()
-                QMessageBox.information(self, "成功", f"成功导入 {len(new_data)} 条记录")
+                with timer.stage("render"):
+                    self.display_assets()
+                self.report_validation(f"成功导入 {len(new_data)} 条记录")
+            except AssetFileError as e:
+                QMessageBox.critical(self, "错误", str(e))
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"无法导入数据: {str(e)}")
+            finally:
+                timer.finish()
 
     def export_data(self):
-        """导出数据到文件"""
+        """导出当前查询结果或全部数据到文件（Excel/CSV/JSON Lines/Parquet 分块写出）"""
         if self.assets_df.empty:
             QMessageBox.warning(self, "警告", "没有数据可导出")
             return
         
-        file_path, _ = QFileDialog.getSaveFileName(
+        # 表格显示的是查询结果时，选择导出范围
+        labels = None
+        if len(self.displayed_labels) < len(self.assets_df):
+            scope, ok = QInputDialog.getItem(
+                self, "导出范围", "请选择要导出的数据:",
+                [f"当前显示的 {len(self.displayed_labels)} 条记录", f"全部 {len(self.assets_df)} 条记录"],
+                0, False
+            )
+            if not ok:
+                return
+            if scope.startswith("当前"):
+                labels = self.displayed_labels
+        
+        file_path, name_filter = QFileDialog.getSaveFileName(
             self, 
             "导出数据",
             "",
-            "Excel文件 (*.xlsx);;CSV文件 (*.csv);;所有文件 (*)"
+            ";;".join(EXPORT_FILTERS)
         )
         
         if file_path:
+            # 文件名没有可识别的扩展名时，使用所选文件类型的扩展名
+            match = re.search(r"\(\*(\.[\w.]+)\)", name_filter)
+            if export_format(file_path)[0] == "xlsx" and not file_path.endswith('.xlsx'):
+                file_path += match.group(1) if match else '.xlsx'
+            fmt, compression = export_format(file_path, name_filter)
+            total = len(self.assets_df) if labels is None else len(labels)
+            
             try:
-                if file_path.endswith('.csv'):
-                    self.assets_df.to_csv(file_path, index=False, encoding='utf-8-sig')
-                else:
-                    if not file_path.endswith('.xlsx'):
-                        file_path += '.xlsx'
-                    self.assets_df.to_excel(file_path, index=False)
+                progress = QProgressDialog("正在导出...", "取消", 0, total, self)
+                progress.setWindowTitle("导出数据")
+                progress.setWindowModality(Qt.WindowModal)
+                progress.setMinimumDuration(500)
+                chunks = export_chunks(self.assets_df, file_path, fmt, compression, labels)
+                try:
+                    for written in chunks:
+                        progress.setValue(written)
+                        if progress.wasCanceled():
+                            chunks.close()
+                            QMessageBox.information(self, "提示", "已取消导出")
+                            return
+                finally:
+                    progress.close()
                 
                 QMessageBox.information(
                     self,
                     "成功",
-                    f"成功导出 {len(self.assets_df)} 条记录到: {file_path}"
+                    f"成功导出 {total} 条记录到: {file_path}"
                 )
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"无法导出数据: {str(e)}")
@@ -795,11 +4131,21 @@ class AssetManagementSystem(QMainWindow):
             self.save_file_as()
             return
         
+        if self.shard_store is not None:
+            self.save_shards()
+            return
+        
+        timer = PERF_STATS.timer("save_file")
         try:
-            self.assets_df.to_excel(self.current_file, index=False)
+            with timer.stage("write"):
+                write_excel(self.assets_df, self.current_file)
+            with timer.stage("normalize"):
+                self.watch_file(self.current_file, saved=True)
             QMessageBox.information(self, "成功", "文件保存成功")
         except Exception as e:
             QMessageBox.critical(self, "错误", f"无法保存文件: {str(e)}")
+        finally:
+            timer.finish()
 
     def save_file_as(self):
         """另存为"""
@@ -807,6 +4153,16 @@ class AssetManagementSystem(QMainWindow):
             QMessageBox.warning(self, "警告", "没有数据可保存")
             return
         
+        if self.shard_store is not None and self.shard_store.unloaded_sites():
+            reply = QMessageBox.question(
+                self, "确认",
+                f"另存的文件只包含已加载的 {len(self.shard_store.loaded)} 个地点"
+                f"（还有 {len(self.shard_store.unloaded_sites())} 个地点未加载），是否继续?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+        
         file_path, _ = QFileDialog.getSaveFileName(
             self, "另存为", "", "Excel文件 (*.xlsx);;所有文件 (*)"
         )
@@ -816,8 +4172,10 @@ class AssetManagementSystem(QMainWindow):
                 file_path += '.xlsx'
             
             try:
-                self.assets_df.to_excel(file_path, index=False)
+                write_excel(self.assets_df, file_path)
+                self.shard_store = None
                 self.current_file = file_path
+                self.watch_file(file_path, saved=True)
                 self.file_label.setText(f"当前文件: {os.path.basename(file_path)}")
                 QMessageBox.information(self, "成功", "文件保存成功")
             except Exception as e:
@@ -875,7 +4233,156 @@ class AssetManagementSystem(QMainWindow):
                 template_df.to_excel(file_path, index=False)
                 QMessageBox.information(self, "成功", f"模板文件已创建: {file_path}")
             except Exception as e:
-                QMessageBox.critical(self, "错误", f"创建模板失败: {str(e)}")
+                QMessageBox.critical(self, "错误", f"创建模板失败: {str(e)}")
+
+    def run_validation(self):
+        """校验当前数据（数据未变化时复用上次结果）"""
+        if self.validation_version != self.data_version:
+            report = self.validator.validate(self.assets_df)
+            self.validation_report = report
+            self.validation_version = self.data_version
+            
+            issues = report["字段"] + ": " + report["问题"]
+            self.validation_issues = issues.groupby(report["_label"].to_numpy(), sort=False).agg("\n".join).to_dict()
+        return self.validation_report
+
+    def report_validation(self, success_message=None):
+        """校验数据并提示结果"""
+        if self.assets_df.empty:
+            if success_message:
+                QMessageBox.information(self, "成功", success_message)
+            else:
+                QMessageBox.warning(self, "警告", "请先加载资产文件")
+            return
+        
+        report = self.run_validation()
+        if report.empty:
+            QMessageBox.information(self, "成功", success_message or "数据校验通过，未发现问题")
+            return
+        
+        summary = report["问题"].value_counts()
+        lines = [f"- {problem}: {count} 处" for problem, count in summary.items()]
+        text = f"发现 {len(self.validation_issues)} 行数据存在问题:\n" + "\n".join(lines)
+        if success_message:
+            # 多行的加载说明后另起一段
+            text = f"{success_message}\n\n{text}" if "\n" in success_message else f"{success_message}，但{text}"
+        
+        reply = QMessageBox.question(
+            self, "数据校验", text + "\n\n是否仅显示问题行？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.show_problem_rows()
+
+    def show_problem_rows(self):
+        """在表格中仅显示校验有问题的行"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "请先加载资产文件")
+            return
+        
+        report = self.run_validation()
+        if report.empty:
+            QMessageBox.information(self, "提示", "数据校验通过，未发现问题")
+            return
+        
+        labels = pd.unique(report["_label"])
+        self.display_assets(self.assets_df.loc[labels])
+
+    def export_validation_report(self):
+        """导出校验报告"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "没有数据可校验")
+            return
+        
+        report = self.run_validation()
+        if report.empty:
+            QMessageBox.information(self, "提示", "数据校验通过，未发现问题")
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出校验报告", "数据校验报告.xlsx",
+            "Excel文件 (*.xlsx);;CSV文件 (*.csv)"
+        )
+        
+        if file_path:
+            try:
+                report = report.drop(columns="_label")
+                if file_path.endswith('.csv'):
+                    report.to_csv(file_path, index=False, encoding='utf-8-sig')
+                else:
+                    if not file_path.endswith('.xlsx'):
+                        file_path += '.xlsx'
+                    report.to_excel(file_path, index=False)
+                QMessageBox.information(self, "成功", f"校验报告已导出到: {file_path}")
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"无法导出校验报告: {str(e)}")
+
+    def reconcile_network_scan(self):
+        """读取离线网络扫描文件并与资产的 IP地址 核对"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "请先加载资产文件")
+            return
+        
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择网络扫描文件", "",
+            "扫描文件 (*.xml *.leases *.txt *.log);;所有文件 (*)"
+        )
+        if not file_paths:
+            return
+        if self.shard_store is not None:
+            self.load_search_sites()
+        
+        timer = PERF_STATS.timer("reconcile_scan")
+        try:
+            with timer.stage("parse"):
+                hosts = pd.concat([read_scan_file(path) for path in file_paths], ignore_index=True)
+            with timer.stage("match"):
+                self.scan_report = reconcile_scan(self.assets_df, hosts)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法读取扫描文件: {str(e)}")
+            return
+        finally:
+            timer.finish()
+        
+        summary = self.scan_report["类型"].value_counts()
+        lines = [f"- {kind}: {summary.get(kind, 0)} 条" for kind in SCAN_REPORT_TYPES]
+        text = f"扫描文件中共 {len(hosts)} 条主机记录，核对结果:\n" + "\n".join(lines)
+        labels = pd.unique(self.scan_report["_label"])
+        labels = labels[labels >= 0]
+        if not len(labels):
+            QMessageBox.information(self, "网络扫描核对", text + "\n\n可在“校验”菜单中导出核对报告")
+            return
+        
+        reply = QMessageBox.question(
+            self, "网络扫描核对", text + "\n\n是否仅显示相关的已登记资产？（可在“校验”菜单中导出核对报告）",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.display_assets(self.assets_df.loc[self.assets_df.index.intersection(labels)])
+
+    def export_scan_report(self):
+        """导出最近一次网络扫描核对报告"""
+        if self.scan_report is None:
+            QMessageBox.warning(self, "警告", "请先进行网络扫描核对")
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出扫描核对报告", "网络扫描核对报告.xlsx",
+            "Excel文件 (*.xlsx);;CSV文件 (*.csv)"
+        )
+        
+        if file_path:
+            try:
+                report = self.scan_report.drop(columns="_label")
+                if file_path.endswith('.csv'):
+                    report.to_csv(file_path, index=False, encoding='utf-8-sig')
+                else:
+                    if not file_path.endswith('.xlsx'):
+                        file_path += '.xlsx'
+                    write_excel(report, file_path)
+                QMessageBox.information(self, "成功", f"扫描核对报告已导出到: {file_path}")
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"无法导出扫描核对报告: {str(e)}")
 
     def select_all(self):
         """全选"""
@@ -883,21 +4390,20 @@ class AssetManagementSystem(QMainWindow):
 
     def copy_selected(self):
         """复制选中内容"""
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        selection = self.table.selectionModel().selection()
+        if selection.isEmpty():
             return
         
         # 获取选中的行和列
-        rows = set(item.row() for item in selected_items)
-        cols = set(item.column() for item in selected_items)
+        rows = {row for block in selection for row in range(block.top(), block.bottom() + 1)}
+        cols = {col for block in selection for col in range(block.left(), block.right() + 1)}
         
         # 获取数据
         data = []
         for row in sorted(rows):
             row_data = []
             for col in sorted(cols):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
+                row_data.append(self.table_model.text(row, TABLE_COLUMNS[col]))
             data.append("\t".join(row_data))
         
         # 复制到剪贴板
@@ -917,8 +4423,7 @@ class AssetManagementSystem(QMainWindow):
                 return
             
             # 添加到DataFrame
-            new_row = pd.DataFrame([new_data])
-            self.assets_df = pd.concat([self.assets_df, new_row], ignore_index=True)
+            self.record_change("添加资产", self.insert_rows(pd.DataFrame([new_data])))
             
             # 刷新显示
             self.display_assets()
@@ -931,151 +4436,864 @@ class AssetManagementSystem(QMainWindow):
             QMessageBox.warning(self, "警告", "没有资产数据")
             return
         
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row < 0:
             QMessageBox.warning(self, "警告", "请先选择要编辑的资产")
             return
         
         # 获取资产编号
-        asset_id_item = self.table.item(selected_row, 0)
-        if not asset_id_item:
+        asset_id = self.table_model.text(selected_row, TABLE_COLUMNS[0])
+        if not asset_id:
             QMessageBox.warning(self, "警告", "无法获取资产编号")
             return
         
-        asset_id = asset_id_item.text()
-        
-        # 找到对应的资产数据
-        matched_assets = self.assets_df[self.assets_df["资产编号"].astype(str) == asset_id]
-        
-        if matched_assets.empty:
-            QMessageBox.warning(self, "警告", f"未找到资产编号为 {asset_id} 的记录")
+        # 找到对应的资产数据
+        matched_assets = self.assets_df[self.assets_df["资产编号"].astype(str) == asset_id]
+        
+        if matched_assets.empty:
+            QMessageBox.warning(self, "警告", f"未找到资产编号为 {asset_id} 的记录")
+            return
+        
+        asset_data = matched_assets.iloc[0].to_dict()
+        
+        # 打开编辑对话框
+        dialog = AssetEditDialog(asset_data, self)
+        result = dialog.exec_()
+        
+        if self.snapshot_folder is not None:
+            # 只读查看模式：修改提交给服务进程，快照更新后自动刷新
+            if result in (QDialog.Accepted, 2, 3):
+                self.submit_to_owner(result, asset_id, dialog.get_data())
+            return
+        
+        if result == QDialog.Accepted:
+            # 正常保存修改
+            new_data = dialog.get_data()
+            self.update_asset_data(asset_id, new_data)
+        elif result == 2:  # Add按钮
+            # 添加新资产
+            new_data = dialog.get_data()
+            if self.validate_asset_id(new_data["资产编号"]):
+                self.record_change("添加资产", self.insert_rows(pd.DataFrame([new_data])))
+                self.display_assets()
+                QMessageBox.information(self, "成功", "新资产添加成功")
+        elif result == 3:  # Delete按钮
+            # 删除资产
+            self.delete_asset(asset_id)
+
+    def validate_asset_id(self, asset_id):
+        """验证资产编号是否有效"""
+        if not asset_id:
+            QMessageBox.warning(self, "警告", "资产编号不能为空")
+            return False
+            
+        if asset_id in self.assets_df["资产编号"].values or (
+                self.shard_store is not None and self.shard_store.id_exists(asset_id)):
+            QMessageBox.warning(self, "警告", f"资产编号 {asset_id} 已存在！")
+            return False
+            
+        return True
+
+    def update_asset_data(self, old_id, new_data):
+        """更新资产数据"""
+        # 资产编号未修改时不需要检查重复
+        if new_data["资产编号"] != old_id and not self.validate_asset_id(new_data["资产编号"]):
+            return
+            
+        # 更新数据
+        labels = self.assets_df.index[self.assets_df["资产编号"] == old_id]
+        self.record_change("修改资产", self.apply_updates(labels, new_data))
+        QMessageBox.information(self, "成功", "资产信息已更新")
+
+    def apply_updates(self, labels, values):
+        """对指定行一次性赋值（values: 列名 -> 新值），增量更新索引和表格，返回撤销记录"""
+        columns = list(values)
+        old = self.write_cells(labels, columns, [values[col] for col in columns])
+        return ("update", old, dict(values))
+
+    def write_cells(self, labels, columns, data):
+        """向指定行列写入数据（按列广播的列表或二维数组），返回修改前的单元格"""
+        for col in columns:
+            if col not in self.assets_df.columns:
+                self.assets_df[col] = None
+            elif self.assets_df[col].dtype != object:
+                # 避免向数值/日期列写入文本时的类型冲突
+                self.assets_df[col] = self.assets_df[col].astype(object)
+        
+        old = self.assets_df.loc[labels, columns].copy()
+        self.assets_df.loc[labels, columns] = data
+        
+        self.data_changed(removed=old, added=self.assets_df.loc[labels, columns])
+        self.refresh_table_rows(labels, columns)
+        return old
+
+    def insert_rows(self, rows, keep_labels=False):
+        """追加行块，返回撤销记录
+        
+        新增行分配新的行标签；撤销删除时保留原标签并恢复原有顺序。
+        """
+        rows = rows.copy()
+        if not keep_labels:
+            rows.index = pd.RangeIndex(self.next_label, self.next_label + len(rows))
+        if len(rows):
+            self.next_label = max(self.next_label, int(rows.index.max()) + 1)
+        
+        if self.assets_df.empty:
+            self.assets_df = rows
+        else:
+            restore_order = keep_labels and rows.index.min() < self.assets_df.index.max()
+            self.assets_df = pd.concat([self.assets_df, rows])
+            if restore_order:
+                self.assets_df.sort_index(inplace=True)
+        
+        self.data_changed(added=rows)
+        return ("insert", rows)
+
+    def remove_rows(self, labels):
+        """删除行块，返回撤销记录"""
+        removed = self.assets_df.loc[labels]
+        self.assets_df = self.assets_df.drop(labels)
+        self.data_changed(removed=removed)
+        return ("remove", removed)
+
+    def record_change(self, description, change):
+        self.undo_stack.push(description, [change])
+        self.update_undo_actions()
+
+    def undo(self):
+        """撤销上一次修改"""
+        if not self.undo_stack.undo_text():
+            return
+        description, changes, _ = self.undo_stack.pop_undo()
+        for change in reversed(changes):
+            kind = change[0]
+            if kind == "update":
+                old = change[1]
+                self.write_cells(old.index, list(old.columns), old.to_numpy())
+            elif kind == "insert":
+                self.remove_rows(change[1].index)
+            elif kind == "remove":
+                self.insert_rows(change[1], keep_labels=True)
+        self.after_undo_redo(changes)
+        self.statusBar().showMessage(f"已撤销: {description}", 5000)
+
+    def redo(self):
+        """重做上一次撤销的修改"""
+        if not self.undo_stack.redo_text():
+            return
+        description, changes, _ = self.undo_stack.pop_redo()
+        for change in changes:
+            kind = change[0]
+            if kind == "update":
+                old, values = change[1], change[2]
+                if isinstance(values, pd.DataFrame):
+                    self.write_cells(old.index, list(values.columns), values.to_numpy())
+                else:
+                    columns = list(values)
+                    self.write_cells(old.index, columns, [values[col] for col in columns])
+            elif kind == "insert":
+                self.insert_rows(change[1], keep_labels=True)
+            elif kind == "remove":
+                self.remove_rows(change[1].index)
+        self.after_undo_redo(changes)
+        self.statusBar().showMessage(f"已重做: {description}", 5000)
+
+    def after_undo_redo(self, changes):
+        # 增删行需要重新显示，单元格修改已增量刷新
+        if any(change[0] != "update" for change in changes):
+            self.display_assets()
+        self.update_undo_actions()
+
+    def update_undo_actions(self):
+        undo_text = self.undo_stack.undo_text()
+        redo_text = self.undo_stack.redo_text()
+        self.undo_action.setEnabled(undo_text is not None)
+        self.undo_action.setText(f"撤销 {undo_text}" if undo_text else "撤销")
+        self.redo_action.setEnabled(redo_text is not None)
+        self.redo_action.setText(f"重做 {redo_text}" if redo_text else "重做")
+
+    def selected_labels(self):
+        """表格中选中行对应的数据行标签"""
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return self.displayed_labels[rows] if rows else self.displayed_labels[:0]
+
+    def bulk_edit(self):
+        """批量修改选中行或当前查询结果"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "没有资产数据")
+            return
+        
+        selected = self.selected_labels()
+        dialog = BulkEditDialog(len(selected), len(self.displayed_labels), self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        
+        values = dialog.get_values()
+        if not values:
+            QMessageBox.warning(self, "警告", "请勾选需要修改的字段")
+            return
+        
+        labels = selected if dialog.use_selection() else self.displayed_labels
+        if len(labels) == 0:
+            QMessageBox.warning(self, "警告", "没有需要修改的资产")
+            return
+        
+        reply = QMessageBox.question(
+            self, "确认批量修改",
+            f"确定要将 {len(labels)} 条资产的 {', '.join(values)} 修改为新值吗？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.record_change("批量修改", self.apply_updates(labels, values))
+            QMessageBox.information(self, "成功", f"已修改 {len(labels)} 条资产，请记得保存文件")
+
+    def delete_asset(self, asset_id):
+        """删除资产"""
+        reply = QMessageBox.question(
+            self, "确认删除", 
+            f"确定要删除资产 {asset_id} 吗？（可通过 编辑→撤销 恢复）",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        
+        if reply == QMessageBox.Yes:
+            labels = self.assets_df.index[self.assets_df["资产编号"] == asset_id]
+            self.record_change("删除资产", self.remove_rows(labels))
+            self.display_assets()
+            QMessageBox.information(self, "成功", "资产已删除")
+
+    def search_assets(self):
+        """查询资产"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "请先加载资产文件")
+            return
+        
+        # 获取查询条件
+        conditions = {}
+        for field_name, widget in self.search_fields.items():
+            if isinstance(widget, QLineEdit):
+                text = widget.text().strip()
+                if text:
+                    conditions[field_name] = text
+            elif isinstance(widget, QComboBox):
+                text = widget.currentText()
+                if text:
+                    conditions[field_name] = text
+        
+        # 分区目录：加载查询涉及的未加载地点
+        if self.shard_store is not None:
+            site_text = conditions.get("使用地点", "").lower()
+            self.load_search_sites((lambda site: site_text in site.lower()) if site_text else None)
+        
+        timer = PERF_STATS.timer("search_assets")
+        
+        # 维护有效期查询
+        maintenance_query = None
+        if self.maintenance_check.isChecked():
+            today = datetime.now().date()
+            threshold_date = today + timedelta(days=EXPIRY_WARNING_DAYS)
+            
+            # 转换维护有效期列为日期格式
+            try:
+                with timer.stage("normalize"):
+                    self.assets_df['维护有效期_date'] = pd.to_datetime(self.assets_df['维护有效期'], errors='coerce').dt.date
+                
+                status = self.maintenance_status.currentText()
+                if status == "即将到期":
+                    maintenance_query = (self.assets_df['维护有效期_date'] >= today) & (self.assets_df['维护有效期_date'] <= threshold_date)
+                elif status == "已超期":
+                    maintenance_query = self.assets_df['维护有效期_date'] < today
+                else:  # 全部
+                    maintenance_query = self.assets_df['维护有效期_date'] <= threshold_date
+            except Exception as e:
+                timer.finish()
+                QMessageBox.warning(self, "警告", f"维护有效期格式错误: {str(e)}")
+                return
+        
+        # 构建查询
+        try:
+            with timer.stage("filter"):
+                filtered_df = self.assets_df.copy()
+                
+                # 模糊/拼音匹配（按相关度排序）
+                if self.fuzzy_check.isChecked():
+                    scores = None
+                    for field in FUZZY_COLUMNS:
+                        if field in conditions:
+                            field_scores = self.fuzzy_index.row_scores(
+                                self.assets_df, self.data_version, field, conditions.pop(field)
+                            )
+                            scores = field_scores if scores is None else np.minimum(scores, field_scores)
+                    if scores is not None:
+                        positions = np.flatnonzero(scores)
+                        positions = positions[np.argsort(-scores[positions], kind="stable")]
+                        filtered_df = filtered_df.iloc[positions]
+                
+                # 应用普通查询条件
+                for field, value in conditions.items():
+                    if field in filtered_df.columns:
+                        if field in ["设备分类", "设备当前状态"]:
+                            filtered_df = filtered_df[filtered_df[field] == value]
+                        else:
+                            filtered_df = filtered_df[filtered_df[field].astype(str).str.contains(value, case=False, na=False)]
+                
+                # 应用维护有效期查询
+                if maintenance_query is not None:
+                    filtered_df = filtered_df[maintenance_query.reindex(filtered_df.index)]
+            
+            if filtered_df.empty:
+                QMessageBox.information(self, "提示", "没有找到匹配的资产")
+            else:
+                with timer.stage("render"):
+                    self.display_assets(filtered_df)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"查询失败: {str(e)}")
+        finally:
+            # 清理临时列
+            if '维护有效期_date' in self.assets_df.columns:
+                self.assets_df.drop('维护有效期_date', axis=1, inplace=True)
+            timer.finish()
+
+    def run_query_expression(self, text=None):
+        """执行高级查询表达式"""
+        if not isinstance(text, str):
+            text = self.query_edit.text()
+        text = text.strip()
+        if not text:
+            self.query_edit.setFocus()
+            return
+        
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "请先加载资产文件")
+            return
+        
+        try:
+            if self.shard_store is not None:
+                self.load_search_sites(SiteShardStore.query_site_filter(text, self.assets_df.columns))
+            positions = self.query_engine.search(self.assets_df, self.data_version, text)
+        except QueryError as e:
+            QMessageBox.warning(self, "查询表达式错误", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"查询失败: {str(e)}")
+            return
+        
+        if len(positions) == 0:
+            QMessageBox.information(self, "提示", "没有找到匹配的资产")
+        else:
+            self.display_assets(self.assets_df.iloc[positions])
+
+    def load_saved_queries(self):
+        """读取已保存的查询"""
+        try:
+            with open(SAVED_QUERIES_FILE, "r", encoding="utf-8") as f:
+                queries = json.load(f)
+            return queries if isinstance(queries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def write_saved_queries(self):
+        try:
+            with open(SAVED_QUERIES_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.saved_queries, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            QMessageBox.warning(self, "警告", f"无法保存查询: {str(e)}")
+
+    def refresh_saved_query_menu(self):
+        """重建“已保存查询”子菜单"""
+        self.saved_query_menu.clear()
+        if not self.saved_queries:
+            empty_action = QAction("（无）", self)
+            empty_action.setEnabled(False)
+            self.saved_query_menu.addAction(empty_action)
+            return
+        
+        for name, text in sorted(self.saved_queries.items()):
+            action = QAction(name, self)
+            action.setToolTip(text)
+            action.triggered.connect(lambda checked=False, t=text: self.apply_saved_query(t))
+            self.saved_query_menu.addAction(action)
+
+    def apply_saved_query(self, text):
+        self.query_edit.setText(text)
+        self.run_query_expression(text)
+
+    def save_current_query(self):
+        """将当前高级查询保存为命名查询"""
+        text = self.query_edit.text().strip()
+        if not text:
+            QMessageBox.warning(self, "警告", "请先在高级查询中输入查询表达式")
+            return
+        
+        try:
+            QueryParser(self.assets_df.columns).parse(text)
+        except QueryError as e:
+            QMessageBox.warning(self, "查询表达式错误", str(e))
+            return
+        
+        name, ok = QInputDialog.getText(self, "保存查询", "查询名称:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        
+        if name in self.saved_queries:
+            reply = QMessageBox.question(
+                self, "确认", f"查询 {name} 已存在，是否覆盖?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+        
+        self.saved_queries[name] = text
+        self.write_saved_queries()
+        self.refresh_saved_query_menu()
+
+    def delete_saved_query(self):
+        """删除已保存的查询"""
+        if not self.saved_queries:
+            QMessageBox.information(self, "提示", "没有已保存的查询")
+            return
+        
+        name, ok = QInputDialog.getItem(
+            self, "删除已保存查询", "选择查询:", sorted(self.saved_queries), 0, False
+        )
+        if ok and name in self.saved_queries:
+            del self.saved_queries[name]
+            self.write_saved_queries()
+            self.refresh_saved_query_menu()
+
+    def data_changed(self, removed=None, added=None):
+        """资产数据发生变化
+        
+        removed/added 为被删除/新增的行（修改视为先删后增），用于增量维护索引；
+        两者都为空时视为数据整体重新加载。
+        """
+        self.data_version += 1
+        self.mark_dirty(removed)
+        self.mark_dirty(added)
+        
+        if removed is None and added is None:
+            # 整体重新加载：之前的撤销记录和行标签不再适用
+            self.undo_stack.clear()
+            self.update_undo_actions()
+            self.next_label = int(self.assets_df.index.max()) + 1 if len(self.assets_df) else 0
+            self.completion_indexes.clear()
+            self.fuzzy_index.clear()
+            self.expiry_monitor.build(self.assets_df)
+            QTimer.singleShot(0, self.check_expiry)
+            self.location_index.build(self.assets_df)
+            self.populate_location_tree()
+            self.sort_cache.invalidate()
+            if self.column_filters:
+                self.column_filters.clear()
+                self.update_header_labels()
+            return
+        
+        # 修改只使对应列的排序缓存失效，行增删后行位置改变，全部失效
+        self.sort_cache.invalidate(added.columns if removed is not None and added is not None else None)
+        self.expiry_monitor.apply(removed, added)
+        self.fuzzy_index.apply(removed, added)
+        self.location_index.apply(removed, added, self.assets_df)
+        self.refresh_location_tree()
+        for field, index in self.completion_indexes.items():
+            index.apply(
+                removed[field] if removed is not None and field in removed.columns else None,
+                added[field] if added is not None and field in added.columns else None
+            )
+
+    def mark_dirty(self, frame):
+        """记录本地修改过的资产编号（用于与外部修改比对冲突）"""
+        if frame is None or len(frame) == 0:
+            return
+        if "资产编号" in frame.columns:
+            ids = frame["资产编号"]
+        else:
+            ids = self.assets_df.loc[frame.index.intersection(self.assets_df.index), "资产编号"]
+        self.dirty_ids.update(factorize_text(ids)[1][:-1])
+
+    def watch_file(self, file_path, saved=False):
+        """开始监视文件，并记录文件内容的行哈希作为比对基准
+        
+        saved=True 表示刚保存了本地数据：只需更新本地修改过的行的哈希。
+        """
+        self.stop_watching()
+        self.file_watcher.addPath(file_path)
+        self.file_stamp = self.file_state(file_path)
+        
+        ids = factorize_text(self.assets_df["资产编号"])
+        ids = pd.Index(ids[1][ids[0]])
+        if saved and len(self.file_hashes):
+            dirty = ids.isin(list(self.dirty_ids))
+            hashes = pd.Series(row_hashes(self.assets_df[dirty], ASSET_COLUMNS), index=ids[dirty])
+            base = self.file_hashes[~self.file_hashes.index.isin(list(self.dirty_ids))]
+            self.file_hashes = pd.concat([base, hashes])
+        else:
+            self.file_hashes = pd.Series(row_hashes(self.assets_df, ASSET_COLUMNS), index=ids)
+        self.file_hashes = self.file_hashes[~self.file_hashes.index.duplicated()]
+        self.dirty_ids.clear()
+        self.conflict_ids.clear()
+
+    @staticmethod
+    def file_state(file_path):
+        try:
+            stat = os.stat(file_path)
+            return (stat.st_mtime, stat.st_size)
+        except OSError:
+            return None
+
+    def toggle_file_watch(self, checked):
+        # 重新开启时立即合并关闭期间的外部修改
+        if checked:
+            self.check_external_changes()
+
+    def on_file_changed(self, file_path):
+        # 其他程序保存文件时常分多次写入，稍等片刻再读取
+        if file_path == self.current_file and self.watch_action.isChecked():
+            self.file_change_timer.start(1000)
+
+    def check_external_changes(self):
+        """文件被外部修改时，按资产编号比对并合并变化的行"""
+        file_path = self.current_file
+        if not file_path or self.shard_store is not None or not self.watch_action.isChecked():
+            return
+        # 部分程序以“删除后重命名”的方式保存，需要重新加入监视
+        if file_path not in self.file_watcher.files() and os.path.exists(file_path):
+            self.file_watcher.addPath(file_path)
+        
+        state = self.file_state(file_path)
+        if state is None or state == self.file_stamp:
+            return
+        
+        try:
+            external = load_asset_file(file_path)
+        except Exception as e:
+            self.statusBar().showMessage(f"文件已被外部修改，但无法读取: {str(e)}", 10000)
+            return
+        self.file_stamp = state
+        self.merge_external_data(external)
+
+    def merge_external_data(self, external):
+        """以行哈希比对外部文件与同步基准，只合并变化的行，冲突的行保留本地版本"""
+        codes, uniques = factorize_text(external["资产编号"])
+        ext_ids = pd.Index(uniques[codes])
+        keep = ~ext_ids.duplicated() & (ext_ids != "")
+        external, ext_ids = external[keep], ext_ids[keep]
+        ext_hashes = pd.Series(row_hashes(external, ASSET_COLUMNS), index=ext_ids)
+        
+        # 与基准比较：新增或哈希变化的行，以及外部删除的行
+        base = self.file_hashes
+        position = base.index.get_indexer(ext_ids)
+        changed = position < 0
+        changed[~changed] = base.to_numpy()[position[~changed]] != ext_hashes.to_numpy()[~changed]
+        changed_ids = ext_ids[changed]
+        removed_ids = base.index[~base.index.isin(ext_ids)]
+        
+        if len(changed_ids) == 0 and len(removed_ids) == 0:
+            self.file_hashes = ext_hashes
+            return
+        
+        # 本地行标签
+        local_codes, local_uniques = factorize_text(self.assets_df["资产编号"])
+        local_ids = pd.Index(local_uniques[local_codes])
+        local_labels = pd.Series(self.assets_df.index, index=local_ids)
+        local_labels = local_labels[~local_labels.index.duplicated()]
+        
+        # 本地也修改过的行：内容与外部一致则无冲突，否则为冲突
+        dirty = list(self.dirty_ids)
+        conflicts = set()
+        touched = changed_ids[changed_ids.isin(dirty)].append(removed_ids[removed_ids.isin(dirty)])
+        if len(touched):
+            present = touched[touched.isin(local_labels.index)]
+            local_hashes = pd.Series(
+                row_hashes(self.assets_df.loc[local_labels[present]], ASSET_COLUMNS), index=present
+            )
+            for asset_id in touched:
+                if local_hashes.get(asset_id) != ext_hashes.get(asset_id):
+                    conflicts.add(asset_id)
+        
+        update_ids = changed_ids[~changed_ids.isin(dirty) & changed_ids.isin(local_labels.index)]
+        insert_ids = changed_ids[~changed_ids.isin(dirty) & ~changed_ids.isin(local_labels.index)]
+        remove_ids = removed_ids[~removed_ids.isin(dirty) & removed_ids.isin(local_labels.index)]
+        
+        ext_rows = pd.Series(np.arange(len(external)), index=ext_ids)
+        changes = []
+        if len(update_ids):
+            rows = external.iloc[ext_rows[update_ids].to_numpy()]
+            columns = list(rows.columns)
+            labels = local_labels[update_ids].to_numpy()
+            old = self.write_cells(labels, columns, rows.to_numpy())
+            changes.append(("update", old, self.assets_df.loc[labels, columns].copy()))
+        if len(insert_ids):
+            changes.append(self.insert_rows(external.iloc[ext_rows[insert_ids].to_numpy()]))
+        if len(remove_ids):
+            changes.append(self.remove_rows(local_labels[remove_ids].to_numpy()))
+        
+        # 合并进来的行与文件一致，不算本地修改
+        self.dirty_ids = set(dirty) - (set(touched) - conflicts)
+        self.conflict_ids |= conflicts
+        self.file_hashes = ext_hashes
+        
+        if changes:
+            self.undo_stack.push("合并外部修改", changes)
+            self.update_undo_actions()
+        if len(insert_ids) or len(remove_ids):
+            self.display_assets()
+        
+        text = (f"文件已被其他用户修改，已合并: 修改 {len(update_ids)} 行，"
+                f"新增 {len(insert_ids)} 行，删除 {len(remove_ids)} 行。")
+        if not conflicts:
+            self.statusBar().showMessage(text, 10000)
+            return
+        
+        reply = QMessageBox.question(
+            self, "外部修改冲突",
+            text + f"\n\n其中 {len(conflicts)} 行与本地未保存的修改冲突，已保留本地版本"
+            "（保存时将覆盖外部修改）。\n\n是否仅显示冲突行？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.display_assets(self.assets_df[local_ids.isin(list(conflicts))])
+
+    def open_shard_folder(self):
+        """打开按地点分区的资产目录，只加载选中的地点"""
+        folder = QFileDialog.getExistingDirectory(self, "打开分区目录")
+        if not folder:
+            return
+        try:
+            store = SiteShardStore(folder)
+        except AssetFileError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法读取分区目录: {str(e)}")
+            return
+        
+        dialog = SiteSelectDialog({site: info["rows"] for site, info in store.sites.items()}, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        try:
+            self.assets_df = store.load(dialog.selected_sites())
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法加载地点数据: {str(e)}")
+            return
+        
+        self.shard_store = store
+        self.load_all_sites_on_search = None
+        self.current_file = folder
+        self.stop_watching()
+        self.file_hashes = self.file_hashes[:0]
+        self.data_changed()
+        self.update_shard_label()
+        self.display_assets()
+        self.report_validation(f"已加载 {len(store.loaded)} 个地点，共 {len(self.assets_df)} 条记录")
+
+    def save_shard_folder_as(self):
+        """把当前数据按使用地点保存为分区目录"""
+        if self.assets_df.empty:
+            QMessageBox.warning(self, "警告", "没有数据可保存")
             return
         
-        asset_data = matched_assets.iloc[0].to_dict()
+        if self.shard_store is not None and self.shard_store.unloaded_sites():
+            reply = QMessageBox.question(
+                self, "确认",
+                f"还有 {len(self.shard_store.unloaded_sites())} 个地点未加载，需要先全部加载才能另存，是否继续?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+            self.load_sites(self.shard_store.unloaded_sites())
+            self.display_assets()
         
-        # 打开编辑对话框
-        dialog = AssetEditDialog(asset_data, self)
-        result = dialog.exec_()
+        folder = QFileDialog.getExistingDirectory(self, "选择保存分区数据的目录")
+        if not folder:
+            return
+        try:
+            self.shard_store = SiteShardStore.create(folder, self.assets_df)
+        except AssetFileError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法保存分区目录: {str(e)}")
+            return
         
-        if result == QDialog.Accepted:
-            # 正常保存修改
-            new_data = dialog.get_data()
-            self.update_asset_data(asset_id, new_data)
-        elif result == 2:  # Add按钮
-            # 添加新资产
-            new_data = dialog.get_data()
-            if self.validate_asset_id(new_data["资产编号"]):
-                new_row = pd.DataFrame([new_data])
-                self.assets_df = pd.concat([self.assets_df, new_row], ignore_index=True)
-                self.display_assets()
-                QMessageBox.information(self, "成功", "新资产添加成功")
-        elif result == 3:  # Delete按钮
-            # 删除资产
-            self.delete_asset(asset_id)
+        self.load_all_sites_on_search = None
+        self.current_file = folder
+        self.stop_watching()
+        self.file_hashes = self.file_hashes[:0]
+        self.update_shard_label()
+        QMessageBox.information(self, "成功", f"已按 {len(self.shard_store.sites)} 个使用地点保存到分区目录")
 
-    def validate_asset_id(self, asset_id):
-        """验证资产编号是否有效"""
-        if not asset_id:
-            QMessageBox.warning(self, "警告", "资产编号不能为空")
-            return False
-            
-        if asset_id in self.assets_df["资产编号"].values:
-            QMessageBox.warning(self, "警告", f"资产编号 {asset_id} 已存在！")
-            return False
-            
-        return True
+    def save_shards(self):
+        """写回分区目录（只重写已加载地点的分片）"""
+        try:
+            # 资产改到未加载的地点时先加载该地点，避免覆盖其中已有的记录
+            sites = set(SiteShardStore.site_names(self.assets_df)) - self.shard_store.loaded
+            if sites:
+                self.load_sites(sites)
+                self.display_assets()
+            self.shard_store.save(self.assets_df)
+            self.update_shard_label()
+            QMessageBox.information(self, "成功", "文件保存成功")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法保存文件: {str(e)}")
 
-    def update_asset_data(self, old_id, new_data):
-        """更新资产数据"""
-        if not self.validate_asset_id(new_data["资产编号"]):
+    def load_other_sites(self):
+        """从分区目录中追加加载其他地点"""
+        if self.shard_store is None:
+            QMessageBox.information(self, "提示", "当前未打开分区目录")
+            return
+        unloaded = {site: self.shard_store.sites[site]["rows"] for site in self.shard_store.unloaded_sites()}
+        if not unloaded:
+            QMessageBox.information(self, "提示", "所有地点均已加载")
+            return
+        dialog = SiteSelectDialog(unloaded, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        try:
+            count = self.load_sites(dialog.selected_sites())
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法加载地点数据: {str(e)}")
             return
-            
-        # 更新数据
-        mask = self.assets_df["资产编号"] == old_id
-        for col, value in new_data.items():
-            self.assets_df.loc[mask, col] = value
-            
         self.display_assets()
-        QMessageBox.information(self, "成功", "资产信息已更新")
+        self.statusBar().showMessage(f"已加载 {count} 条记录", 5000)
 
-    def delete_asset(self, asset_id):
-        """删除资产"""
-        reply = QMessageBox.question(
-            self, "确认删除", 
-            f"确定要删除资产 {asset_id} 吗？此操作不可恢复！",
-            QMessageBox.Yes | QMessageBox.No
+    def load_sites(self, sites):
+        """加载分区目录中尚未加载的地点并追加到当前数据（不计入撤销历史），返回加载的行数"""
+        rows = self.shard_store.load(sites)
+        if len(rows):
+            rows.index = pd.RangeIndex(self.next_label, self.next_label + len(rows))
+            self.next_label += len(rows)
+            self.assets_df = rows if self.assets_df.empty else pd.concat([self.assets_df, rows])
+            self.data_changed(added=rows)
+        self.update_shard_label()
+        return len(rows)
+
+    def load_search_sites(self, site_filter=None):
+        """查询涉及未加载的地点时按需加载；site_filter 为 None 表示查询未限定地点"""
+        unloaded = self.shard_store.unloaded_sites()
+        if not unloaded:
+            return
+        if site_filter is not None:
+            sites = [site for site in unloaded if site_filter(site)]
+        else:
+            if self.load_all_sites_on_search is None:
+                reply = QMessageBox.question(
+                    self, "加载其他地点",
+                    f"当前只加载了 {len(self.shard_store.loaded)} 个地点，查询未限定使用地点。\n"
+                    f"是否加载其余 {len(unloaded)} 个地点一并查询？（本次打开期间不再询问）",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                self.load_all_sites_on_search = reply == QMessageBox.Yes
+            sites = unloaded if self.load_all_sites_on_search else []
+        if sites:
+            count = self.load_sites(sites)
+            self.statusBar().showMessage(f"已加载 {len(sites)} 个地点，{count} 条记录", 5000)
+
+    def update_shard_label(self):
+        loaded = len(self.shard_store.loaded)
+        total = len(self.shard_store.all_sites())
+        self.file_label.setText(
+            f"当前分区目录: {os.path.basename(self.shard_store.folder)}（已加载 {loaded}/{total} 个地点）"
         )
-        
-        if reply == QMessageBox.Yes:
-            self.assets_df = self.assets_df[self.assets_df["资产编号"] != asset_id]
-            self.display_assets()
-            QMessageBox.information(self, "成功", "资产已删除")
 
-    def search_assets(self):
-        """查询资产"""
-        if self.assets_df.empty:
-            QMessageBox.warning(self, "警告", "请先加载资产文件")
+    def attach_snapshot_folder(self, folder):
+        """只读查看模式：使用服务进程发布的快照（内存映射，多个查看进程共用），数据更新时自动刷新"""
+        try:
+            self.snapshot_sequence = np.memmap(
+                os.path.join(folder, "version"), dtype=np.int64, mode="r", shape=(1,)
+            )
+        except (OSError, ValueError):
+            QMessageBox.critical(self, "错误", f"{folder} 中没有服务进程发布的快照（服务端使用 --serve 文件 --publish 目录）")
             return
+        self.snapshot_folder = folder
+        try:
+            with open(os.path.join(folder, "owner.json"), encoding="utf-8") as f:
+                self.snapshot_owner = json.load(f)["url"]
+        except (OSError, ValueError, KeyError):
+            self.snapshot_owner = None
         
-        # 获取查询条件
-        conditions = {}
-        for field_name, widget in self.search_fields.items():
-            if isinstance(widget, QLineEdit):
-                text = widget.text().strip()
-                if text:
-                    conditions[field_name] = text
-            elif isinstance(widget, QComboBox):
-                text = widget.currentText()
-                if text:
-                    conditions[field_name] = text
+        for action in self.write_actions:
+            action.setEnabled(False)
+        self.open_file_btn.setEnabled(False)
+        self.watch_action.setChecked(False)
+        self.watch_action.setEnabled(False)
+        self.setWindowTitle("IT资产管理系统（只读查看）")
         
-        # 维护有效期查询
-        maintenance_query = None
-        if self.maintenance_check.isChecked():
-            today = datetime.now().date()
-            threshold_date = today + timedelta(days=60)
-            
-            # 转换维护有效期列为日期格式
-            try:
-                self.assets_df['维护有效期_date'] = pd.to_datetime(self.assets_df['维护有效期'], errors='coerce').dt.date
-                
-                status = self.maintenance_status.currentText()
-                if status == "即将到期":
-                    maintenance_query = (self.assets_df['维护有效期_date'] >= today) & (self.assets_df['维护有效期_date'] <= threshold_date)
-                elif status == "已超期":
-                    maintenance_query = self.assets_df['维护有效期_date'] < today
-                else:  # 全部
-                    maintenance_query = self.assets_df['维护有效期_date'] <= threshold_date
-            except Exception as e:
-                QMessageBox.warning(self, "警告", f"维护有效期格式错误: {str(e)}")
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(self.refresh_snapshot)
+        self.snapshot_timer.start(SNAPSHOT_POLL_INTERVAL)
+        self.refresh_snapshot()
+
+    def refresh_snapshot(self):
+        """快照序号变化时切换到新快照，保留当前的查询结果、列筛选和排序"""
+        sequence = int(self.snapshot_sequence[0])
+        if sequence == 0 or sequence == self.snapshot_loaded:
+            return
+        try:
+            snapshot = AssetSnapshot(snapshot_path(self.snapshot_folder, sequence))
+        except (OSError, ValueError, AssetFileError):
+            return  # 正在替换或已被更新的快照取代，下次再试
+        
+        first = self.snapshot_loaded is None
+        self.snapshot_loaded = sequence
+        result_labels, filters = self.result_labels, dict(self.column_filters)
+        self.assets_df = snapshot.frame
+        self.data_changed()
+        self.query_engine.bind(self.assets_df, self.data_version)
+        self.query_engine.column_cache.update(snapshot.column_cache)
+        if filters:
+            self.column_filters.update(filters)
+            self.update_header_labels()
+        self.file_label.setText(
+            f"只读查看: {os.path.basename(os.path.abspath(self.snapshot_folder))}"
+            f"（第 {sequence} 版，{len(self.assets_df)} 条记录）"
+        )
+        self.result_labels = None if first else result_labels
+        self.render_table()
+        if not first:
+            self.statusBar().showMessage(f"数据已更新（第 {sequence} 版）", 5000)
+
+    def submit_to_owner(self, result, asset_id, data):
+        """只读查看模式：把编辑对话框中的保存/添加/删除提交给服务进程"""
+        if self.snapshot_owner is None:
+            QMessageBox.warning(self, "警告", "只读查看模式：未找到服务进程地址，无法修改")
+            return
+        path = f"assets/{quote(str(asset_id), safe='')}"
+        if result == QDialog.Accepted:
+            method, body = "PUT", data
+        elif result == 2:
+            method, path, body = "POST", "assets", data
+        else:
+            reply = QMessageBox.question(
+                self, "确认删除", f"确定要删除资产 {asset_id} 吗？", QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
                 return
+            method, body = "DELETE", None
         
-        # 构建查询
+        request = urllib.request.Request(
+            urljoin(self.snapshot_owner, path), method=method,
+            data=None if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json; charset=utf-8"}
+        )
         try:
-            filtered_df = self.assets_df.copy()
-            
-            # 应用普通查询条件
-            for field, value in conditions.items():
-                if field in filtered_df.columns:
-                    if field in ["设备分类", "设备当前状态"]:
-                        filtered_df = filtered_df[filtered_df[field] == value]
-                    else:
-                        filtered_df = filtered_df[filtered_df[field].astype(str).str.contains(value, case=False, na=False)]
-            
-            # 应用维护有效期查询
-            if maintenance_query is not None:
-                filtered_df = filtered_df[maintenance_query]
-            
-            if filtered_df.empty:
-                QMessageBox.information(self, "提示", "没有找到匹配的资产")
-            else:
-                self.display_assets(filtered_df)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"查询失败: {str(e)}")
-        finally:
-            # 清理临时列
-            if '维护有效期_date' in self.assets_df.columns:
-                self.assets_df.drop('维护有效期_date', axis=1, inplace=True)
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8"))["error"]
+            except (ValueError, KeyError):
+                message = str(e)
+            QMessageBox.critical(self, "错误", f"服务进程拒绝了修改: {message}")
+            return
+        except (urllib.error.URLError, OSError) as e:
+            QMessageBox.critical(self, "错误", f"无法连接服务进程 {self.snapshot_owner}: {e}")
+            return
+        self.statusBar().showMessage("修改已提交到服务进程，快照更新后自动刷新", 5000)
+
+    def stop_watching(self):
+        paths = self.file_watcher.files()
+        if paths:
+            self.file_watcher.removePaths(paths)
 
     def toggle_maintenance_query(self, state):
         """切换维护有效期查询状态"""
@@ -1091,52 +5309,208 @@ class AssetManagementSystem(QMainWindow):
         
         self.maintenance_check.setChecked(False)
         self.maintenance_status.setCurrentIndex(0)
+        self.fuzzy_check.setChecked(False)
         self.display_assets()
 
     def display_assets(self, df=None):
-        """显示资产列表"""
-        display_df = df if df is not None else self.assets_df
+        """显示资产列表（df 为查询结果，None 表示全部数据），按当前的列排序和列筛选显示"""
+        self.result_labels = None if df is None else df.index
+        self.render_table()
+
+    def view_positions(self):
+        """当前查询结果经列筛选、排序后各行在 assets_df 中的位置（只计算位置，不复制数据）"""
+        if self.result_labels is None:
+            positions = np.arange(len(self.assets_df))
+        else:
+            positions = self.assets_df.index.get_indexer(self.result_labels)
+            positions = positions[positions >= 0]
+        for col, text in self.column_filters.items():
+            if col in self.assets_df.columns:
+                positions = positions[self.sort_cache.contains(self.assets_df, col, text)[positions]]
+        if self.sort_column in self.assets_df.columns:
+            positions = self.sort_cache.sort(self.assets_df, self.sort_column, positions, self.sort_descending)
+        return positions
+
+    @timed("display_assets")
+    def render_table(self):
+        """按查询结果、列筛选和排序更新表格显示的行（只替换行位置，单元格在显示时才读取）"""
+        positions = self.view_positions()
+        self.displayed_labels = self.assets_df.index[positions]
+        if self.column_filters:
+            self.statusBar().showMessage(
+                f"列筛选后显示 {len(positions)} 条记录（右键列标题可清除筛选）", 5000
+            )
+        
+        # 数据校验问题（仅在校验结果对应当前数据时标记）
+        issues = self.validation_issues if self.validation_version == self.data_version else {}
+        # 维护有效期按查询引擎缓存的解析结果着色（随数据版本失效）
+        expiry = None
+        if "维护有效期" in self.assets_df.columns:
+            self.query_engine.bind(self.assets_df, self.data_version)
+            expiry = self.query_engine.date_column("维护有效期")
+        self.table_model.set_view(self.assets_df, positions, issues, expiry)
+
+    def sort_by_column(self, column):
+        """单击列标题：依次按升序、降序排序，再次单击取消排序"""
+        col = TABLE_COLUMNS[column]
+        if self.sort_column != col:
+            self.sort_column, self.sort_descending = col, False
+        elif not self.sort_descending:
+            self.sort_descending = True
+        else:
+            self.sort_column = None
         
-        if display_df.empty:
-            self.table.setRowCount(0)
+        header = self.table.horizontalHeader()
+        header.setSortIndicatorShown(self.sort_column is not None)
+        if self.sort_column is not None:
+            header.setSortIndicator(column, Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder)
+        self.render_table()
+
+    def show_header_menu(self, pos):
+        """列标题右键菜单：设置/清除列筛选"""
+        column = self.table.horizontalHeader().logicalIndexAt(pos)
+        if column < 0:
             return
+        col = TABLE_COLUMNS[column]
         
-        # 设置行数和列数
-        self.table.setRowCount(len(display_df))
+        menu = QMenu(self)
+        filter_action = menu.addAction(f"筛选“{self.table_headers[column]}”...")
+        clear_action = menu.addAction("清除本列筛选")
+        clear_action.setEnabled(col in self.column_filters)
+        clear_all_action = menu.addAction("清除全部列筛选")
+        clear_all_action.setEnabled(bool(self.column_filters))
         
-        # 显示字段
-        columns_to_display = [
-            "资产编号", "资产名称", "设备型号", "设备分类", "设备序列号", 
-            "IP地址", "使用地点", "机柜位置",
-            "采购合同号", "项目名称", "负责人", "供应商名称", 
-            "维护有效期", "设备当前状态", "备注"
-        ]
+        action = menu.exec_(self.table.horizontalHeader().mapToGlobal(pos))
+        if action == filter_action:
+            text, ok = QInputDialog.getText(
+                self, "列筛选", f"显示“{self.table_headers[column]}”包含以下内容的行:",
+                text=self.column_filters.get(col, "")
+            )
+            if not ok:
+                return
+            if text.strip():
+                self.column_filters[col] = text.strip()
+            else:
+                self.column_filters.pop(col, None)
+        elif action == clear_action:
+            self.column_filters.pop(col, None)
+        elif action == clear_all_action:
+            self.column_filters.clear()
+        else:
+            return
+        self.update_header_labels()
+        self.render_table()
+
+    def update_header_labels(self):
+        """有筛选条件的列在标题后标记 [筛选]"""
+        for j, col in enumerate(TABLE_COLUMNS):
+            text = self.column_filters.get(col)
+            self.table_model.set_header(
+                j, self.table_headers[j] + (" [筛选]" if text else ""), f"包含: {text}" if text else None
+            )
+
+    def setup_location_tree(self, layout):
+        self.location_tree = QTreeWidget()
+        self.location_tree.setHeaderLabels(["位置", "数量", "总价"])
+        self.location_tree.setColumnWidth(0, 130)
+        self.location_tree.setColumnWidth(1, 50)
+        self.location_tree.setSortingEnabled(True)
+        self.location_tree.sortByColumn(0, Qt.AscendingOrder)
+        self.location_tree.setToolTip("按使用地点、机柜位置分组，单击显示该位置的资产")
+        self.location_tree.itemExpanded.connect(self.expand_location_item)
+        self.location_tree.itemClicked.connect(self.show_location_rows)
+        layout.addWidget(self.location_tree)
+
+    def populate_location_tree(self):
+        """根据位置索引重建地点节点（机柜节点在展开地点时才创建）"""
+        self.location_tree.clear()
+        self.location_items = {}
+        self.location_index.changed.clear()
+        self.location_tree.setSortingEnabled(False)
+        for site in self.location_index.racks:
+            self.add_location_item(site)
+        self.location_tree.setSortingEnabled(True)
+
+    def add_location_item(self, site, rack=None):
+        if rack is None:
+            item = QTreeWidgetItem(self.location_tree)
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        else:
+            item = QTreeWidgetItem(self.location_items[(site, None)])
+        item.setText(0, site if rack is None else rack)
+        item.setData(0, Qt.UserRole, (site, rack))
+        self.location_items[(site, rack)] = item
+        self.update_location_item(item, site, rack)
+
+    def update_location_item(self, item, site, rack):
+        item.setData(1, Qt.DisplayRole, self.location_index.count(site, rack))
+        item.setData(2, Qt.DisplayRole, round(self.location_index.totals.get((site, rack), 0.0)))
+
+    def expand_location_item(self, item):
+        """首次展开地点时创建其机柜节点"""
+        site, rack = item.data(0, Qt.UserRole)
+        if rack is not None or item.childCount():
+            return
+        self.location_tree.setSortingEnabled(False)
+        for rack in self.location_index.racks.get(site, {}):
+            self.add_location_item(site, rack)
+        self.location_tree.setSortingEnabled(True)
+
+    def refresh_location_tree(self):
+        """只更新数量或合计有变化的节点（未展开的地点不创建机柜节点）"""
+        changed, self.location_index.changed = self.location_index.changed, set()
+        if not changed:
+            return
+        racks = self.location_index.racks
+        self.location_tree.setSortingEnabled(False)
+        for site in {site for site, _ in changed}:
+            item = self.location_items.get((site, None))
+            if site not in racks:
+                if item is not None:
+                    for key in [key for key in self.location_items if key[0] == site]:
+                        del self.location_items[key]
+                    self.location_tree.takeTopLevelItem(self.location_tree.indexOfTopLevelItem(item))
+            elif item is None:
+                self.add_location_item(site)
+            else:
+                self.update_location_item(item, site, None)
+        for site, rack in changed:
+            parent = self.location_items.get((site, None))
+            if parent is None or not parent.childCount():
+                continue
+            item = self.location_items.get((site, rack))
+            if rack not in racks[site]:
+                if item is not None:
+                    parent.removeChild(item)
+                    del self.location_items[(site, rack)]
+            elif item is None:
+                self.add_location_item(site, rack)
+            else:
+                self.update_location_item(item, site, rack)
+        self.location_tree.setSortingEnabled(True)
+
+    def show_location_rows(self, item, column=0):
+        """单击位置节点：直接按索引中的行标签显示该位置的资产"""
+        site, rack = item.data(0, Qt.UserRole)
+        self.result_labels = pd.Index(self.location_index.labels(site, rack))
+        self.render_table()
+        name = site if rack is None else f"{site} / {rack}"
+        self.statusBar().showMessage(f"{name}: {len(self.result_labels)} 条记录", 5000)
+
+    def refresh_table_rows(self, labels, columns):
+        """只刷新表格中当前显示的指定行和列；修改了排序列、列筛选字段或维护有效期时重新计算显示"""
+        if {self.sort_column, "维护有效期", *self.column_filters} & set(columns):
+            self.render_table()
+            return
         
-        for i, row in display_df.iterrows():
-            for j, col in enumerate(columns_to_display):
-                value = str(row[col]) if col in row and pd.notna(row[col]) else ""
-                item = QTableWidgetItem(value)
-                
-                # 标记特殊状态
-                if col == "设备当前状态":
-                    if value == "维修中":
-                        item.setBackground(Qt.yellow)
-                    elif value == "报废中":
-                        item.setBackground(Qt.red)
-                    elif value == "更换为新设备":
-                        item.setBackground(Qt.green)
-                
-                # 标记即将/已过期的维护有效期
-                if col == "维护有效期" and '维护有效期_date' in display_df.columns:
-                    expiry_date = row['维护有效期_date']
-                    if pd.notna(expiry_date):
-                        today = datetime.now().date()
-                        if expiry_date < today:
-                            item.setBackground(Qt.red)
-                        elif expiry_date <= (today + timedelta(days=60)):
-                            item.setBackground(Qt.yellow)
-                
-                self.table.setItem(i, j, item)
+        cols = [TABLE_COLUMNS.index(col) for col in columns if col in TABLE_COLUMNS]
+        if not cols or len(self.displayed_labels) == 0:
+            return
+        
+        rows = self.displayed_labels.get_indexer(labels)
+        rows = rows[rows >= 0]
+        if len(rows):
+            self.table_model.refresh_rows(rows, cols)
 
     def show_about(self):
         """显示关于信息"""
@@ -1151,8 +5525,490 @@ class AssetManagementSystem(QMainWindow):
             "开发时间：2025年"
         )
 
+
+class ReadWriteLock:
+    """读写锁：读操作可并发执行，写操作独占；有写者等待时不再接纳新的读者"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self.cond:
+            while self.writer or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.cond:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.cond.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.writer = False
+                self.cond.notify_all()
+
+
+class AssetStoreError(Exception):
+    """资产存储操作错误（status 为对应的 HTTP 状态码）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssetStore:
+    """无界面的资产数据存储（HTTP 服务使用）
+
+    读操作并发执行，写操作串行；资产编号索引和补全索引随修改增量维护，
+    查询复用 QueryEngine 的索引与结果缓存。新增的行先放入待合并列表，
+    下一次读取、修改或保存时一次性并入（每次合并都要复制整个表，逐条合并会在写锁内反复复制）。修改后延迟 save_delay 秒写回文件，
+    连续修改合并为一次保存。指定 publish_dir 时，加载后及每次保存前发布只读快照供查看进程使用。
+    """
+
+    def __init__(self, file_path, save_delay=2.0, publish_dir=None):
+        self.file_path = file_path
+        self.save_delay = save_delay
+        self.df = load_asset_file(file_path)
+        self.df.index = pd.RangeIndex(len(self.df))
+        self.next_label = len(self.df)
+        self.pending = []  # 已添加、尚未并入 df 的行
+        self.version = 0
+        self.lock = ReadWriteLock()
+        self.query_engine = QueryEngine()
+        self.completion_indexes = {}  # 字段 -> PrefixIndex（首次补全时建立）
+        self.completion_lock = threading.Lock()
+        
+        codes, uniques = factorize_text(self.df["资产编号"])
+        ids = pd.Series(self.df.index, index=uniques[codes])
+        self.id_index = ids[~ids.index.duplicated()].to_dict()  # 资产编号 -> 行标签
+        self.id_index.pop("", None)
+        
+        self.save_lock = threading.Lock()   # 保护 dirty/save_timer
+        self.file_lock = threading.Lock()   # 同一时间只进行一次保存
+        self.save_timer = None
+        self.dirty = False
+        
+        self.publisher = None
+        if publish_dir:
+            self.publisher = SnapshotPublisher(publish_dir)
+            self.publisher.publish(self.df)
+
+    @staticmethod
+    def to_json(frame):
+        return frame.to_json(orient="records", force_ascii=False)
+
+    def merge_pending(self):
+        """把待合并的新增行并入数据（须持有写锁）"""
+        if self.pending:
+            self.df = pd.concat([self.df] + self.pending)
+            self.pending = []
+
+    @contextmanager
+    def reading(self):
+        """读锁：读取前先在写锁下并入新增的行，保证读到的数据包含已完成的添加"""
+        while True:
+            if self.pending:
+                with self.lock.write():
+                    self.merge_pending()
+            with self.lock.read():
+                if not self.pending:
+                    yield
+                    return
+
+    # ---------- 读操作 ----------
+
+    def search(self, query=None, limit=100, offset=0):
+        """按查询表达式检索，返回 (匹配总数, 当前页记录的 JSON)"""
+        with self.reading():
+            if query:
+                try:
+                    positions = self.query_engine.search(self.df, self.version, query)
+                except QueryError as e:
+                    raise AssetStoreError(f"查询表达式错误: {e}")
+            else:
+                positions = np.arange(len(self.df))
+            return len(positions), self.to_json(self.df.iloc[positions[offset:offset + limit]])
+
+    def get(self, asset_id):
+        with self.reading():
+            label = self.label(asset_id)
+            return self.to_json(self.df.loc[[label]])[1:-1]
+
+    def expiring(self, days=60, status="全部", limit=100, offset=0):
+        """维护有效期查询（与界面的“即将到期/已超期/全部”一致）"""
+        if status == "即将到期":
+            query = f"维护有效期>=today AND 维护有效期<=+{days}d"
+        elif status == "已超期":
+            query = "维护有效期<today"
+        elif status == "全部":
+            query = f"维护有效期<=+{days}d"
+        else:
+            raise AssetStoreError(f"未知的维护状态: {status}")
+        return self.search(query, limit, offset)
+
+    def complete(self, field, prefix):
+        with self.reading():
+            if field not in self.df.columns:
+                raise AssetStoreError(f"未知字段: {field}")
+            with self.completion_lock:
+                index = self.completion_indexes.get(field)
+                if index is None:
+                    index = self.completion_indexes[field] = PrefixIndex()
+                    index.build(self.df[field])
+            return index.complete(prefix)
+
+    def label(self, asset_id):
+        label = self.id_index.get(str(asset_id).strip())
+        if label is None:
+            raise AssetStoreError(f"资产编号 {asset_id} 不存在", 404)
+        return label
+
+    # ---------- 写操作 ----------
+
+    def check_record(self, record):
+        if not isinstance(record, dict):
+            raise AssetStoreError("请求内容应为 JSON 对象")
+        for col, value in record.items():
+            if col not in ASSET_COLUMNS and col not in self.df.columns:
+                raise AssetStoreError(f"未知字段: {col}")
+            if isinstance(value, (dict, list)):
+                raise AssetStoreError(f"字段 {col} 的值应为文本或数值")
+        if "资产编号" in record:
+            record["资产编号"] = str(record["资产编号"]).strip()
+            if not record["资产编号"]:
+                raise AssetStoreError("资产编号不能为空")
+
+    def add(self, record):
+        self.check_record(record)
+        if "资产编号" not in record:
+            raise AssetStoreError("资产编号不能为空")
+        with self.lock.write():
+            asset_id = record["资产编号"]
+            if asset_id in self.id_index:
+                raise AssetStoreError(f"资产编号 {asset_id} 已存在！", 409)
+            row = {**DEFAULT_COLUMN_VALUES, **record}
+            rows = pd.DataFrame([row], index=[self.next_label])
+            self.pending.append(rows)
+            self.id_index[asset_id] = self.next_label
+            self.next_label += 1
+            self.data_changed(added=rows)
+            columns = list(self.df.columns) + [col for col in rows.columns if col not in self.df.columns]
+            return self.to_json(rows.reindex(columns=columns))[1:-1]
+
+    def update(self, asset_id, values):
+        self.check_record(values)
+        with self.lock.write():
+            self.merge_pending()
+            label = self.label(asset_id)
+            new_id = values.get("资产编号")
+            old_id = self.df.at[label, "资产编号"]
+            if new_id is not None and new_id != str(old_id).strip() and new_id in self.id_index:
+                raise AssetStoreError(f"资产编号 {new_id} 已存在！", 409)
+            
+            columns = list(values)
+            for col in columns:
+                if col not in self.df.columns:
+                    self.df[col] = None
+                elif self.df[col].dtype != object:
+                    self.df[col] = self.df[col].astype(object)
+            old = self.df.loc[[label], columns].copy()
+            self.df.loc[label, columns] = [values[col] for col in columns]
+            if new_id is not None:
+                self.id_index.pop(str(old_id).strip(), None)
+                self.id_index[new_id] = label
+            self.data_changed(removed=old, added=self.df.loc[[label], columns])
+            return self.to_json(self.df.loc[[label]])[1:-1]
+
+    def delete(self, asset_id):
+        with self.lock.write():
+            self.merge_pending()
+            label = self.label(asset_id)
+            removed = self.df.loc[[label]]
+            self.df = self.df.drop(label)
+            self.id_index.pop(str(asset_id).strip(), None)
+            self.data_changed(removed=removed)
+
+    def data_changed(self, removed=None, added=None):
+        """写操作后调用（持有写锁）：更新版本与补全索引，并安排保存"""
+        self.version += 1
+        for field, index in self.completion_indexes.items():
+            index.apply(
+                removed[field] if removed is not None and field in removed.columns else None,
+                added[field] if added is not None and field in added.columns else None
+            )
+        with self.save_lock:
+            self.dirty = True
+            if self.save_timer is None:
+                self.save_timer = threading.Timer(self.save_delay, self.save)
+                self.save_timer.daemon = True
+                self.save_timer.start()
+
+    def save(self):
+        """写回文件：先写临时文件再替换，避免其他程序读到写了一半的文件"""
+        with self.file_lock:
+            with self.save_lock:
+                self.save_timer = None
+                if not self.dirty:
+                    return
+                self.dirty = False
+            self.write_file()
+
+    def write_file(self):
+        folder, name = os.path.split(os.path.abspath(self.file_path))
+        temp_path = os.path.join(folder, f".{name}.saving")
+        try:
+            # 复制当前数据后在锁外写文件，保存期间读写操作都不受影响
+            with self.reading():
+                snapshot = self.df.copy()
+            if self.publisher is not None:
+                try:
+                    self.publisher.publish(snapshot)
+                except Exception:
+                    print(f"发布快照失败: {traceback.format_exc()}")
+            if self.file_path.endswith('.csv'):
+                snapshot.to_csv(temp_path, index=False, encoding='utf-8-sig')
+            else:
+                write_excel(snapshot, temp_path)
+            os.replace(temp_path, self.file_path)
+        except Exception:
+            with self.save_lock:
+                self.dirty = True
+            print(f"保存失败: {traceback.format_exc()}")
+
+    def close(self):
+        """停止延迟保存并立即写回未保存的修改"""
+        with self.save_lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+        self.save()
+
+
+class AssetRequestHandler(BaseHTTPRequestHandler):
+    """资产 HTTP/JSON 接口
+
+    GET    /assets?q=查询表达式&limit=100&offset=0   检索（语法同高级查询）
+    GET    /assets/<资产编号>                        按编号获取
+    POST   /assets                                   添加（JSON 对象）
+    PUT    /assets/<资产编号>                        修改指定字段（JSON 对象）
+    DELETE /assets/<资产编号>                        删除
+    GET    /maintenance?days=60&status=即将到期      维护有效期查询（即将到期/已超期/全部）
+    GET    /qr?content=二维码内容                    按二维码内容查找资产
+    POST   /qr                                       上传二维码图片查找资产
+    GET    /complete?field=字段&prefix=前缀          自动补全
+    GET    /metrics?format=prometheus                请求耗时统计（默认 JSON）
+    """
+
+    protocol_version = "HTTP/1.1"
+    ROUTES = [
+        ("GET", re.compile(r"/assets"), "list_assets"),
+        ("GET", re.compile(r"/assets/(?P<asset_id>[^/]+)"), "get_asset"),
+        ("POST", re.compile(r"/assets"), "add_asset"),
+        ("PUT", re.compile(r"/assets/(?P<asset_id>[^/]+)"), "update_asset"),
+        ("DELETE", re.compile(r"/assets/(?P<asset_id>[^/]+)"), "delete_asset"),
+        ("GET", re.compile(r"/maintenance"), "maintenance"),
+        ("GET", re.compile(r"/qr"), "qr_lookup"),
+        ("POST", re.compile(r"/qr"), "qr_decode"),
+        ("GET", re.compile(r"/complete"), "complete"),
+        ("GET", re.compile(r"/metrics"), "metrics"),
+    ]
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        self.params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route, status, content_type = f"{method} (未知)", 500, []
+        try:
+            for route_method, pattern, handler in self.ROUTES:
+                match = pattern.fullmatch(url.path.rstrip("/") or "/")
+                if match and route_method == method:
+                    # 统计按接口路径汇总，如 "GET /assets/{asset_id}"
+                    route = method + " " + re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern.pattern)
+                    kwargs = {key: unquote(value) for key, value in match.groupdict().items()}
+                    status, body, *content_type = getattr(self, handler)(**kwargs)
+                    break
+            else:
+                raise AssetStoreError(f"未知接口: {method} {url.path}", 404)
+        except AssetStoreError as e:
+            status, body = e.status, json.dumps({"error": str(e)}, ensure_ascii=False)
+        except Exception as e:
+            status, body = 500, json.dumps({"error": f"服务器错误: {e}"}, ensure_ascii=False)
+            print(f"请求处理失败: {traceback.format_exc()}")
+        self.send_json(status, body, *content_type)
+        self.server.stats.record(route, time.perf_counter() - start, error=status >= 400)
+
+    def send_json(self, status, body, content_type="application/json; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # 耗时统计见 /metrics，不逐条打印请求日志
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def read_json(self):
+        try:
+            return json.loads(self.read_body().decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise AssetStoreError("请求内容不是有效的 JSON")
+
+    def int_param(self, name, default):
+        try:
+            return max(int(self.params.get(name, default)), 0)
+        except ValueError:
+            raise AssetStoreError(f"参数 {name} 应为整数")
+
+    def page(self, total, items):
+        return 200, f'{{"total": {total}, "items": {items}}}'
+
+    def list_assets(self):
+        return self.page(*self.server.store.search(
+            self.params.get("q"), self.int_param("limit", 100), self.int_param("offset", 0)
+        ))
+
+    def get_asset(self, asset_id):
+        return 200, self.server.store.get(asset_id)
+
+    def add_asset(self):
+        return 201, self.server.store.add(self.read_json())
+
+    def update_asset(self, asset_id):
+        return 200, self.server.store.update(asset_id, self.read_json())
+
+    def delete_asset(self, asset_id):
+        self.server.store.delete(asset_id)
+        return 200, json.dumps({"deleted": asset_id}, ensure_ascii=False)
+
+    def maintenance(self):
+        return self.page(*self.server.store.expiring(
+            self.int_param("days", 60), self.params.get("status", "全部"),
+            self.int_param("limit", 100), self.int_param("offset", 0)
+        ))
+
+    def qr_lookup(self):
+        content = self.params.get("content", "").strip()
+        if not content:
+            raise AssetStoreError("二维码内容为空")
+        return 200, self.server.store.get(content)
+
+    def qr_decode(self):
+        data = np.frombuffer(self.read_body(), dtype=np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE) if len(data) else None
+        if img is None:
+            try:
+                # 尝试用PIL读取（解决某些JPEG格式问题）
+                img = np.array(Image.open(BytesIO(data.tobytes())).convert('L'))
+            except Exception:
+                raise AssetStoreError("无法读取上传的图片")
+        content = decode_qr_content(img)
+        if content is None:
+            raise AssetStoreError("未检测到二维码，请尝试更清晰的图片", 422)
+        if not content:
+            raise AssetStoreError("二维码内容为空", 422)
+        return 200, self.server.store.get(content)
+
+    def complete(self):
+        field = self.params.get("field", "")
+        return 200, json.dumps(
+            self.server.store.complete(field, self.params.get("prefix", "")), ensure_ascii=False
+        )
+
+    def metrics(self):
+        if self.params.get("format") == "prometheus":
+            return 200, self.server.stats.prometheus("itasset_request", "route"), "text/plain; version=0.0.4; charset=utf-8"
+        return 200, json.dumps(self.server.stats.snapshot(), ensure_ascii=False)
+
+
+class AssetServer(ThreadingHTTPServer):
+    """多线程 HTTP 服务：每个请求一个线程，共享同一个 AssetStore"""
+
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, AssetRequestHandler)
+        self.store = store
+        self.stats = LatencyStats()
+
+
+def run_server(file_path, host="127.0.0.1", port=8765, publish_dir=None):
+    """无界面服务模式：加载资产文件并提供 HTTP/JSON 接口，退出时写回未保存的修改
+
+    publish_dir 不为空时同时发布只读快照，本机的查看进程（--viewer）共用快照而不必各自加载文件。
+    """
+    try:
+        store = AssetStore(file_path, publish_dir=publish_dir)
+    except AssetFileError as e:
+        print(f"错误: {e}")
+        return 1
+    server = AssetServer((host, port), store)
+    print(f"已加载 {len(store.df)} 条资产，服务地址 http://{host}:{server.server_port}/ （Ctrl+C 退出）")
+    if store.publisher is not None:
+        local_host = "127.0.0.1" if host in ("", "0.0.0.0") else host
+        store.publisher.write_owner(f"http://{local_host}:{server.server_port}/")
+        print(f"只读快照发布到 {os.path.abspath(publish_dir)}，查看: python {sys.argv[0]} --viewer {publish_dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+    return 0
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="IT资产管理系统")
+    parser.add_argument("--serve", metavar="FILE", help="以无界面 HTTP/JSON 服务模式运行，加载指定的资产文件")
+    parser.add_argument("--host", default="127.0.0.1", help="服务监听地址（局域网访问可使用 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=8765, help="服务端口")
+    parser.add_argument("--publish", metavar="DIR", help="服务模式下同时在该目录发布只读快照（可放在 /dev/shm 等内存文件系统）")
+    parser.add_argument("--viewer", metavar="DIR", help="只读查看模式：使用服务进程在该目录发布的快照，修改提交给服务进程")
+    parser.add_argument("--qr-benchmark", type=int, nargs="?", const=100, metavar="N",
+                        help="生成 N 张带模糊/噪声/透视的二维码测试图像，输出各识别阶段的识别率和速度")
+    args, qt_args = parser.parse_known_args()
+    if args.qr_benchmark:
+        sys.exit(run_qr_benchmark(args.qr_benchmark))
+    if args.serve:
+        sys.exit(run_server(args.serve, args.host, args.port, args.publish))
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     window = AssetManagementSystem()
+    if args.viewer:
+        window.attach_snapshot_folder(args.viewer)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
@@ -0,0 +1,144 @@
+"""查询表达式测试：解析、运算符优先级、IP 网段、相对日期、结果缓存及错误提示"""
+
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from itdevice16 import QueryEngine, QueryError, QueryParser  # noqa: E402
+
+
+def days(n, fmt="%Y-%m-%d"):
+    return (date.today() + timedelta(days=n)).strftime(fmt)
+
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        rows = [
+            # 资产编号, 设备分类, 使用地点, IP地址, 资产价格, 维护有效期, 资产名称
+            ("A-1", "服务器", "机房A-1层", "10.1.2.3", 30000, days(10), "数据库 服务器"),
+            ("A-2", "服务器", "机房B", "10.200.0.1", 25000, days(20, "%Y/%m/%d"), "Web服务器"),
+            ("A-3", "服务器", "机房B", "192.168.1.5", 50000, days(100, "%Y%m%d"), "文件服务器"),
+            ("A-4", "网络设备", "机房A", "10.0.0.1", 80000, days(5), "核心交换机"),
+            ("A-5", "服务器", "机房A", "172.16.0.9", 15000, days(-3), "备份服务器"),
+            ("A-6", "终端", "办公室", "", None, "", "打印机"),
+        ]
+        self.df = pd.DataFrame(rows, columns=[
+            "资产编号", "设备分类", "使用地点", "IP地址", "资产价格", "维护有效期", "资产名称"
+        ])
+        self.engine = QueryEngine()
+
+    def ids(self, text, df=None, version=1):
+        df = self.df if df is None else df
+        return df["资产编号"].iloc[self.engine.search(df, version, text)].tolist()
+
+    def test_request_example(self):
+        text = "分类=服务器 AND (地点~机房A OR ip in 10.0.0.0/8) AND 价格>20000 AND 维护有效期<+30d"
+        self.assertEqual(self.ids(text), ["A-1", "A-2"])
+
+    def test_precedence(self):
+        # AND 优先于 OR，NOT 优先于 AND
+        self.assertEqual(self.ids("分类=网络设备 OR 分类=服务器 AND 价格>40000"), ["A-3", "A-4"])
+        self.assertEqual(self.ids("(分类=网络设备 OR 分类=服务器) AND 价格>40000"), ["A-3", "A-4"])
+        self.assertEqual(self.ids("NOT 分类=服务器 AND 价格>20000"), ["A-4"])
+        self.assertEqual(self.ids("NOT (分类=服务器 OR 分类=终端)"), ["A-4"])
+        self.assertEqual(self.ids("NOT NOT 地点=机房B"), ["A-2", "A-3"])
+
+    def test_operators(self):
+        self.assertEqual(self.ids("地点!=机房A AND 分类!=终端"), ["A-1", "A-2", "A-3"])
+        self.assertEqual(self.ids("名称!~服务器"), ["A-4", "A-6"])
+        self.assertEqual(self.ids("编号 in (a-1, A-5)"), ["A-1", "A-5"])
+        self.assertEqual(self.ids("价格>=25000 AND 价格<=50000"), ["A-1", "A-2", "A-3"])
+        self.assertEqual(self.ids("价格 in (15000, 80000)"), ["A-4", "A-5"])
+        # 字段名可以是别名、完整列名或唯一的部分列名
+        self.assertEqual(self.ids("资产编号=A-3"), ["A-3"])
+        self.assertEqual(self.ids("维护<today"), ["A-5"])
+
+    def test_quoted_values(self):
+        self.assertEqual(self.ids('名称="数据库 服务器"'), ["A-1"])
+        self.assertEqual(self.ids("名称~'库 服'"), ["A-1"])
+        self.assertEqual(self.ids('名称~"OR"'), [])
+        self.assertEqual(self.ids('"使用地点"="机房A-1层"'), ["A-1"])
+
+        parser = QueryParser(self.df.columns)
+        self.assertEqual(parser.parse(r'名称="a\"b"'), ("cmp", "资产名称", "=", 'a"b'))
+        self.assertEqual(parser.parse('地点 in ("A,B", C)'), ("cmp", "使用地点", "in", ("A,B", "C")))
+
+    def test_ip(self):
+        self.assertEqual(self.ids("ip in 10.0.0.0/8"), ["A-1", "A-2", "A-4"])
+        self.assertEqual(self.ids("ip in (10.1.0.0/16, 192.168.1.0/24)"), ["A-1", "A-3"])
+        self.assertEqual(self.ids("ip in 10.1.2.3/32"), ["A-1"])
+        self.assertEqual(self.ids("ip>=172.16.0.0 AND ip<192.168.0.0"), ["A-5"])
+        self.assertEqual(self.ids("ip=10.0.0.1"), ["A-4"])
+
+    def test_dates(self):
+        # 维护有效期的格式不统一（yyyy-MM-dd / yyyy/MM/dd / yyyyMMdd）
+        self.assertEqual(self.ids("维护有效期<+30d"), ["A-1", "A-2", "A-4", "A-5"])
+        self.assertEqual(self.ids("维护有效期>=today AND 维护有效期<=+1w"), ["A-4"])
+        self.assertEqual(self.ids("维护有效期<-1d"), ["A-5"])
+        self.assertEqual(self.ids(f"维护有效期>{days(50)}"), ["A-3"])
+        self.assertEqual(self.ids("维护有效期>=-10000d"), ["A-1", "A-2", "A-3", "A-4", "A-5"])
+
+        today = np.datetime64(date.today(), "ns")
+        self.assertEqual(QueryEngine.parse_date("today"), today)
+        self.assertEqual(QueryEngine.parse_date("+2w"), today + np.timedelta64(14, "D"))
+        self.assertEqual(QueryEngine.parse_date("-7d"), today - np.timedelta64(7, "D"))
+
+    def test_cache(self):
+        text = "分类=服务器 AND 价格>20000"
+        first = self.engine.search(self.df, 1, text)
+        # 同一版本：相同或等价（条件顺序、大小写不同）的查询复用缓存结果
+        self.assertIs(self.engine.search(self.df, 1, text), first)
+        self.assertIs(self.engine.search(self.df, 1, "价格>20000 and 分类=服务器"), first)
+
+        # 修改数据后版本递增，缓存失效
+        df = self.df.copy()
+        df.loc[df["资产编号"] == "A-3", "设备分类"] = "存储"
+        self.assertEqual(self.ids(text, df, version=2), ["A-1", "A-2"])
+        self.assertEqual(self.engine.version, 2)
+        self.assertTrue(all(key[1] == 2 for key in self.engine.results))
+
+        # 列名变化时执行计划也重新生成
+        renamed = df.rename(columns={"资产价格": "价格(元)"})
+        with self.assertRaisesRegex(QueryError, "未知字段: 价格"):
+            self.engine.search(renamed, 3, "地点=机房B AND 价格x>1")
+        self.assertEqual(self.ids("地点=机房B", renamed, version=3), ["A-2", "A-3"])
+
+    def test_errors(self):
+        cases = [
+            ("", "查询表达式为空"),
+            ("   ", "查询表达式为空"),
+            ("分类=", "查询表达式不完整"),
+            ("(分类=服务器", "查询表达式不完整"),
+            ("分类=服务器)", "多余的内容: )"),
+            ("分类 服务器", "此处应为 op，实际为: 服务器"),
+            ("= 服务器", "此处应为字段名，实际为: ="),
+            ("分类=(服务器)", "此处应为查询值，实际为: ("),
+            ("颜色=红", "未知字段: 颜色"),
+            ("设备=服务器", "未知字段: 设备"),
+            ('名称="未结束', "无法识别的字符"),
+            ("价格>abc", "无效的数值: abc"),
+            ("维护有效期<下周", "无效的日期: 下周"),
+            ("ip in 10.0.0.0/33", "无效的IP网段: 10.0.0.0/33"),
+            ("ip>10.0.0.300", "无效的IP地址: 10.0.0.300"),
+        ]
+        df = self.df.assign(设备型号="", 设备序列号="")
+        for text, message in cases:
+            with self.subTest(text=text):
+                with self.assertRaises(QueryError) as context:
+                    self.engine.search(df, 1, text)
+                self.assertIn(message, str(context.exception))
+
+    def test_missing_column(self):
+        # 别名指向数据中没有的列时不匹配任何行
+        self.assertEqual(self.ids("供应商=某公司"), [])
+        self.assertEqual(self.ids("NOT 供应商=某公司"), self.df["资产编号"].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+"""HTTP/JSON 服务模式测试：在本机随机端口启动 AssetServer，逐个接口验证"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import pandas as pd
+import qrcode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import itdevice16  # noqa: E402
+
+
+def asset(asset_id, name, expiry, **values):
+    row = {col: "" for col in itdevice16.ASSET_COLUMNS}
+    row.update({
+        "资产编号": asset_id, "资产名称": name, "设备分类": "服务器",
+        "使用地点": "机房A", "资产价格": 10000, "维护有效期": expiry,
+    })
+    row.update(values)
+    return row
+
+
+class AssetServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, "assets.csv")
+        today = date.today()
+        pd.DataFrame([
+            asset("A-001", "数据库服务器", (today + timedelta(days=10)).isoformat(), IP地址="10.0.0.1"),
+            asset("A-002", "文件服务器", (today - timedelta(days=5)).strftime("%Y/%m/%d")),
+            asset("A-003", "核心交换机", (today + timedelta(days=400)).strftime("%Y%m%d"), 设备分类="网络设备"),
+        ]).to_csv(self.file_path, index=False, encoding="utf-8-sig")
+
+        self.store = itdevice16.AssetStore(self.file_path, save_delay=0.05)
+        self.server = itdevice16.AssetServer(("127.0.0.1", 0), self.store)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.store.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.base + path, data=body, method=method)
+        if body is not None:
+            request.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                status, data = response.status, response.read()
+                content_type = response.headers.get("Content-Type", "")
+        except urllib.error.HTTPError as e:
+            status, data, content_type = e.code, e.read(), e.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            return status, json.loads(data.decode("utf-8"))
+        return status, data.decode("utf-8")
+
+    def test_search(self):
+        status, result = self.request("GET", "/assets")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["total"], 3)
+
+        status, result = self.request("GET", "/assets?q=" + quote("分类=服务器 AND 名称~数据库"))
+        self.assertEqual(status, 200)
+        self.assertEqual([item["资产编号"] for item in result["items"]], ["A-001"])
+
+        status, result = self.request("GET", "/assets?limit=1&offset=1")
+        self.assertEqual((result["total"], len(result["items"])), (3, 1))
+
+        status, result = self.request("GET", "/assets?q=" + quote("价格>>1"))
+        self.assertEqual(status, 400)
+        self.assertIn("error", result)
+
+    def test_get(self):
+        status, result = self.request("GET", "/assets/A-002")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["资产名称"], "文件服务器")
+
+        status, result = self.request("GET", "/assets/NOPE")
+        self.assertEqual(status, 404)
+
+    def test_add_update_delete(self):
+        status, result = self.request("POST", "/assets", {"资产编号": "A-004", "资产名称": "备份服务器"})
+        self.assertEqual(status, 201)
+        self.assertEqual(result["使用地点"], "未指定")
+        status, _ = self.request("POST", "/assets", {"资产编号": "A-004"})
+        self.assertEqual(status, 409)
+        status, _ = self.request("POST", "/assets", {"资产编号": "A-005", "不存在的字段": 1})
+        self.assertEqual(status, 400)
+
+        status, result = self.request("GET", "/assets?q=" + quote("名称~备份"))
+        self.assertEqual([item["资产编号"] for item in result["items"]], ["A-004"])
+
+        status, result = self.request("PUT", "/assets/A-004", {"使用地点": "机房B", "资产编号": "A-104"})
+        self.assertEqual(status, 200)
+        self.assertEqual((result["资产编号"], result["使用地点"]), ("A-104", "机房B"))
+        self.assertEqual(self.request("GET", "/assets/A-004")[0], 404)
+        status, _ = self.request("PUT", "/assets/A-104", {"资产编号": "A-001"})
+        self.assertEqual(status, 409)
+
+        status, result = self.request("DELETE", "/assets/A-104")
+        self.assertEqual((status, result), (200, {"deleted": "A-104"}))
+        self.assertEqual(self.request("GET", "/assets/A-104")[0], 404)
+        self.assertEqual(self.request("DELETE", "/assets/A-104")[0], 404)
+
+        # 延迟保存写回文件
+        self.store.close()
+        saved = pd.read_csv(self.file_path, encoding="utf-8-sig", dtype=str)
+        self.assertEqual(saved["资产编号"].tolist(), ["A-001", "A-002", "A-003"])
+
+    def test_batched_adds(self):
+        # 连续添加的行先缓存，读取、修改时才并入
+        for i in range(20):
+            status, _ = self.request("POST", "/assets", {"资产编号": f"B-{i:03d}", "资产名称": "终端"})
+            self.assertEqual(status, 201)
+        self.assertEqual(len(self.store.pending), 20)
+        status, result = self.request("GET", "/assets?q=" + quote("名称=终端") + "&limit=100")
+        self.assertEqual(result["total"], 20)
+        self.assertEqual(self.store.pending, [])
+
+        self.request("POST", "/assets", {"资产编号": "B-100"})
+        status, result = self.request("PUT", "/assets/B-100", {"资产名称": "打印机"})
+        self.assertEqual((status, result["资产名称"]), (200, "打印机"))
+        self.request("POST", "/assets", {"资产编号": "B-101"})
+        self.assertEqual(self.request("DELETE", "/assets/B-101")[0], 200)
+        self.assertEqual(len(self.store.df), 24)
+
+    def test_maintenance(self):
+        # 维护有效期格式不统一（2024-01-05 / 2024/02/03 / 20240303）也应识别
+        expected = {
+            "即将到期": ["A-001"],
+            "已超期": ["A-002"],
+            "全部": ["A-001", "A-002"],
+        }
+        for status_name, ids in expected.items():
+            status, result = self.request("GET", "/maintenance?days=60&status=" + quote(status_name))
+            self.assertEqual(status, 200)
+            self.assertEqual(sorted(item["资产编号"] for item in result["items"]), ids)
+        status, result = self.request("GET", "/maintenance?days=500")
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(self.request("GET", "/maintenance?status=" + quote("未知"))[0], 400)
+        self.assertEqual(self.request("GET", "/maintenance?days=abc")[0], 400)
+
+    def test_qr(self):
+        status, result = self.request("GET", "/qr?content=A-003")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["资产名称"], "核心交换机")
+        self.assertEqual(self.request("GET", "/qr?content=")[0], 400)
+
+        image = io.BytesIO()
+        qrcode.make("A-002").save(image, format="PNG")
+        status, result = self.request("POST", "/qr", image.getvalue(), "image/png")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["资产编号"], "A-002")
+        self.assertEqual(self.request("POST", "/qr", b"not an image", "image/png")[0], 400)
+
+    def test_complete(self):
+        status, result = self.request("GET", "/complete?field=" + quote("资产名称") + "&prefix=" + quote("文件"))
+        self.assertEqual((status, result), (200, ["文件服务器"]))
+        self.assertEqual(self.request("GET", "/complete?field=nope&prefix=a")[0], 400)
+
+    def test_metrics(self):
+        self.request("GET", "/assets/A-001")
+        self.request("GET", "/assets/NOPE")
+        self.request("GET", "/unknown")
+        status, result = self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn("GET /assets/{asset_id}", json.dumps(result, ensure_ascii=False))
+
+        status, text = self.request("GET", "/metrics?format=prometheus")
+        self.assertEqual(status, 200)
+        self.assertIn("itasset_request", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+"""撤销/重做测试：修改、增删行块的往返，以及超出内存预算时丢弃最早的记录"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import itdevice16  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+
+def sample_assets(count):
+    df = pd.DataFrame({col: [f"{col}{i}" for i in range(count)] for col in itdevice16.ASSET_COLUMNS})
+    df["资产编号"] = [f"A-{i:03d}" for i in range(count)]
+    df["使用地点"] = [f"机房{i % 3}" for i in range(count)]
+    df["资产价格"] = np.arange(count) * 1000.0
+    return df
+
+
+class UndoTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        # 保存的查询、提醒设置等写到临时目录
+        self.home = tempfile.TemporaryDirectory()
+        self.old_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.home.name
+        self.window = itdevice16.AssetManagementSystem()
+        self.window.assets_df = sample_assets(20)
+        self.window.data_changed()
+        self.window.display_assets()
+        self.original = self.window.assets_df.copy()
+
+    def tearDown(self):
+        self.window.expiry_timer.stop()
+        self.window.close()
+        if self.old_home is not None:
+            os.environ["HOME"] = self.old_home
+        self.home.cleanup()
+
+    def assertFrame(self, expected):
+        # 修改过的列会转为 object 类型，只比较值、行标签和行顺序
+        pd.testing.assert_frame_equal(self.window.assets_df, expected, check_dtype=False)
+
+    def test_update_round_trip(self):
+        w = self.window
+        labels = w.assets_df.index[[2, 5, 7]]
+        w.record_change("批量修改", w.apply_updates(labels, {"使用地点": "机房X", "资产价格": "待定"}))
+        edited = w.assets_df.copy()
+        self.assertEqual(w.assets_df.loc[labels, "使用地点"].tolist(), ["机房X"] * 3)
+
+        w.undo()
+        self.assertFrame(self.original)
+        self.assertEqual(w.undo_stack.undo_text(), None)
+        self.assertEqual(w.undo_stack.redo_text(), "批量修改")
+
+        w.redo()
+        self.assertFrame(edited)
+        w.undo()
+        self.assertFrame(self.original)
+
+    def test_cell_block_round_trip(self):
+        # 外部修改合并时按单元格块记录（修改后的值为 DataFrame）
+        w = self.window
+        labels = w.assets_df.index[[0, 3]]
+        columns = ["资产名称", "负责人"]
+        old = w.write_cells(labels, columns, np.array([["甲", "张三"], ["乙", "李四"]], dtype=object))
+        w.record_change("合并外部修改", ("update", old, w.assets_df.loc[labels, columns].copy()))
+        edited = w.assets_df.copy()
+
+        w.undo()
+        self.assertFrame(self.original)
+        w.redo()
+        self.assertFrame(edited)
+
+    def test_insert_remove_round_trip(self):
+        w = self.window
+        new_rows = sample_assets(3).assign(资产编号=["N-1", "N-2", "N-3"])
+        w.record_change("添加资产", w.insert_rows(new_rows))
+        inserted = w.assets_df.copy()
+        self.assertEqual(len(inserted), 23)
+
+        # 删除中间的行块，撤销时按原标签恢复原有顺序
+        w.record_change("删除资产", w.remove_rows(w.assets_df.index[[4, 5, 6, 21]]))
+        removed = w.assets_df.copy()
+        self.assertEqual(len(removed), 19)
+
+        w.undo()
+        self.assertFrame(inserted)
+        w.undo()
+        self.assertFrame(self.original)
+        w.redo()
+        self.assertFrame(inserted)
+        w.redo()
+        self.assertFrame(removed)
+        w.undo()
+        w.undo()
+        self.assertFrame(self.original)
+
+        # 撤销后的新修改清空重做记录
+        w.record_change("删除资产", w.remove_rows(w.assets_df.index[:2]))
+        self.assertEqual(w.undo_stack.redo_text(), None)
+        w.undo()
+        self.assertFrame(self.original)
+
+    def test_import_round_trip(self):
+        # 导入时覆盖重复记录：删除与添加作为一条记录撤销
+        w = self.window
+        imported = sample_assets(2).assign(资产名称=["新名称0", "新名称1"])
+        changes = [w.remove_rows(w.assets_df.index[w.assets_df["资产编号"].isin(imported["资产编号"])])]
+        changes.append(w.insert_rows(imported))
+        w.undo_stack.push("导入数据", changes)
+        merged = w.assets_df.copy()
+
+        w.undo()
+        self.assertFrame(self.original)
+        w.redo()
+        self.assertFrame(merged)
+
+    def test_memory_budget(self):
+        w = self.window
+        # 每条记录的大小相同（同样 5 个单元格），预算为两条记录
+        cells = w.assets_df.loc[w.assets_df.index[:5], ["备注"]].assign(备注="第0次")
+        size = itdevice16.UndoStack.estimate_size(cells)
+        w.undo_stack = itdevice16.UndoStack(memory_limit=size * 2)
+
+        states = [w.assets_df.copy()]
+        for i in range(4):
+            w.record_change(f"修改{i}", w.apply_updates(w.assets_df.index[:5], {"备注": f"第{i}次"}))
+            states.append(w.assets_df.copy())
+            self.assertEqual(w.undo_stack.undo_entries[-1][2], size)
+            self.assertLessEqual(w.undo_stack.memory, size * 2)
+
+        # 只保留预算内最近的两条记录
+        self.assertEqual([entry[0] for entry in w.undo_stack.undo_entries], ["修改2", "修改3"])
+        w.undo()
+        self.assertFrame(states[3])
+        w.undo()
+        self.assertFrame(states[2])
+        self.assertEqual(w.undo_stack.undo_text(), None)
+        w.undo()  # 没有可撤销的记录时不做任何修改
+        self.assertFrame(states[2])
+
+        w.redo()
+        w.redo()
+        self.assertFrame(states[4])
+
+        # 单条记录超过预算时至少保留最近一条
+        w.undo_stack = itdevice16.UndoStack(memory_limit=1)
+        w.record_change("删除资产", w.remove_rows(w.assets_df.index[:10]))
+        w.record_change("删除资产2", w.remove_rows(w.assets_df.index[:5]))
+        self.assertEqual(len(w.undo_stack.undo_entries), 1)
+        w.undo()
+        self.assertEqual(len(w.assets_df), 10)
+
+        # 重做记录的内存在新修改时释放
+        block = self.original.iloc[:5]
+        stack = itdevice16.UndoStack()
+        stack.push("a", [("remove", block)])
+        stack.pop_undo()
+        stack.push("b", [("remove", block)])
+        self.assertEqual(stack.memory, itdevice16.UndoStack.estimate_size(block))
+
+
+if __name__ == "__main__":
+    unittest.main()